@@ -0,0 +1,129 @@
+import asyncio
+from settings import load_config
+from vad import VAD
+
+# 与 PyAudio 中的常量取值一致，避免在使用模拟音频源时也必须导入 pyaudio（模拟音频源见 benchmarks/fake_audio.py）
+paInt16 = 8
+paContinue = 0
+paComplete = 1
+paInputOverflow = 2
+
+
+class AsyncRecorder:
+    """
+    基于 PyAudio 回调模式的异步录音
+
+    音频线程在回调中把数据块投递到事件循环的有界队列里，调用方用 async for 逐块读取，
+    录音期间不会阻塞事件循环。消费过慢导致队列已满时丢弃最旧的数据块并计入 dropped。
+
+    Args:
+        audio: pyaudio.PyAudio 或兼容对象（如 benchmarks.fake_audio.FakeAudioSource），默认新建 PyAudio
+        queue_size: 队列最多缓存的数据块数
+        FORMAT/CHANNELS/RATE/CHUNK: 录音参数，默认取自 config.toml 的 [record]
+
+    Attributes:
+        chunks_received: 回调收到的数据块数
+        dropped: 因队列已满而丢弃的数据块数
+        input_overflows: 音频设备报告的输入溢出次数
+    """
+
+    def __init__(self, audio=None, queue_size=64, FORMAT=None, CHANNELS=None, RATE=None, CHUNK=None):
+        self._audio = audio
+        self._owns_audio = audio is None
+        self.FORMAT = FORMAT
+        cfg = load_config().record
+        self.CHANNELS = CHANNELS or cfg.CHANNELS
+        self.RATE = RATE or cfg.RATE
+        self.CHUNK = CHUNK or cfg.CHUNK
+        self.queue_size = queue_size
+        self.chunks_received = 0
+        self.dropped = 0
+        self.input_overflows = 0
+        self._queue = None
+        self._loop = None
+        self._stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        # 运行在音频线程中，只做计数并把数据交给事件循环
+        self.chunks_received += 1
+        if status & paInputOverflow:
+            self.input_overflows += 1
+        try:
+            self._loop.call_soon_threadsafe(self._put, in_data)
+        except RuntimeError:
+            # 事件循环已关闭
+            return None, paComplete
+        return None, paContinue
+
+    def _put(self, data):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(data)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        fmt = self.FORMAT
+        if self._audio is None:
+            import pyaudio
+            self._audio = pyaudio.PyAudio()
+            if fmt is None:
+                fmt = load_config().record.pyaudio_format
+        elif fmt is None:
+            fmt = paInt16
+        self._stream = self._audio.open(
+            format=fmt,
+            channels=self.CHANNELS,
+            rate=self.RATE,
+            input=True,
+            frames_per_buffer=self.CHUNK,
+            stream_callback=self._callback
+        )
+        return self
+
+    async def stop(self):
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            # stop_stream 会等待音频线程结束，放到线程池中避免阻塞事件循环
+            await asyncio.to_thread(stream.stop_stream)
+            stream.close()
+        if self._owns_audio and self._audio is not None:
+            self._audio.terminate()
+            self._audio = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def chunks(self):
+        """
+        异步生成录到的数据块，流结束（或被 stop）且队列取空后结束
+        """
+        while True:
+            try:
+                yield await asyncio.wait_for(self._queue.get(), timeout=0.1)
+            except asyncio.TimeoutError:
+                if self._stream is None or not self._stream.is_active():
+                    while not self._queue.empty():
+                        yield self._queue.get_nowait()
+                    return
+
+    async def speech_chunks(self, vad=None):
+        """
+        与 record.stream_chunks 相同的语音检测逻辑：检测到声音后（含预录数据）开始产出，
+        静音超过设定时长或达到 MAX_DURATION 后结束
+        """
+        if vad is None:
+            vad = VAD.from_config(self.RATE, self.CHUNK, self.CHANNELS)
+        max_duration = load_config().record.MAX_DURATION
+        max_samples = int(max_duration * self.RATE) * self.CHANNELS if max_duration else None
+        recorded = 0
+        async for data in self.chunks():
+            for block in vad.process(data):
+                yield block
+                recorded += len(block) // 2
+            if vad.ended or (max_samples and recorded >= max_samples):
+                return
@@ -0,0 +1,141 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+import wave
+
+# 每个工作进程各自持有一个 STT 实例（即各加载一份模型）
+_worker_stt = None
+_worker_error = None
+_worker_use_mono = True
+
+
+def _init_worker(model_path, use_mono=True, stt_factory=None):
+    """
+    进程池的初始化函数（long_stt 也使用）
+
+    Args:
+        model_path: 模型路径，None 表示使用配置中的模型
+        use_mono: 识别文件时是否先转换为 16kHz 单声道
+        stt_factory: 创建 STT 的无参可调用对象（需可 pickle），指定时忽略 model_path
+    """
+    global _worker_stt, _worker_error, _worker_use_mono
+    _worker_use_mono = use_mono
+    # 初始化异常不能抛出，否则进程池会不断重建工作进程；记录下来在每个文件的结果中报告
+    try:
+        if stt_factory is not None:
+            _worker_stt = stt_factory()
+        else:
+            from stt import STT
+            _worker_stt = STT(model_path=model_path)
+    except Exception as e:
+        _worker_error = f"{type(e).__name__}: {e}"
+
+
+def _audio_duration(file_path):
+    """读取音频时长（秒），无法识别时返回 0"""
+    try:
+        with wave.open(str(file_path), "rb") as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except (wave.Error, EOFError):
+        pass
+    try:
+        import soundfile as sf
+        return sf.info(str(file_path)).duration
+    except Exception:
+        return 0.0
+
+
+def _transcribe_one(file_path):
+    start = time.perf_counter()
+    result = {"path": str(file_path), "duration": _audio_duration(file_path)}
+    if _worker_error is not None:
+        result["error"] = _worker_error
+        result["elapsed"] = time.perf_counter() - start
+        return result
+    try:
+        result["text"] = _worker_stt.Speech_to_Text(str(file_path), use_mono=_worker_use_mono)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def collect_files(inputs, pattern="*.wav"):
+    """
+    展开输入的文件和目录（目录按 pattern 递归匹配），返回排序后的文件列表
+    """
+    files = []
+    for item in inputs:
+        path = pathlib.Path(item)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob(pattern) if p.is_file()))
+        else:
+            files.append(path)
+    return files
+
+
+def transcribe_batch(files, workers=None, model_path=None, use_mono=True):
+    """
+    使用进程池并行转写多个音频文件
+
+    Args:
+        files: 音频文件路径列表
+        workers: 工作进程数，默认为 CPU 核心数
+        model_path: 模型路径（可选），默认使用配置中的模型
+        use_mono: 是否先转换为 16kHz 单声道
+
+    Yields:
+        按输入顺序产出的结果字典: path, duration, elapsed, text（失败时为 error）
+    """
+    workers = workers or os.cpu_count() or 1
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(model_path, use_mono)) as pool:
+        # imap 保持输入顺序，同时结果一完成就可以被消费
+        for result in pool.imap(_transcribe_one, files, chunksize=1):
+            yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量语音转文字，结果以 JSONL 格式输出")
+    parser.add_argument("inputs", nargs="+", help="音频文件或目录")
+    parser.add_argument("-o", "--output", help="输出 JSONL 文件（默认输出到标准输出）")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="工作进程数（默认为 CPU 核心数）")
+    parser.add_argument("-m", "--model", default=None, help="模型路径（默认使用配置中的模型）")
+    parser.add_argument("-p", "--pattern", default="*.wav", help="目录中匹配的文件模式（默认 *.wav）")
+    parser.add_argument("--no-mono", action="store_true", help="不转换为 16kHz 单声道（输入需已是 16 位单声道 WAV）")
+    args = parser.parse_args()
+
+    files = collect_files(args.inputs, args.pattern)
+    if not files:
+        print("没有找到音频文件", file=sys.stderr)
+        return 1
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    total_audio = 0.0
+    failed = 0
+    try:
+        for n, result in enumerate(transcribe_batch(files, args.workers, args.model, not args.no_mono), 1):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            total_audio += result["duration"]
+            failed += "error" in result
+            print(f"[{n}/{len(files)}] {result['path']}", end="\r", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    wall = time.perf_counter() - start
+    print(file=sys.stderr)
+    print(f"[✓] {len(files)} 个文件，失败 {failed} 个，耗时 {wall:.1f}s", file=sys.stderr)
+    print(f"    吞吐量: {len(files) / wall:.2f} 文件/秒", file=sys.stderr)
+    if total_audio > 0:
+        print(f"    实时率 (RTF): {wall / total_audio:.4f}（音频总时长 {total_audio:.1f}s）", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
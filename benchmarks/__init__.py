@@ -0,0 +1,5 @@
+"""
+性能基准脚本，需在项目根目录下以模块方式运行，例如:
+
+    python -m benchmarks.bench_mono
+"""
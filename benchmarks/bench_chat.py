@@ -0,0 +1,164 @@
+"""
+流式对话客户端基准：本地模拟的 OpenAI 兼容接口上测量首个 token 延迟 (TTFT) 与生成速度
+
+比较三种用法（每个新连接有 --handshake 秒的握手开销）：
+    每轮新建客户端   每轮重新建立连接
+    复用客户端       多轮之间复用 keep-alive 连接
+    复用 + 预热      另外在用户说话期间（--idle 秒）调用 warmup()，第一轮也不必等待握手
+并检查取消（回复途中取消任务：服务端应立即看到连接断开，部分回复记入历史）与首个 token 超时。
+
+    python -m benchmarks.bench_chat [--turns 8] [--ttft 0.2] [--tps 50] [--handshake 0.1] [-o result.json]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import chat
+from benchmarks.mock_openai import MockOpenAIServer
+
+
+def _client(server, **kwargs):
+    return chat.ChatClient(api_key="mock", base_url=server.base_url, model=server.model, **kwargs)
+
+
+async def _turn(session, text):
+    async for _ in session.reply(text):
+        pass
+    return session.client.last_stats
+
+
+async def _run_cold(server, turns, idle):
+    stats = []
+    for i in range(turns):
+        await asyncio.sleep(idle)
+        async with _client(server) as client:
+            stats.append(await _turn(chat.ChatSession(client, system_prompt=""), f"问题 {i}"))
+    return stats
+
+
+async def _run_pooled(server, turns, idle, warmup):
+    stats = []
+    async with _client(server) as client:
+        session = chat.ChatSession(client, system_prompt="")
+        for i in range(turns):
+            if warmup:
+                # 用户说话（识别）期间在后台预热连接
+                task = asyncio.create_task(client.warmup())
+                await asyncio.sleep(idle)
+                await task
+            else:
+                await asyncio.sleep(idle)
+            stats.append(await _turn(session, f"问题 {i}"))
+    return stats
+
+
+async def _run_cancel(server, after):
+    async with _client(server) as client:
+        session = chat.ChatSession(client, system_prompt="")
+        received = asyncio.Event()
+        pieces = []
+
+        async def consume():
+            async for piece in session.reply("请详细介绍一下"):
+                pieces.append(piece)
+                if len(pieces) >= after:
+                    received.set()
+
+        task = asyncio.create_task(consume())
+        await received.wait()
+        cancelled_before = server.cancelled
+        start = time.perf_counter()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        cancel_seconds = time.perf_counter() - start
+        # 服务端在下一次写入时发现连接已断开
+        deadline = time.perf_counter() + 2
+        while server.cancelled == cancelled_before and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        noticed = time.perf_counter() - start
+        remembered = session.history[-1]["content"] if session.history else ""
+        next_turn = await _turn(session, "继续")
+    return {"cancel_seconds": cancel_seconds, "server_noticed_seconds": noticed,
+            "server_saw_disconnect": server.cancelled > cancelled_before,
+            "partial_chars": len(remembered), "received_chars": len("".join(pieces)),
+            "next_turn_ttft": next_turn["ttft"]}
+
+
+async def _run_timeout(limit):
+    with MockOpenAIServer(ttft=limit * 10) as server:
+        async with _client(server, first_token_timeout=limit) as client:
+            start = time.perf_counter()
+            try:
+                async for _ in client.stream([{"role": "user", "content": "hi"}]):
+                    pass
+            except TimeoutError as e:
+                return {"raised": True, "seconds": time.perf_counter() - start, "message": str(e)}
+    return {"raised": False, "seconds": time.perf_counter() - start}
+
+
+def _summary(name, stats, connections):
+    ttft = [s["ttft"] for s in stats]
+    tps = [s["tokens_per_second"] for s in stats if s["tokens_per_second"]]
+    print(f"{name:<12}{statistics.median(ttft) * 1000:>10.0f}{ttft[0] * 1000:>10.0f}{max(ttft) * 1000:>10.0f}"
+          f"{statistics.mean(tps):>10.1f}{connections:>8}")
+    return {"ttft_median": statistics.median(ttft), "ttft_first": ttft[0], "ttft_max": max(ttft),
+            "tokens_per_second": statistics.mean(tps), "connections": connections}
+
+
+async def run(args):
+    results = {}
+    with MockOpenAIServer(args.ttft, args.tps, args.tokens, args.handshake) as server:
+        print(f"[-] 模拟接口：TTFT {args.ttft * 1000:.0f}ms，{args.tps:g} tokens/s，每次 {args.tokens} tokens，"
+              f"新连接握手 {args.handshake * 1000:.0f}ms；{args.turns} 轮，每轮间隔 {args.idle:g}s")
+        print("方式        TTFT中位(ms) 首轮(ms) 最大(ms)  tokens/s  新连接数")
+        for name, coro in (("每轮新建客户端", lambda: _run_cold(server, args.turns, args.idle)),
+                           ("复用客户端", lambda: _run_pooled(server, args.turns, args.idle, False)),
+                           ("复用 + 预热", lambda: _run_pooled(server, args.turns, args.idle, True))):
+            connections = server.connections
+            stats = await coro()
+            results[name] = _summary(name, stats, server.connections - connections)
+
+        results["cancel"] = cancel = await _run_cancel(server, args.cancel_after)
+        if cancel["server_saw_disconnect"]:
+            noticed = f"{cancel['server_noticed_seconds'] * 1000:.0f}ms 后发现连接断开"
+        else:
+            noticed = "未发现连接断开"
+        print(f"[-] 取消：任务 {cancel['cancel_seconds'] * 1000:.1f}ms 内结束，服务端{noticed}；"
+              f"已产出 {cancel['received_chars']} 字，历史中记入 {cancel['partial_chars']} 字；"
+              f"下一轮 TTFT {cancel['next_turn_ttft'] * 1000:.0f}ms")
+
+    results["timeout"] = timeout = await _run_timeout(args.first_token_timeout)
+    if timeout["raised"]:
+        print(f"[-] 首个 token 超时 {args.first_token_timeout:g}s：{timeout['seconds']:.2f}s 后抛出 TimeoutError（{timeout['message']}）")
+    else:
+        print(f"[!] 首个 token 超时 {args.first_token_timeout:g}s：没有抛出 TimeoutError")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="chat 流式对话客户端基准")
+    parser.add_argument("--turns", type=int, default=8, help="每种方式的对话轮数")
+    parser.add_argument("--ttft", type=float, default=0.2, help="模拟接口的首个 token 延迟（秒）")
+    parser.add_argument("--tps", type=float, default=50, help="模拟接口的生成速度（tokens/s）")
+    parser.add_argument("--tokens", type=int, default=40, help="每次回复的 token 数")
+    parser.add_argument("--handshake", type=float, default=0.1, help="每个新连接的握手延迟（秒）")
+    parser.add_argument("--idle", type=float, default=0.3, help="两轮之间的间隔（秒），模拟用户说话")
+    parser.add_argument("--cancel-after", type=int, default=5, help="取消测试中收到多少段回复后取消")
+    parser.add_argument("--first-token-timeout", type=float, default=0.5, help="超时测试的首个 token 超时（秒）")
+    parser.add_argument("-o", "--output", help="把结果保存为 JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), **results}, f, ensure_ascii=False, indent=1)
+        print(f"[✓] 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+下载吞吐量基准：在本地 Range 服务器上扫描线程数与分块大小
+
+服务器可设置请求延迟与带宽，模拟“单连接受限、总带宽更高”的真实网络；
+最后一行为 num_threads="auto" 自动调整的结果。
+
+    python -m benchmarks.bench_download [--size-mb 64] [--latency 0.03] [--conn-mbps 8] [--total-mbps 64]
+                                        [--threads 1,2,4,8,16] [--chunks 8,64,256,1024] [-o result.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import dl_file
+from benchmarks.local_http import RangeServer
+
+MB = 1024 * 1024
+
+
+def _run(url, save_path, num_threads, chunk_size, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        if os.path.exists(save_path):
+            os.remove(save_path)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            dl_file.download_file(url, save_path, chunk_size=chunk_size, num_threads=num_threads, progress=False)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dl_file 下载吞吐量基准")
+    parser.add_argument("--size-mb", type=float, default=64, help="文件大小（MB）")
+    parser.add_argument("--latency", type=float, default=0.03, help="每个请求的延迟（秒）")
+    parser.add_argument("--conn-mbps", type=float, default=8, help="每个连接的带宽上限（MB/s，0 为不限）")
+    parser.add_argument("--total-mbps", type=float, default=64, help="服务器总带宽上限（MB/s，0 为不限）")
+    parser.add_argument("--threads", default="1,2,4,8,16", help="要测试的线程数，逗号分隔")
+    parser.add_argument("--chunks", default="8,64,256,1024", help="要测试的分块大小（KB），逗号分隔")
+    parser.add_argument("--repeat", type=int, default=1, help="每项重复次数（取最快一次）")
+    parser.add_argument("-o", "--output", help="把结果保存为 JSON")
+    args = parser.parse_args()
+
+    threads = [int(t) for t in args.threads.split(",")]
+    chunks = [int(c) * 1024 for c in args.chunks.split(",")]
+    size = int(args.size_mb * MB)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp, RangeServer(
+            os.urandom(size), args.latency, args.conn_mbps * MB or None, args.total_mbps * MB or None) as server:
+        save_path = os.path.join(tmp, "file.bin")
+        print(f"[-] {args.size_mb:g}MB，延迟 {args.latency * 1000:.0f}ms，"
+              f"单连接 {args.conn_mbps or '不限'} MB/s，总带宽 {args.total_mbps or '不限'} MB/s")
+        print("线程\\分块".ljust(10) + "".join(f"{c // 1024:>9}KB" for c in chunks) + "   (MB/s)")
+        for n in threads + ["auto"]:
+            line = str(n).ljust(10)
+            for chunk_size in chunks:
+                elapsed = _run(server.url, save_path, n, chunk_size, args.repeat)
+                results.append({"threads": n, "chunk_size": chunk_size, "seconds": elapsed,
+                                "throughput_mb_s": args.size_mb / elapsed})
+                line += f"{args.size_mb / elapsed:>11.1f}"
+            print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=1)
+        print(f"[✓] 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
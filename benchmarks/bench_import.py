@@ -0,0 +1,60 @@
+"""
+测量各模块在全新解释器中的导入耗时，并检查导入时是否拉入了重量级依赖
+
+    python -m benchmarks.bench_import [--repeat 5] [--max-ms 300]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = ["settings", "vad", "mono", "record", "model_cache", "stt", "batch_stt", "async_record", "stt_catalog", "chat"]
+HEAVY = ["librosa", "soundfile", "vosk", "pyaudio", "scipy", "requests", "bs4", "tomlkit"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def measure(module, repeat):
+    best, heavy = float("inf"), []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+            capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            return None, out.stderr.strip().splitlines()[-1]
+        result = json.loads(out.stdout)
+        best = min(best, result["ms"])
+        heavy = result["heavy"]
+    return best, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模块导入耗时")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块重复次数（取最快一次）")
+    parser.add_argument("--max-ms", type=float, default=None, help="超过该耗时则以非零状态退出")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    failed = 0
+    for module in args.modules:
+        ms, heavy = measure(module, args.repeat)
+        if ms is None:
+            print(f"{module:<14} 导入失败: {heavy}")
+            failed += 1
+            continue
+        over = args.max_ms is not None and ms > args.max_ms
+        failed += over
+        loaded = f"  重量级依赖: {', '.join(heavy)}" if heavy else ""
+        print(f"{module:<14}{ms:>8.1f}ms{'  <-- 超出上限' if over else ''}{loaded}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+长录音并行识别基准：比较 Speech_to_Text 顺序识别与 long_stt 切分后多进程识别的耗时与准确率
+
+测试音频由“词”组成：每个词是一段固定频率的纯音，词间停顿很短，句间停顿较长，并叠加底噪。
+默认使用 ToneRecognizer：按能量找出每个词、以主频命名，并给出词的起止时间，--cost 模拟每秒音频的解码耗时
+（sleep，与 Vosk 一样不占用 GIL）。切分点落在词中间会把一个词拆成两个，因此词错误率与时间误差可以直接
+反映切分与拼接是否正确。指定 --model 时使用真实的 Vosk 模型，以顺序识别的结果为参照。
+
+    python -m benchmarks.bench_long_stt [--seconds 600] [--workers 1,2,4] [--cost 0.05] [-o result.json]
+"""
+import argparse
+import contextlib
+import difflib
+import functools
+import io
+import json
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+import soundfile as sf
+
+import long_stt
+from benchmarks.bench_stt import FakeModel
+
+FREQS = np.arange(300, 1600, 100)
+FRAME = 0.02  # ToneRecognizer 的分析帧长（秒）
+
+
+class ToneRecognizer:
+    """
+    实现 KaldiRecognizer 接口的纯音“识别器”
+
+    能量超过阈值的连续帧为一个词，词名为主频（如 w700）；静音超过 0.3 秒结束一句。
+    """
+
+    def __init__(self, model, sample_rate, cost=0.0):
+        self.sample_rate = sample_rate
+        self.cost = cost
+        self.frame_len = int(sample_rate * FRAME)
+        self.words_enabled = False
+        self._carry = np.zeros(0, dtype=np.int16)
+        self._frame = 0
+        self._voiced = []
+        self._word_start = 0
+        self._silent = 0
+        self._words = []
+        self._done = []
+
+    def SetWords(self, enabled):
+        self.words_enabled = enabled
+
+    def _end_word(self):
+        samples = np.concatenate(self._voiced).astype(np.float32)
+        spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+        freq = np.argmax(spectrum) * self.sample_rate / len(samples)
+        self._words.append({"word": f"w{int(round(freq / 50)) * 50}", "conf": 1.0,
+                            "start": self._word_start * FRAME, "end": self._frame * FRAME})
+        self._voiced = []
+
+    def AcceptWaveform(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self.cost:
+            time.sleep(self.cost * len(samples) / self.sample_rate)
+        samples = np.concatenate([self._carry, samples])
+        n_frames = len(samples) // self.frame_len
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        self._carry = samples[n_frames * self.frame_len:]
+        energy = long_stt.frame_energy_db(frames.ravel(), self.frame_len)
+        for frame, db in zip(frames, energy):
+            if db > 45:
+                if not self._voiced:
+                    self._word_start = self._frame
+                self._voiced.append(frame)
+                self._silent = 0
+            else:
+                self._silent += 1
+                if self._voiced and self._silent >= 2:
+                    self._end_word()
+                if self._words and self._silent * FRAME >= 0.3:
+                    self._done.extend(self._words)
+                    self._words = []
+            self._frame += 1
+        return bool(self._done)
+
+    def _result(self, words):
+        result = {"text": " ".join(w["word"] for w in words)}
+        if self.words_enabled and words:
+            result["result"] = words
+        return json.dumps(result)
+
+    def Result(self):
+        words, self._done = self._done, []
+        return self._result(words)
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(w["word"] for w in self._words)})
+
+    def FinalResult(self):
+        if self._voiced:
+            self._end_word()
+        words, self._done, self._words = self._done + self._words, [], []
+        return self._result(words)
+
+
+def _tone_stt(cost):
+    from stt import STT
+    return STT(model=FakeModel(), recognizer_factory=functools.partial(ToneRecognizer, cost=cost))
+
+
+def make_fixture(path, seconds, rate, seed=0):
+    """
+    生成测试音频
+
+    Returns:
+        真实的词列表 [(词, 起始秒), ...]
+    """
+    rng = np.random.default_rng(seed)
+    truth = []
+    parts = []
+    t = 0.5
+    parts.append(np.zeros(int(t * rate)))
+    while t < seconds - 5:
+        for _ in range(rng.integers(4, 12)):
+            freq = int(rng.choice(FREQS))
+            n = int(rng.uniform(0.15, 0.35) * rate)
+            ramp = np.minimum(1, np.minimum(np.arange(n), np.arange(n)[::-1]) / (0.01 * rate))
+            parts.append(4000 * ramp * np.sin(2 * np.pi * freq * np.arange(n) / rate))
+            truth.append((f"w{freq}", t))
+            gap = int(rng.uniform(0.08, 0.15) * rate)
+            parts.append(np.zeros(gap))
+            t += (n + gap) / rate
+        pause = int(rng.uniform(0.4, 1.5) * rate)
+        parts.append(np.zeros(pause))
+        t += pause / rate
+    signal = np.concatenate(parts)
+    signal += 30 * rng.standard_normal(len(signal))
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(signal.astype(np.int16).tobytes())
+    return truth
+
+
+def _max_time_error(truth, words):
+    """对齐后相同词的起始时间最大误差（秒）"""
+    ref = [w for w, _ in truth]
+    hyp = [w["word"] for w in words]
+    errors = [0.0]
+    for block in difflib.SequenceMatcher(None, ref, hyp, autojunk=False).get_matching_blocks():
+        for k in range(block.size):
+            errors.append(abs(truth[block.a + k][1] - words[block.b + k]["start"]))
+    return max(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="long_stt 并行识别基准")
+    parser.add_argument("--seconds", type=float, default=600, help="测试音频时长（秒）")
+    parser.add_argument("--rate", type=int, default=16000, help="测试音频采样率")
+    parser.add_argument("--workers", default="1,2,4", help="工作进程数，逗号分隔")
+    parser.add_argument("--cost", type=float, default=0.05, help="ToneRecognizer 每秒音频的解码耗时（秒）")
+    parser.add_argument("--max-seconds", type=float, default=long_stt.MAX_SEGMENT_SECONDS, help="片段最长时长（秒）")
+    parser.add_argument("--model", help="使用真实的 Vosk 模型（以顺序识别结果为参照）")
+    parser.add_argument("--file", help="使用已有的音频文件代替合成音频（需配合 --model）")
+    parser.add_argument("-o", "--output", help="把结果保存为 JSON")
+    args = parser.parse_args()
+
+    from stt import STT
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or os.path.join(tmp, "long.wav")
+        truth = None if args.file else make_fixture(path, args.seconds, args.rate)
+        factory = None if args.model else functools.partial(_tone_stt, args.cost)
+        stt = STT(model_path=args.model) if args.model else factory()
+        seconds = sf.info(path).duration
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sequential = stt.Speech_to_Text(path)
+        sequential_wall = time.perf_counter() - start
+        reference = " ".join(w for w, _ in truth) if truth else sequential
+        print(f"[-] {seconds:.0f}s 音频，识别器 {args.model or f'ToneRecognizer（{args.cost:g}s/音频秒）'}")
+        print("方式          耗时(s)    RTF  加速比  片段数  词错误率  时间误差(ms)")
+        wer = long_stt.word_error_rate(reference, sequential) if truth else 0.0
+        print(f"{'顺序':<10}{sequential_wall:>9.2f}{sequential_wall / seconds:>7.3f}{1:>8.2f}{1:>8}{wer:>10.2%}{'-':>14}")
+
+        results = {"sequential": {"seconds": sequential_wall, "wer": wer}, "parallel": []}
+        for workers in [int(w) for w in args.workers.split(",")]:
+            start = time.perf_counter()
+            segments = list(long_stt.transcribe_segments(path, workers, args.model, factory,
+                                                         max_seconds=args.max_seconds))
+            wall = time.perf_counter() - start
+            sentences = [s for seg in segments for s in seg["sentences"]]
+            text = " ".join(s["text"] for s in sentences)
+            wer = long_stt.word_error_rate(reference, text)
+            words = [w for s in sentences for w in s.get("words", [])]
+            error = _max_time_error(truth, words) * 1000 if truth else None
+            print(f"{f'并行 x{workers}':<10}{wall:>9.2f}{wall / seconds:>7.3f}{sequential_wall / wall:>8.2f}"
+                  f"{len(segments):>8}{wer:>10.2%}{f'{error:.0f}' if error is not None else '-':>14}")
+            results["parallel"].append({"workers": workers, "seconds": wall, "segments": len(segments),
+                                        "wer": wer, "max_time_error_ms": error})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), **results}, f, indent=1)
+        print(f"[✓] 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
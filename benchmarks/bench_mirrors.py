@@ -0,0 +1,92 @@
+"""
+多镜像下载基准：几个速度不同的本地镜像，比较只用最快镜像与同时使用全部镜像的耗时
+
+每个镜像有各自的总带宽上限；--bad 额外加入一个内容大小不同的镜像（应被探测阶段剔除），
+--broken 加入一个监听后立即关闭的端口（连接失败，应被跳过）。结果会校验 SHA-256，
+并列出每个镜像实际提供的字节数。
+
+    python -m benchmarks.bench_mirrors [--size-mb 32] [--mirror-mbps 16,8,4] [--conn-mbps 4]
+                                       [--latency 0.02] [--threads auto] [--bad] [--broken] [-o result.json]
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import socket
+import tempfile
+import time
+
+import dl_file
+from benchmarks.local_http import RangeServer
+
+MB = 1024 * 1024
+
+
+def _unused_url():
+    """返回一个当前无人监听的本地地址"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}/file.bin"
+
+
+def _run(urls, save_path, sha256, num_threads):
+    if os.path.exists(save_path):
+        os.remove(save_path)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dl_file.download_mirrors(urls, save_path, expected_sha256=sha256, num_threads=num_threads, progress=False)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dl_file 多镜像下载基准")
+    parser.add_argument("--size-mb", type=float, default=32, help="文件大小（MB）")
+    parser.add_argument("--mirror-mbps", default="16,8,4", help="各镜像的总带宽上限（MB/s），逗号分隔")
+    parser.add_argument("--conn-mbps", type=float, default=4, help="每个连接的带宽上限（MB/s，0 为不限）")
+    parser.add_argument("--latency", type=float, default=0.02, help="每个请求的延迟（秒）")
+    parser.add_argument("--threads", default="auto", help="连接数，默认 auto")
+    parser.add_argument("--bad", action="store_true", help="加入一个文件大小不同的镜像")
+    parser.add_argument("--broken", action="store_true", help="加入一个无法连接的镜像")
+    parser.add_argument("-o", "--output", help="把结果保存为 JSON")
+    args = parser.parse_args()
+
+    size = int(args.size_mb * MB)
+    data = os.urandom(size)
+    sha256 = hashlib.sha256(data).hexdigest()
+    num_threads = args.threads if args.threads == "auto" else int(args.threads)
+    speeds = [float(s) for s in args.mirror_mbps.split(",")]
+    conn_bandwidth = args.conn_mbps * MB or None
+
+    with contextlib.ExitStack() as stack, tempfile.TemporaryDirectory() as tmp:
+        servers = [stack.enter_context(RangeServer(data, args.latency, conn_bandwidth, mbps * MB or None))
+                   for mbps in speeds]
+        extra = []
+        if args.bad:
+            extra.append(stack.enter_context(RangeServer(data[:-1], args.latency, conn_bandwidth)).url)
+        if args.broken:
+            extra.append(_unused_url())
+        save_path = os.path.join(tmp, "file.bin")
+        print(f"[-] {args.size_mb:g}MB，延迟 {args.latency * 1000:.0f}ms，单连接 {args.conn_mbps or '不限'} MB/s，"
+              f"镜像带宽 {args.mirror_mbps} MB/s，连接数 {args.threads}")
+
+        single = _run([servers[0].url], save_path, sha256, num_threads)
+        for server in servers:
+            server.bytes_sent = 0
+        mirrored = _run([s.url for s in servers] + extra, save_path, sha256, num_threads)
+        served = [s.bytes_sent for s in servers]
+
+    print(f"仅第一个镜像: {single:6.2f}s {args.size_mb / single:8.1f} MB/s")
+    print(f"全部镜像:     {mirrored:6.2f}s {args.size_mb / mirrored:8.1f} MB/s  （SHA-256 校验通过）")
+    for mbps, n in zip(speeds, served):
+        print(f"  镜像 {mbps:g} MB/s: 提供 {n / MB:7.1f} MB（{n / size:6.1%}）")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "single_seconds": single, "mirrors_seconds": mirrored,
+                       "bytes_per_mirror": served}, f, indent=1)
+        print(f"[✓] 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+对比内存多相重采样 (mono.convert_buffer) 与原 librosa 读写路径的耗时
+
+librosa 已不在 requirements.txt 中，需要对比时另行安装（pip install librosa）；未安装时只测试内存路径。
+
+    python -m benchmarks.bench_mono [--seconds 5] [--repeat 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+import mono
+
+
+def _make_wav(path, seconds, rate, channels):
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 6000 * np.sin(2 * np.pi * 220 * t) + 1500 * np.random.randn(len(t))
+    samples = np.repeat(signal[:, None], channels, axis=1).astype(np.int16)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _librosa_path(file_path, out_dir):
+    # 复现旧版 convert_to_mono_16k：librosa 解码重采样后再写一个临时 WAV
+    import librosa
+    import soundfile as sf
+    signal, _ = librosa.load(file_path, sr=16000, mono=True)
+    out_path = os.path.join(out_dir, "librosa.wav")
+    sf.write(out_path, signal, 16000)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mono.py 重采样基准")
+    parser.add_argument("--seconds", type=float, default=5.0, help="测试音频时长（秒）")
+    parser.add_argument("--repeat", type=int, default=20, help="每项重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    try:
+        import librosa  # noqa: F401
+        has_librosa = True
+    except ImportError:
+        has_librosa = False
+        print("[!] 未安装 librosa，仅测试内存路径")
+
+    cases = [(16000, 1), (16000, 2), (44100, 1), (44100, 2), (48000, 1), (22050, 1), (8000, 1)]
+    print(f"{'输入':<14}{'内存(读+转换)':>16}{'仅转换':>12}{'librosa':>12}{'加速':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rate, channels in cases:
+            path = os.path.join(tmp, f"{rate}_{channels}.wav")
+            _make_wav(path, args.seconds, rate, channels)
+            samples, _ = mono.load_audio(path)
+
+            t_mem = _best(lambda: mono.load_mono_16k(path), args.repeat)
+            t_conv = _best(lambda: mono.convert_buffer(samples, rate), args.repeat)
+            line = f"{rate}Hz/{channels}ch".ljust(14) + f"{t_mem * 1e3:>14.2f}ms{t_conv * 1e3:>10.2f}ms"
+            if has_librosa:
+                t_lib = _best(lambda: _librosa_path(path, tmp), args.repeat)
+                line += f"{t_lib * 1e3:>10.2f}ms{t_lib / t_mem:>7.1f}x"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
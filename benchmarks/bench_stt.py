@@ -0,0 +1,280 @@
+"""
+STT 流水线基准：分阶段与端到端测量耗时、实时率 (RTF) 与峰值内存
+
+每个 (阶段, 测试音频) 组合在独立的子进程中运行，峰值 RSS 只反映该阶段本身。
+默认使用不做识别的 FakeRecognizer，无需下载模型；指定 --model 时使用真实的 Vosk 模型。
+
+    python -m benchmarks.bench_stt -o bench.json
+    python -m benchmarks.bench_stt --model Model/stt/vosk-model-small-cn-0.22 --compare bench.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class FakeModel:
+    pass
+
+
+class FakeRecognizer:
+    """
+    实现 KaldiRecognizer 接口的假识别器，只统计送入的音频帧数
+
+    每 5 秒音频“识别”出一句，使结果处理路径也被覆盖。
+    """
+
+    def __init__(self, model, sample_rate):
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self._next = 5 * sample_rate
+
+    def AcceptWaveform(self, data):
+        self.frames += len(data) // 2
+        if self.frames >= self._next:
+            self._next += 5 * self.sample_rate
+            return True
+        return False
+
+    def Result(self):
+        return json.dumps({"text": f"{self.frames}"})
+
+    def PartialResult(self):
+        return json.dumps({"partial": ""})
+
+    def FinalResult(self):
+        return json.dumps({"text": f"{self.frames}"})
+
+
+def make_fixture(path, seconds, rate, channels, seed=0):
+    """生成带音节包络的谐波信号加噪声的 16 位 WAV"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    phase = 2 * np.pi * np.cumsum(130 + 25 * np.sin(2 * np.pi * 0.5 * t)) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None)
+    signal = 5000 * voiced * envelope + 200 * rng.standard_normal(len(t))
+    samples = np.repeat(signal[:, None], channels, axis=1).astype(np.int16)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+
+
+def _peak_rss_mb():
+    # Linux 上优先读取 VmHWM：ru_maxrss 会跨 exec 继承父进程的峰值
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _make_stt(model_path):
+    from stt import STT
+    if model_path:
+        return STT(model_path=model_path)
+    return STT(model=FakeModel(), recognizer_factory=FakeRecognizer)
+
+
+def _decode(stt, samples, rate):
+    rec = stt.recognizer_factory(stt.model, rate)
+    data = samples.tobytes()
+    for i in range(0, len(data), 8000):
+        if rec.AcceptWaveform(data[i:i + 8000]):
+            rec.Result()
+    return rec.FinalResult()
+
+
+# 每个阶段为 (setup, run)：setup 不计时，返回 run 的参数
+def _stage_wav_read(path, opts):
+    import mono
+    return lambda: mono.load_audio(path)
+
+
+def _stage_convert(path, opts):
+    import mono
+    samples, rate = mono.load_audio(path)
+    return lambda: mono.convert_buffer(samples, rate)
+
+
+def _stage_wav_write(path, opts):
+    import mono
+    samples = mono.load_mono_16k(path)
+    out = os.path.join(opts["tmp"], f"out_{os.getpid()}.wav")
+
+    def run():
+        with wave.open(out, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(samples.tobytes())
+    return run
+
+
+def _stage_decode(path, opts):
+    import mono
+    samples = mono.load_mono_16k(path)
+    stt = _make_stt(opts["model"])
+    return lambda: _decode(stt, samples, 16000)
+
+
+def _stage_capture(path, opts):
+    # 以模拟音频源回放测试音频，测量回调、队列与 VAD 的开销（不按实时节奏）
+    import asyncio
+    import mono
+    from async_record import AsyncRecorder
+    from benchmarks.fake_audio import FakeAudioSource
+    samples, rate = mono.load_audio(path)
+    channels = samples.shape[1]
+
+    async def capture():
+        recorder = AsyncRecorder(FakeAudioSource(samples, realtime=False), queue_size=1 << 16,
+                                 RATE=rate, CHANNELS=channels, CHUNK=1024)
+        async with recorder:
+            return sum([len(c) async for c in recorder.chunks()])
+    return lambda: asyncio.run(capture())
+
+
+def _stage_end_to_end(path, opts):
+    # 边读取边转换边识别，峰值内存与音频时长无关
+    stt = _make_stt(opts["model"])
+    return lambda: stt.Speech_to_Text(path, use_mono=True)
+
+
+def _stage_batch(path, opts):
+    # 对照：整个文件读入内存、转换后再识别
+    import mono
+    stt = _make_stt(opts["model"])
+    return lambda: _decode(stt, mono.load_mono_16k(path), 16000)
+
+
+STAGES = {
+    "wav_read": _stage_wav_read,
+    "convert": _stage_convert,
+    "wav_write": _stage_wav_write,
+    "decode": _stage_decode,
+    "capture": _stage_capture,
+    "end_to_end": _stage_end_to_end,
+    "batch": _stage_batch,
+}
+
+
+def _run_stage(stage, path, opts, queue):
+    try:
+        rss_before = _peak_rss_mb()
+        run = STAGES[stage](path, opts)
+        best = float("inf")
+        for _ in range(opts["repeat"]):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        queue.put({"wall_s": best, "peak_rss_mb": _peak_rss_mb(), "base_rss_mb": rss_before})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(stage, path, opts):
+    """在新的子进程中运行一个阶段"""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, path, opts, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def compare(current, baseline_path, tolerance):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    key = lambda r: (r["stage"], r["seconds"], r["rate"], r["channels"])
+    old = {key(r): r for r in baseline["results"] if "wall_s" in r}
+    regressions = 0
+    print(f"\n与 {baseline_path} 对比（容差 {tolerance * 100:.0f}%）:")
+    for r in current:
+        if key(r) not in old or "wall_s" not in r:
+            continue
+        ratio = r["wall_s"] / old[key(r)]["wall_s"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  <-- 变慢"
+            regressions += 1
+        print(f"  {r['stage']:<11}{r['seconds']:>6}s {r['rate']:>6}Hz {r['channels']}ch  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STT 流水线基准")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5, 30, 120], help="测试音频时长")
+    parser.add_argument("--rates", type=int, nargs="+", default=[16000, 44100, 48000], help="采样率")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2], help="声道数")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最快一次）")
+    parser.add_argument("--model", default=None, help="Vosk 模型路径（默认使用假识别器）")
+    parser.add_argument("-o", "--output", default=None, help="结果 JSON 文件")
+    parser.add_argument("--compare", default=None, help="与之前保存的结果 JSON 对比")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="判定变慢的相对容差")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        opts = {"model": args.model, "repeat": args.repeat, "tmp": tmp}
+        print(f"{'阶段':<11}{'时长':>7}{'采样率':>8}{'声道':>4}{'耗时':>11}{'RTF':>9}{'峰值RSS':>10}")
+        for seconds, rate, channels in itertools.product(args.seconds, args.rates, args.channels):
+            path = os.path.join(tmp, f"{seconds}s_{rate}_{channels}.wav")
+            make_fixture(path, seconds, rate, channels)
+            for stage in args.stages:
+                r = {"stage": stage, "seconds": seconds, "rate": rate, "channels": channels}
+                r.update(run_isolated(stage, path, opts))
+                if "wall_s" in r:
+                    r["rtf"] = r["wall_s"] / seconds
+                    rss = f"{r['peak_rss_mb']:.0f}MB" if r["peak_rss_mb"] is not None else "-"
+                    print(f"{stage:<11}{seconds:>6}s{rate:>8}{channels:>4}"
+                          f"{r['wall_s'] * 1e3:>9.1f}ms{r['rtf']:>9.5f}{rss:>10}")
+                else:
+                    print(f"{stage:<11}{seconds:>6}s{rate:>8}{channels:>4}  失败: {r['error']}")
+                results.append(r)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "recognizer": args.model or "fake",
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+识别服务并发基准：进程内启动 stt_server，多个客户端同时送入合成音频
+
+默认使用 bench_stt 的 FakeRecognizer（可用 --cost 模拟解码耗时，按音频时长比例 sleep，
+与 Vosk 一样不占用 GIL），无需下载模型；指定 --model 时使用真实的 Vosk 模型。
+会话数超过 --max-sessions 的客户端排队，排队超过 --admission-timeout 的被拒绝。
+
+    python -m benchmarks.bench_stt_server [--clients 16] [--max-sessions 8] [--seconds 10] [--realtime]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import stt_server
+from benchmarks.bench_stt import FakeModel, FakeRecognizer
+
+
+class SlowRecognizer(FakeRecognizer):
+    """每送入 1 秒音频耗时 cost 秒，并给出随音频增长的中间结果"""
+    cost = 0.0
+
+    def AcceptWaveform(self, data):
+        if self.cost:
+            time.sleep(self.cost * len(data) / 2 / self.sample_rate)
+        return super().AcceptWaveform(data)
+
+    def PartialResult(self):
+        return json.dumps({"partial": f"{self.frames // self.sample_rate}s"})
+
+
+def _signal(seconds, rate, seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    voiced = np.sin(2 * np.pi * 150 * t) * np.clip(np.sin(2 * np.pi * 3 * t), 0, None)
+    return (5000 * voiced + 200 * rng.standard_normal(len(t))).astype(np.int16).tobytes()
+
+
+async def _client(address, data, realtime, index):
+    async def chunks():
+        step = stt_server.CHUNK_BYTES
+        for i in range(0, len(data), step):
+            yield data[i:i + step]
+            if realtime:
+                await asyncio.sleep(step / 2 / 16000)
+
+    partials = []
+    start = time.perf_counter()
+    try:
+        result = await stt_server.recognize(address, chunks(), on_result=partials.append)
+    except stt_server.ServerBusy:
+        return {"client": index, "rejected": True, "elapsed": time.perf_counter() - start}
+    return {"client": index, "rejected": False, "elapsed": time.perf_counter() - start,
+            "results": len(partials), **result["stats"]}
+
+
+async def run(args):
+    from stt import STT
+    if args.model:
+        stt = STT(model_path=args.model)
+    else:
+        SlowRecognizer.cost = args.cost
+        stt = STT(model=FakeModel(), recognizer_factory=SlowRecognizer)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        address = args.listen or f"unix:{os.path.join(tmp, 'stt.sock')}"
+        server = stt_server.STTServer(stt, args.max_sessions, args.workers, args.admission_timeout)
+        async with await server.start(address):
+            data = _signal(args.seconds, 16000, 0)
+            start = time.perf_counter()
+            results = await asyncio.gather(*(_client(server.address, data, args.realtime, i)
+                                             for i in range(args.clients)))
+            wall = time.perf_counter() - start
+            stats = server.stats()
+    return results, wall, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stt_server 并发基准")
+    parser.add_argument("--clients", type=int, default=16, help="同时连接的客户端数")
+    parser.add_argument("--max-sessions", type=int, default=8, help="服务端会话数上限")
+    parser.add_argument("--workers", type=int, default=None, help="服务端解码线程数")
+    parser.add_argument("--admission-timeout", type=float, default=30.0, help="排队超时（秒）")
+    parser.add_argument("--seconds", type=float, default=10.0, help="每个客户端的音频时长（秒）")
+    parser.add_argument("--cost", type=float, default=0.05, help="FakeRecognizer 每秒音频的解码耗时（秒）")
+    parser.add_argument("--realtime", action="store_true", help="客户端按实时速度送入音频（模拟麦克风）")
+    parser.add_argument("--model", help="使用真实的 Vosk 模型")
+    parser.add_argument("--listen", help="监听地址，默认为临时目录中的 Unix 套接字")
+    args = parser.parse_args()
+
+    results, wall, stats = asyncio.run(run(args))
+    served = [r for r in results if not r["rejected"]]
+    print(f"[-] {args.clients} 个客户端，会话上限 {args.max_sessions}，每个 {args.seconds:g}s 音频，"
+          f"{'实时' if args.realtime else '尽快'}送入")
+    print("客户端  排队(s)  首个结果(s)  块延迟p50(ms)  p95(ms)  max(ms)  会话耗时(s)")
+    for r in results:
+        if r["rejected"]:
+            print(f"{r['client']:>6}  被拒绝（排队 {r['elapsed']:.2f}s）")
+            continue
+        first = f"{r['first_result']:.3f}" if r["first_result"] is not None else "-"
+        print(f"{r['client']:>6}{r['queued']:>9.2f}{first:>13}{r['latency_p50'] * 1000:>15.1f}"
+              f"{r['latency_p95'] * 1000:>9.1f}{r['latency_max'] * 1000:>9.1f}{r['elapsed']:>11.2f}")
+    audio = sum(r["audio_seconds"] for r in served)
+    print(f"[-] 完成 {len(served)} 个会话，拒绝 {stats['rejected']} 个；总音频 {audio:.0f}s，"
+          f"墙钟 {wall:.2f}s（{audio / wall:.1f}x 实时）")
+
+
+if __name__ == "__main__":
+    main()
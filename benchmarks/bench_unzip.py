@@ -0,0 +1,77 @@
+"""
+对比并行解压 (unzip.unzip) 与逐个 extract 的耗时，使用合成的“大量小文件”压缩包
+
+    python -m benchmarks.bench_unzip [--files 5000] [--large-mb 64] [--threads 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+import zipfile
+
+import unzip
+
+
+def _make_zip(path, files, large_mb, seed=0):
+    rng = random.Random(seed)
+    words = [bytes(rng.choices(b"abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 10))) for _ in range(2000)]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(files):
+            text = b" ".join(rng.choices(words, k=rng.randint(50, 1500)))
+            zf.writestr(f"model/conf/{i // 500}/{i}.txt", text)
+        for i in range(4):
+            # 可压缩但不平凡的大文件，模拟模型中的图和声学模型
+            block = b" ".join(rng.choices(words, k=200_000))
+            data = (block * (large_mb * 1024 * 1024 // 4 // len(block) + 1))[:large_mb * 1024 * 1024 // 4]
+            zf.writestr(f"model/graph/part{i}.bin", data)
+
+
+def _serial(zip_path, out_dir):
+    # 复现旧版 unzip.unzip：逐个 extract，每个条目打印一行
+    with zipfile.ZipFile(zip_path) as zf, contextlib.redirect_stdout(io.StringIO()):
+        names = zf.namelist()
+        for i, name in enumerate(names, 1):
+            zf.extract(name, out_dir)
+            print(f"[{i}/{len(names)}] unzip: {name}")
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="unzip.py 并行解压基准")
+    parser.add_argument("--files", type=int, default=5000, help="小文件数量")
+    parser.add_argument("--large-mb", type=int, default=64, help="大文件总大小（MB）")
+    parser.add_argument("--threads", type=int, default=None, help="解压线程数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = os.path.join(tmp, "synthetic.zip")
+        _make_zip(zip_path, args.files, args.large_mb)
+        with zipfile.ZipFile(zip_path) as zf:
+            total = sum(i.file_size for i in zf.infolist())
+        print(f"[-] 压缩包: {args.files + 4} 个条目，解压后 {total / 1024 / 1024:.1f}MB，"
+              f"压缩包 {os.path.getsize(zip_path) / 1024 / 1024:.1f}MB")
+
+        serial_dir = os.path.join(tmp, "serial")
+        parallel_dir = os.path.join(tmp, "parallel")
+        t_serial = _timed(lambda: _serial(zip_path, serial_dir))
+        t_parallel = _timed(lambda: unzip.unzip(zip_path, parallel_dir, args.threads, progress=False))
+        t_again = _timed(lambda: unzip.unzip(zip_path, parallel_dir, args.threads, progress=False))
+        shutil.rmtree(serial_dir)
+
+        print(f"{'逐个 extract':<16}{t_serial:>8.2f}s")
+        print(f"{'并行解压':<16}{t_parallel:>8.2f}s{t_serial / t_parallel:>7.1f}x")
+        print(f"{'重复解压(跳过)':<16}{t_again:>8.2f}s{t_serial / t_again:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+在合成的语音+噪声信号上测量 VAD 每个数据块的耗时与检测效果
+
+    python -m benchmarks.bench_vad [--snr 10] [--rate 44100] [--chunk 1024]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from vad import VAD
+
+
+def synth_speech(seconds, rate, rng):
+    """用带音节包络的谐波信号模拟浊音语音"""
+    t = np.arange(int(seconds * rate)) / rate
+    f0 = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None) ** 0.5
+    return 4000 * voiced * syllables
+
+
+def build_signal(rate, snr_db, rng):
+    """
+    交替的噪声段与语音段
+
+    Returns:
+        (int16 信号, 每个样本是否为语音的标记)
+    """
+    layout = [(1.0, False), (2.0, True), (1.5, False), (1.0, True), (3.0, False), (2.5, True), (1.0, False)]
+    parts, labels = [], []
+    for seconds, speech in layout:
+        n = int(seconds * rate)
+        parts.append(synth_speech(seconds, rate, rng) if speech else np.zeros(n))
+        labels.append(np.full(n, speech))
+    clean = np.concatenate(parts)
+    speech_power = np.mean(clean[np.concatenate(labels)] ** 2)
+    noise = rng.standard_normal(len(clean)) * np.sqrt(speech_power / 10 ** (snr_db / 10))
+    signal = np.clip(clean + noise, -32768, 32767).astype(np.int16)
+    return signal, np.concatenate(labels)
+
+
+def peak_db(data):
+    # 旧版 record_wav 的判据：块内峰值的分贝
+    amplitude = np.abs(np.frombuffer(data, dtype=np.int16))
+    return 20 * np.log10(np.max(amplitude) if np.max(amplitude) > 0 else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VAD 基准")
+    parser.add_argument("--snr", type=float, default=10.0, help="语音与噪声的信噪比 (dB)")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=1024)
+    parser.add_argument("--threshold", type=float, default=50.0, help="开始阈值 (dB)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    signal, labels = build_signal(args.rate, args.snr, rng)
+    n_chunks = len(signal) // args.chunk
+    chunks = [signal[i * args.chunk:(i + 1) * args.chunk].tobytes() for i in range(n_chunks)]
+    truth = labels[:n_chunks * args.chunk].reshape(n_chunks, -1).mean(axis=1) > 0.5
+
+    vad = VAD(args.rate, args.chunk, threshold_db=args.threshold, hangover=0.3)
+    start = time.perf_counter()
+    detected = np.array([vad.is_speech(c) for c in chunks])
+    t_vad = (time.perf_counter() - start) / n_chunks
+
+    start = time.perf_counter()
+    for c in chunks:
+        peak_db(c)
+    t_peak = (time.perf_counter() - start) / n_chunks
+
+    # 完整状态机（含预录缓冲与拖尾）：统计首次触发相对真实语音起点的位置
+    vad.reset()
+    start = time.perf_counter()
+    first_trigger = None
+    for i, c in enumerate(chunks):
+        kept = vad.process(c)
+        if kept and first_trigger is None:
+            first_trigger = i
+            pre_roll_bytes = sum(len(k) for k in kept) - len(c)
+    t_process = (time.perf_counter() - start) / n_chunks
+
+    chunk_ms = args.chunk / args.rate * 1000
+    onset = int(np.argmax(truth))
+    print(f"信号: {len(signal) / args.rate:.1f}s, {n_chunks} 块 x {chunk_ms:.1f}ms, SNR {args.snr:.0f}dB")
+    print(f"每块耗时: VAD 特征 {t_vad * 1e6:.1f}us, 完整 process {t_process * 1e6:.1f}us, 旧峰值判据 {t_peak * 1e6:.1f}us")
+    print(f"实时占比: {t_process * 1000 / chunk_ms * 100:.3f}%")
+    print(f"块级准确率: {np.mean(detected == truth) * 100:.1f}%  "
+          f"(漏检 {np.sum(truth & ~detected)}, 误检 {np.sum(~truth & detected)})")
+    if first_trigger is not None:
+        print(f"首次触发: 第 {first_trigger} 块（真实起点第 {onset} 块），"
+              f"预录 {pre_roll_bytes // 2 / args.rate * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+模拟 pyaudio.PyAudio 的音频源，供基准与测试在没有声卡的环境中驱动 async_record.AsyncRecorder
+
+    recorder = AsyncRecorder(FakeAudioSource(samples, realtime=False), CHUNK=1024)
+"""
+import threading
+import time
+
+import numpy as np
+
+from async_record import paContinue
+
+
+class FakeAudioSource:
+    """
+    模拟 pyaudio.PyAudio 的音频源，用于没有声卡的环境
+
+    open() 返回的流在后台线程中按块调用 stream_callback，数据来自给定的 int16 信号，
+    realtime 为 True 时按实际时长节奏送出。
+
+    Args:
+        signal: int16 数组或 bytes（交错排列的多声道数据）
+        realtime: 是否按实时速度送出数据
+        loop: 信号结束后是否从头循环
+    """
+
+    def __init__(self, signal, realtime=True, loop=False):
+        if isinstance(signal, (bytes, bytearray)):
+            signal = np.frombuffer(signal, dtype=np.int16)
+        self.signal = np.asarray(signal, dtype=np.int16).reshape(-1)
+        self.realtime = realtime
+        self.loop = loop
+
+    def get_sample_size(self, format):
+        return 2
+
+    def open(self, format=None, channels=1, rate=16000, input=True,
+             frames_per_buffer=1024, stream_callback=None, start=True, **kwargs):
+        stream = _FakeStream(self, channels, rate, frames_per_buffer, stream_callback)
+        if start:
+            stream.start_stream()
+        return stream
+
+    def terminate(self):
+        pass
+
+
+class _FakeStream:
+    def __init__(self, source, channels, rate, chunk, callback):
+        self._source = source
+        self._channels = channels
+        self._rate = rate
+        self._chunk = chunk
+        self._callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        signal = self._source.signal
+        step = self._chunk * self._channels
+        pos = 0
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            if pos + step > len(signal):
+                if not self._source.loop:
+                    break
+                pos = 0
+            data = signal[pos:pos + step].tobytes()
+            pos += step
+            if self._source.realtime:
+                next_time += self._chunk / self._rate
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            _, flag = self._callback(data, self._chunk, {}, 0)
+            if flag != paContinue:
+                break
+        self._stop.set()
+
+    def start_stream(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop_stream(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def is_active(self):
+        return not self._stop.is_set()
+
+    def close(self):
+        self.stop_stream()
@@ -0,0 +1,211 @@
+"""
+基准测试用的本地 HTTP 服务器
+
+在后台线程中提供一个内存中的文件，支持 Range、ETag/Last-Modified 条件请求，
+可设置每个请求的延迟（模拟 RTT）、每个连接的带宽和服务器总带宽，
+并可按比例注入故障：返回 503，或发送一半内容后断开连接。
+
+    with RangeServer(data, latency=0.05, conn_bandwidth=2 * 1024 * 1024) as server:
+        dl_file.download_file(server.url, ...)
+
+    python -m benchmarks.local_http --size-mb 64 --latency 0.05 --conn-mbps 2
+"""
+import email.utils
+import hashlib
+import http.server
+import random
+import re
+import threading
+import time
+
+from dl_manager import TokenBucket
+
+SEND_SIZE = 16 * 1024  # 每次发送的字节数（带宽限制的粒度）
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "BenchHTTP/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self, status, length, extra=()):
+        srv = self.server
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", srv.etag)
+        self.send_header("Last-Modified", srv.last_modified)
+        for name, value in extra:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _parse_range(self):
+        size = len(self.server.data)
+        m = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+        if not m or not self.server.ranges:
+            return None
+        if m.group(1):
+            start, end = int(m.group(1)), int(m.group(2) or size - 1)
+        else:
+            start, end = size - int(m.group(2)), size - 1
+        return max(0, start), min(end, size - 1)
+
+    def _not_modified(self):
+        srv = self.server
+        if self.headers.get("If-None-Match"):
+            return self.headers["If-None-Match"] == srv.etag
+        return self.headers.get("If-Modified-Since") == srv.last_modified
+
+    def do_HEAD(self):
+        self.server.requests += 1
+        if self.path != self.server.path:
+            self._send_headers(404, 0)
+            return
+        self._send_headers(200, len(self.server.data))
+
+    def do_GET(self):
+        srv = self.server
+        srv.requests += 1
+        if self.path != srv.path:
+            self._send_headers(404, 0)
+            return
+        if srv.latency:
+            time.sleep(srv.latency)
+        fault = srv.pick_fault()
+        if fault == "error":
+            self._send_headers(503, 0)
+            return
+        if self._not_modified():
+            self._send_headers(304, 0)
+            return
+        rng = self._parse_range()
+        if rng is None:
+            start, end = 0, len(srv.data) - 1
+            self._send_headers(200, len(srv.data))
+        else:
+            start, end = rng
+            self._send_headers(206, end - start + 1, [("Content-Range", f"bytes {start}-{end}/{len(srv.data)}")])
+
+        view = memoryview(srv.data)
+        pos = start
+        if fault == "drop":
+            # 只发送一半内容就断开，客户端收到的响应体比 Content-Length 短
+            end = start + (end - start) // 2
+            self.close_connection = True
+        next_send = time.monotonic()
+        try:
+            while pos <= end:
+                n = min(SEND_SIZE, end - pos + 1)
+                if srv.total_limiter is not None:
+                    srv.total_limiter.consume(n)
+                if srv.conn_bandwidth:
+                    # 按连接限速：按计划时间发送，模拟单个 TCP 连接的吞吐上限
+                    next_send += n / srv.conn_bandwidth
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.wfile.write(view[pos:pos + n])
+                pos += n
+                srv.bytes_sent += n
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class RangeServer(http.server.ThreadingHTTPServer):
+    """
+    Args:
+        data: 提供下载的内容
+        latency: 每个 GET 请求在返回响应头之前的延迟（秒）
+        conn_bandwidth: 每个连接的带宽上限（字节/秒），为空时不限
+        total_bandwidth: 服务器总带宽上限（字节/秒），为空时不限
+        ranges: 是否支持 Range 请求
+        path: 文件的 URL 路径
+        port: 监听端口，0 表示随机
+        fail_rate: GET 请求直接返回 503 的比例
+        drop_rate: GET 请求发送一半内容后断开连接的比例
+        seed: 故障注入的随机种子
+    """
+
+    daemon_threads = True
+
+    def __init__(self, data, latency=0.0, conn_bandwidth=None, total_bandwidth=None,
+                 ranges=True, path="/file.bin", port=0, fail_rate=0.0, drop_rate=0.0, seed=None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.data = data
+        self.latency = latency
+        self.conn_bandwidth = conn_bandwidth
+        self.total_limiter = TokenBucket(total_bandwidth, SEND_SIZE * 4) if total_bandwidth else None
+        self.ranges = ranges
+        self.path = path
+        self.etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        self.last_modified = email.utils.formatdate(usegmt=True)
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.faults = {"error": 0, "drop": 0}  # 已注入的故障次数
+        self._random = random.Random(seed)
+        self._fault_lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self._thread = None
+
+    def pick_fault(self):
+        """按比例决定本次请求注入的故障："error"、"drop" 或 None"""
+        if not self.fail_rate and not self.drop_rate:
+            return None
+        with self._fault_lock:
+            x = self._random.random()
+            fault = "error" if x < self.fail_rate else "drop" if x < self.fail_rate + self.drop_rate else None
+            if fault:
+                self.faults[fault] += 1
+        return fault
+
+    def handle_error(self, request, client_address):
+        # 客户端关闭空闲的 keep-alive 连接属于正常情况，不打印堆栈
+        import sys
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}{self.path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    parser = argparse.ArgumentParser(description="本地 Range HTTP 服务器（基准测试用）")
+    parser.add_argument("--size-mb", type=float, default=64, help="文件大小（MB，随机内容）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument("--conn-mbps", type=float, default=None, help="每个连接的带宽上限（MB/s）")
+    parser.add_argument("--total-mbps", type=float, default=None, help="总带宽上限（MB/s）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="返回 503 的请求比例")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="发送一半后断开的请求比例")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    server = RangeServer(os.urandom(int(args.size_mb * mb)), args.latency,
+                         args.conn_mbps and args.conn_mbps * mb, args.total_mbps and args.total_mbps * mb,
+                         port=args.port, fail_rate=args.fail_rate, drop_rate=args.drop_rate)
+    print(f"[-] {server.url}  (Ctrl+C 退出)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
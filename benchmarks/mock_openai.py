@@ -0,0 +1,180 @@
+"""
+基准测试用的本地 OpenAI 兼容接口
+
+在后台线程中提供 /v1/chat/completions（流式 SSE 与非流式）和 /v1/models，
+可设置首个 token 的延迟、生成速度与回复长度；每个新连接先等待 handshake 秒，模拟 TCP/TLS 握手的开销。
+统计收到的连接数、请求数，以及客户端中途断开（取消）的流式回复数。
+
+    with MockOpenAIServer(ttft=0.2, tokens_per_second=50) as server:
+        client = chat.ChatClient(base_url=server.base_url, api_key="mock")
+
+    python -m benchmarks.mock_openai --port 8000 --ttft 0.2 --tps 50
+"""
+import http.server
+import itertools
+import json
+import threading
+import time
+
+REPLY = "好的，我来回答这个问题。首先需要说明的是，这只是本地模拟服务返回的一段示例回复，用于测量延迟与吞吐量。"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOpenAI/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        srv = self.server
+        with srv.lock:
+            srv.connections += 1
+        if srv.handshake:
+            time.sleep(srv.handshake)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_event(self, body):
+        payload = body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)
+        self._write_chunk(f"data: {payload}\n\n".encode())
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": srv.model, "object": "model", "created": 0, "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+        model = request.get("model") or srv.model
+        n_tokens = min(request.get("max_tokens") or srv.tokens, srv.tokens)
+        tokens = list(itertools.islice(itertools.cycle(REPLY), n_tokens))
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens,
+                 "total_tokens": prompt_tokens + n_tokens}
+        base = {"id": f"chatcmpl-mock-{srv.requests}", "created": int(time.time()), "model": model}
+
+        if not request.get("stream"):
+            time.sleep(srv.ttft + n_tokens / srv.tokens_per_second)
+            self._send_json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk = {**base, "object": "chat.completion.chunk"}
+        try:
+            time.sleep(srv.ttft)
+            next_send = time.monotonic()
+            for i, token in enumerate(tokens):
+                delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                self._send_event({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                next_send += 1 / srv.tokens_per_second
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self._send_event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._send_event({**chunk, "choices": [], "usage": usage})
+            self._send_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with srv.lock:
+                srv.cancelled += 1
+            self.close_connection = True
+
+
+class MockOpenAIServer(http.server.ThreadingHTTPServer):
+    """
+    Args:
+        ttft: 收到请求到发出第一个 token 的延迟（秒）
+        tokens_per_second: 之后的生成速度
+        tokens: 每次回复的 token 数（请求中的 max_tokens 更小时以其为准）
+        handshake: 每个新连接在处理第一个请求前的延迟（秒），模拟握手开销
+        model: /models 返回的模型名
+        port: 监听端口，0 表示随机
+    """
+
+    daemon_threads = True
+
+    def __init__(self, ttft=0.2, tokens_per_second=50.0, tokens=60, handshake=0.0, model="mock-chat", port=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.handshake = handshake
+        self.model = model
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.cancelled = 0
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # 客户端关闭空闲的 keep-alive 连接属于正常情况，不打印堆栈
+        import sys
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容接口（基准测试用）")
+    parser.add_argument("--ttft", type=float, default=0.2, help="首个 token 的延迟（秒）")
+    parser.add_argument("--tps", type=float, default=50, help="生成速度（tokens/s）")
+    parser.add_argument("--tokens", type=int, default=60, help="每次回复的 token 数")
+    parser.add_argument("--handshake", type=float, default=0.0, help="每个新连接的握手延迟（秒）")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.ttft, args.tps, args.tokens, args.handshake, port=args.port)
+    print(f"[-] {server.base_url}  (Ctrl+C 退出)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,285 @@
+"""
+流式对话客户端（OpenAI 兼容接口，使用 config.toml 中的 [ai] 配置）
+
+- 流式返回：模型生成的每一段文字一到达就产出，语音助手可以边生成边朗读，不必等整段回复
+- 连接复用：一个 ChatClient 持有一个 httpx 连接池，多轮对话之间保持 keep-alive，不再重复 TCP/TLS 握手；
+  warmup() 可以在用户说话时提前建立连接，识别结束后请求立即发出
+- 超时与取消：first_token_timeout 限制等待第一段回复的时间，timeout 限制流中两段数据之间的间隔；
+  取消正在读取回复的任务会立即关闭这次请求的连接，已经产出的部分回复仍记入对话历史（用户打断时）
+- 指标：首个 token 的延迟 (TTFT) 与生成速度 (tokens/s) 经 metrics 记录，也保存在 ChatClient.last_stats
+
+    python chat.py [问题] [--think] [--base-url http://127.0.0.1:8000/v1] [--model 模型名]
+"""
+import argparse
+import asyncio
+import contextlib
+import sys
+import time
+import metrics
+from settings import load_config
+
+CONNECT_TIMEOUT = 5.0  # 建立连接的超时（秒）
+MAX_CONNECTIONS = 8  # 连接池中的连接数上限
+KEEPALIVE_SECONDS = 120.0  # 空闲连接的保留时间（秒），超过后下一轮对话需要重新握手
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _openai():
+    # openai 导入较慢，只在创建客户端时导入
+    import openai
+    return openai
+
+
+class ChatClient:
+    """
+    Args:
+        api_key: 默认取 [ai] api_key
+        base_url: 默认取 [ai] base_url
+        model: 默认使用的模型，默认取 [ai] model.chatmodel
+        think_model: think=True 时使用的模型，默认取 [ai] model.thinkmodel
+        timeout: 流中两段数据之间的最长等待（秒），默认取 [ai] timeout
+        first_token_timeout: 发出请求后等待第一段回复的最长时间（秒），默认取 [ai] first_token_timeout
+        max_retries: 连接失败或服务端返回 429/5xx 时的重试次数（只在收到回复之前重试）
+    """
+
+    def __init__(self, api_key=None, base_url=None, model=None, think_model=None,
+                 timeout=None, first_token_timeout=None, max_retries=2):
+        import httpx
+        config = load_config().ai
+        self.model = model or config.model.get("chatmodel", "")
+        self.think_model = think_model or config.model.get("thinkmodel") or self.model
+        self.timeout = config.timeout if timeout is None else timeout
+        self.first_token_timeout = config.first_token_timeout if first_token_timeout is None else first_token_timeout
+        self.last_stats = None
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS,
+                                keepalive_expiry=KEEPALIVE_SECONDS),
+        )
+        self._client = _openai().AsyncOpenAI(
+            api_key=api_key or config.api_key,
+            base_url=base_url or config.base_url or None,
+            timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT),
+            max_retries=max_retries,
+            http_client=self._http,
+        )
+
+    async def warmup(self):
+        """
+        提前建立到服务端的连接（请求模型列表，失败时忽略），之后的对话请求直接复用该连接
+
+        Returns:
+            是否成功
+        """
+        try:
+            await self._client.models.list()
+        except _openai().APIError:
+            return False
+        return True
+
+    async def stream(self, messages, think=False, model=None, first_token_timeout=None, **params):
+        """
+        发送一次对话请求并流式读取回复
+
+        Args:
+            messages: OpenAI 格式的消息列表
+            think: 是否使用推理模型（[ai] model.thinkmodel）
+            model: 指定模型，优先于 think
+            first_token_timeout: 本次请求的首段回复超时（秒），默认为构造时的设置
+            params: 其他请求参数，如 temperature、max_tokens
+
+        Yields:
+            {"text": 片段} 回复内容，或 {"reasoning": 片段} 推理模型的思考过程（如 deepseek-reasoner）
+
+        Raises:
+            TimeoutError: 超过 first_token_timeout 仍未收到回复
+            openai.APIError: 请求失败（连接失败、认证失败、读超时等）
+        """
+        model = model or (self.think_model if think else self.model)
+        if first_token_timeout is None:
+            first_token_timeout = self.first_token_timeout
+        start = time.perf_counter()
+        first = None
+        pieces = 0
+        usage = None
+        stream = None
+        cancelled = False
+        try:
+            async with asyncio.timeout(first_token_timeout) as deadline:
+                # stream_options 经 extra_body 传递，旧版本的 openai 库同样可用
+                stream = await self._client.chat.completions.create(
+                    model=model, messages=messages, stream=True,
+                    extra_body={"stream_options": {"include_usage": True}}, **params)
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    for kind, piece in (("reasoning", getattr(delta, "reasoning_content", None)),
+                                        ("text", delta.content)):
+                        if not piece:
+                            continue
+                        if first is None:
+                            # 收到第一段回复后不再限制总时长，之后只受读超时限制
+                            first = time.perf_counter()
+                            deadline.reschedule(None)
+                        pieces += 1
+                        yield {kind: piece}
+        except TimeoutError:
+            if first is None:
+                raise TimeoutError(f"{first_token_timeout:g} 秒内没有收到 {model} 的回复") from None
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            cancelled = True
+            raise
+        finally:
+            if stream is not None:
+                # 未读完的响应会关闭其连接，不会放回连接池
+                await stream.response.aclose()
+            self._record(model, start, first, usage.completion_tokens if usage else pieces, cancelled)
+
+    def _record(self, model, start, first, tokens, cancelled):
+        end = time.perf_counter()
+        stats = {"model": model, "elapsed": end - start, "ttft": None, "tokens": tokens,
+                 "tokens_per_second": None, "cancelled": cancelled}
+        if first is not None:
+            stats["ttft"] = first - start
+            metrics.observe("chat_ttft_seconds", stats["ttft"], model=model)
+            if end > first and tokens > 1:
+                # 第一个 token 的时间计入 TTFT，生成速度按之后的 token 计算
+                stats["tokens_per_second"] = (tokens - 1) / (end - first)
+                metrics.observe("chat_tokens_per_second", stats["tokens_per_second"],
+                                buckets=TOKENS_PER_SECOND_BUCKETS, model=model)
+        metrics.inc("chat_completion_tokens_total", tokens, model=model)
+        if cancelled:
+            metrics.inc("chat_cancelled_total", model=model)
+        self.last_stats = stats
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self._http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class ChatSession:
+    """
+    多轮对话：保存对话历史，每轮回复以流式产出
+
+    Args:
+        client: ChatClient，默认按 [ai] 配置创建
+        system_prompt: 系统提示词，默认取 [ai] system_prompt（为空时不发送）
+        max_history_items: 保留的历史消息条数（不含系统提示词），默认取 [ai] max_history_items
+    """
+
+    def __init__(self, client=None, system_prompt=None, max_history_items=None):
+        config = load_config().ai
+        self.client = client or ChatClient()
+        self.system_prompt = config.system_prompt if system_prompt is None else system_prompt
+        self.max_history_items = config.max_history_items if max_history_items is None else max_history_items
+        self.history = []
+
+    def messages(self, text=None):
+        """系统提示词 + 历史 + 本轮的用户输入"""
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        messages.extend(self.history)
+        if text is not None:
+            messages.append({"role": "user", "content": text})
+        return messages
+
+    def _remember(self, text, answer):
+        self.history.append({"role": "user", "content": text})
+        self.history.append({"role": "assistant", "content": answer})
+        del self.history[:max(0, len(self.history) - self.max_history_items)]
+        # 历史总是从用户的消息开始
+        while self.history and self.history[0]["role"] != "user":
+            del self.history[0]
+
+    async def reply(self, text, think=False, **params):
+        """
+        发送一轮用户输入，流式产出回复
+
+        推理模型的思考过程不产出，也不记入历史。请求失败时不记入历史；
+        回复途中被取消（如用户打断）时，已经产出的部分记入历史
+
+        Args:
+            text: 用户输入
+            think: 是否使用推理模型
+            params: 传给 ChatClient.stream 的参数
+
+        Yields:
+            回复文字的片段
+        """
+        parts = []
+        completed = False
+        try:
+            async with contextlib.aclosing(self.client.stream(self.messages(text), think=think, **params)) as pieces:
+                async for piece in pieces:
+                    if "text" in piece:
+                        parts.append(piece["text"])
+                        yield piece["text"]
+            completed = True
+        finally:
+            if completed or parts:
+                self._remember(text, "".join(parts))
+
+    async def ask(self, text, think=False, **params):
+        """发送一轮用户输入并返回完整回复"""
+        return "".join([piece async for piece in self.reply(text, think, **params)])
+
+
+def _print_stats(stats):
+    if stats is None or stats["ttft"] is None:
+        return
+    speed = f"{stats['tokens_per_second']:.1f} tokens/s" if stats["tokens_per_second"] else "-"
+    print(f"[-] {stats['model']}：首个 token {stats['ttft'] * 1000:.0f}ms，{stats['tokens']} tokens，{speed}",
+          file=sys.stderr)
+
+
+async def _main(args):
+    client = ChatClient(base_url=args.base_url, model=args.model)
+    async with client:
+        session = ChatSession(client)
+        questions = [args.question] if args.question else None
+        while True:
+            if questions is not None:
+                if not questions:
+                    break
+                text = questions.pop()
+            else:
+                # 用户输入期间在后台建立连接
+                warmup = asyncio.create_task(client.warmup())
+                try:
+                    text = await asyncio.to_thread(input, "> ")
+                except EOFError:
+                    break
+                await warmup
+            if not text.strip():
+                continue
+            async for piece in session.reply(text, think=args.think):
+                print(piece, end="", flush=True)
+            print()
+            _print_stats(client.last_stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式对话（OpenAI 兼容接口）")
+    parser.add_argument("question", nargs="?", help="问题；省略时进入多轮对话，Ctrl+D 退出")
+    parser.add_argument("--think", action="store_true", help="使用推理模型（[ai] model.thinkmodel）")
+    parser.add_argument("--model", default=None, help="模型名（默认为 [ai] model.chatmodel）")
+    parser.add_argument("--base-url", default=None, help="接口地址（默认为 [ai] base_url）")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
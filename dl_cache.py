@@ -0,0 +1,241 @@
+"""
+按内容寻址的下载缓存
+
+目录结构:
+    <root>/objects/ab/abcdef...   以 SHA-256 命名的文件内容
+    <root>/tmp/                   下载中的文件（同一 URL 固定目录，中断后可续传）
+    <root>/index.json             URL -> {sha256, etag, last_modified, size, filename}
+                                  以及每个对象的大小与最近使用时间
+
+再次下载同一 URL 时先发一次带 If-None-Match / If-Modified-Since 的条件请求，
+远端未变化（304）就直接使用缓存，不再传输文件内容。
+"""
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+import dl_file
+from settings import load_config
+
+
+class DownloadCache:
+    """
+    Args:
+        root: 缓存目录，默认取 config.toml 中 [download] cache_dir
+        max_bytes: 缓存上限（字节），默认取 [download] cache_max_mb
+        session: 使用的 requests.Session，默认为 dl_file 的共享会话
+    """
+
+    def __init__(self, root=None, max_bytes=None, session=None):
+        config = load_config().download
+        self.root = pathlib.Path(root or config.cache_dir)
+        self.max_bytes = max_bytes if max_bytes is not None else int(config.cache_max_mb * 1024 * 1024)
+        self.session = session or dl_file.get_session()
+        self._lock = threading.Lock()
+        self._index_path = self.root / "index.json"
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("urls", {})
+        index.setdefault("objects", {})
+        return index
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_path.with_name(f"index.json.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self._index_path)
+
+    def object_path(self, sha256):
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def _has_object(self, sha256):
+        obj = self._index["objects"].get(sha256)
+        path = self.object_path(sha256)
+        return obj is not None and path.is_file() and path.stat().st_size == obj["size"]
+
+    def lookup(self, url):
+        """返回 URL 对应的缓存条目（对象文件已丢失时返回 None）"""
+        with self._lock:
+            entry = self._index["urls"].get(url)
+            if entry and self._has_object(entry["sha256"]):
+                return dict(entry)
+        return None
+
+    def revalidate(self, url, entry):
+        """
+        发送条件请求判断远端文件是否仍与缓存一致
+
+        Returns:
+            True 表示未变化；网络错误时也返回 True（离线时继续使用缓存）
+        """
+        headers = dict(dl_file.DEFAULT_HEADERS)
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        if len(headers) == len(dl_file.DEFAULT_HEADERS):
+            return False
+        try:
+            # stream=True：远端已变化时只读响应头就关闭，不下载内容
+            with self.session.get(url, headers=headers, stream=True, allow_redirects=True, timeout=30) as r:
+                if r.status_code == 304:
+                    return True
+                # 部分服务器忽略条件请求头，ETag 相同时同样视为未变化
+                etag = r.headers.get("ETag", "")
+                return r.ok and bool(etag) and etag == entry.get("etag")
+        except requests.RequestException as e:
+            print(f"[无法验证缓存，使用已缓存的文件] {e}")
+            return True
+
+    def put(self, path, url=None, etag="", last_modified="", filename=None, sha256=None):
+        """
+        把文件移入缓存
+
+        Args:
+            path: 待缓存的文件，移入后原路径不再存在
+            url: 关联的 URL（可选）
+            etag/last_modified: 远端校验信息，用于下次条件请求
+            filename: 原始文件名，默认取 path 的文件名
+            sha256: 已知的 SHA-256，为空时重新计算
+
+        Returns:
+            文件内容的 SHA-256
+        """
+        if sha256 is None:
+            with open(path, "rb") as f:
+                sha256 = hashlib.file_digest(f, "sha256").hexdigest()
+        size = os.path.getsize(path)
+        target = self.object_path(sha256)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+        with self._lock:
+            self._index["objects"][sha256] = {"size": size, "last_used": time.time()}
+            if url is not None:
+                self._index["urls"][url] = {
+                    "sha256": sha256,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "size": size,
+                    "filename": filename or os.path.basename(path),
+                }
+            self._evict(keep=sha256)
+            self._save_index()
+        return sha256
+
+    def _touch(self, sha256):
+        with self._lock:
+            self._index["objects"][sha256]["last_used"] = time.time()
+            self._save_index()
+
+    def _evict(self, keep=None):
+        """超出上限时按最近使用时间删除对象（调用方持有锁），keep 指定的对象不删除"""
+        objects = self._index["objects"]
+        total = sum(obj["size"] for obj in objects.values())
+        for sha256, obj in sorted(objects.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            self.object_path(sha256).unlink(missing_ok=True)
+            del objects[sha256]
+            total -= obj["size"]
+        # 删除指向已淘汰对象的 URL 条目
+        self._index["urls"] = {url: e for url, e in self._index["urls"].items() if e["sha256"] in objects}
+
+    def total_size(self):
+        with self._lock:
+            return sum(obj["size"] for obj in self._index["objects"].values())
+
+    def materialize(self, sha256, save_path):
+        """
+        把缓存对象放到 save_path：优先硬链接（不占额外空间），跨设备等情况下退回复制
+
+        不要原地修改通过硬链接得到的文件，否则缓存内容会一起改变；删除它不影响缓存。
+        """
+        source = self.object_path(sha256)
+        os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+        if os.path.exists(save_path):
+            if os.path.samefile(source, save_path):
+                return save_path
+            os.remove(save_path)
+        try:
+            os.link(source, save_path)
+        except OSError:
+            shutil.copyfile(source, save_path)
+        return save_path
+
+    def fetch(self, url, save_path=None, expected_sha256=None, revalidate=True, **download_kwargs):
+        """
+        经缓存下载文件
+
+        Args:
+            url: 文件URL
+            save_path: 保存路径（文件或目录），与 dl_file.download_file 相同
+            expected_sha256: 期望的 SHA-256（可选）；缓存中已有该内容时不发任何请求
+            revalidate: 为 False 时命中缓存即直接使用，不发条件请求
+            **download_kwargs: 传给 dl_file.download_file 的其他参数
+
+        Returns:
+            保存的文件路径
+        """
+        entry = self.lookup(url)
+        if expected_sha256:
+            expected_sha256 = expected_sha256.lower()
+            with self._lock:
+                known = self._has_object(expected_sha256)
+            if known:
+                filename = entry["filename"] if entry else (os.path.basename(urlparse(url).path) or expected_sha256)
+                return self._hit(expected_sha256, save_path, filename)
+        if entry and (not expected_sha256 or entry["sha256"] == expected_sha256):
+            if not revalidate or self.revalidate(url, entry):
+                return self._hit(entry["sha256"], save_path, entry["filename"])
+            print("[-] 远端文件已更新，重新下载")
+
+        # 同一 URL 使用固定的临时目录，中断后再次调用可以续传
+        tmp_dir = self.root / "tmp" / hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        info = {}
+        download_kwargs.setdefault("session", self.session)
+        tmp_path = dl_file.download_file(url, str(tmp_dir), expected_sha256=expected_sha256,
+                                         info=info, **download_kwargs)
+        sha256 = self.put(tmp_path, url, etag=info["etag"], last_modified=info["last_modified"],
+                          filename=info["filename"], sha256=info["sha256"])
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return self.materialize(sha256, self._resolve(save_path, info["filename"]))
+
+    def _hit(self, sha256, save_path, filename):
+        self._touch(sha256)
+        save_path = self._resolve(save_path, filename)
+        print(f"[✓] 使用缓存: {save_path}")
+        return self.materialize(sha256, save_path)
+
+    @staticmethod
+    def _resolve(save_path, filename):
+        if save_path is None:
+            return filename
+        if os.path.isdir(save_path) or str(save_path).endswith(("/", os.sep)):
+            return os.path.join(save_path, filename)
+        return str(save_path)
+
+
+_default_cache = None
+
+
+def fetch(url, save_path=None, **kwargs):
+    """使用默认缓存下载文件，参数见 DownloadCache.fetch"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DownloadCache()
+    return _default_cache.fetch(url, save_path, **kwargs)
@@ -1,11 +1,492 @@
+import contextlib
+import hashlib
+import json
 import mimetypes
+import random
+import threading
 from tqdm import tqdm
 import requests
 import os
+import time
 from urllib.parse import urlparse
+import metrics
 
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
 
-def download_file(url, save_path=None, chunk_size=8192):
+MIN_SPLIT_SIZE = 1024 * 1024  # 剩余量小于该值的两倍时不再拆分
+MAX_RETRIES = 5  # 每个分段的最大重试次数
+RETRY_BACKOFF = 0.5  # 第一次重试前的基础等待时间（秒），之后每次翻倍
+PROGRESS_STEP = 256 * 1024  # 累计多少字节更新一次进度条（tqdm.update 需要加锁）
+AUTO_START_THREADS = 4  # 自动调整模式的初始连接数
+AUTO_MAX_THREADS = 32  # 自动调整模式的最大连接数
+AUTO_INTERVAL = 0.3  # 自动调整模式每次测量吞吐量的时间窗口（秒）
+AUTO_MIN_GAIN = 0.1  # 连接数翻倍后吞吐量至少提升的比例，否则停止增加
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def new_session(pool_size=32):
+    """
+    创建带连接池的 requests.Session
+
+    Args:
+        pool_size: 每个主机保留的连接数，应不小于同时打开的连接数，否则多出的连接用完即关闭
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session():
+    """
+    返回进程共享的 requests.Session（连接池大小 32）
+
+    连接池中的 keep-alive 连接在各分段、各文件之间复用，省去重复的 TCP/TLS 握手。
+    需要其他连接池大小时用 new_session 单独创建。
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = new_session()
+    return _session
+
+
+class RangeNotSupported(Exception):
+    """服务器没有按 Range 请求返回 206 分段"""
+
+
+class ChecksumMismatch(IOError):
+    """下载内容的 SHA-256 与期望值不一致"""
+
+
+class SourceMismatch(IOError):
+    """镜像返回的文件大小与其他来源不一致"""
+
+
+class _Source:
+    """分段下载的一个来源（镜像），记录单个连接的实测吞吐量（指数滑动平均）"""
+    __slots__ = ("url", "rate", "active", "failures", "dead")
+
+    def __init__(self, url):
+        self.url = url
+        self.rate = None  # 字节/秒，尚未测量时为 None
+        self.active = 0
+        self.failures = 0
+        self.dead = False
+
+    def update(self, n, seconds):
+        if seconds > 0:
+            rate = n / seconds
+            self.rate = rate if self.rate is None else 0.7 * self.rate + 0.3 * rate
+
+
+class _PrefixHasher:
+    """
+    为乱序写入的文件增量计算哈希
+
+    分段下载时数据不是按顺序到达的，这里只在“已连续写完的前缀”上前进，
+    把尚未计算的部分从文件读回（刚写入的数据通常还在页缓存中），下载结束时几乎已算完。
+    """
+
+    def __init__(self, path, hasher):
+        self.path = path
+        self.hasher = hasher
+        self.offset = 0
+        self._lock = threading.Lock()
+
+    def advance(self, upto, block=False):
+        """把哈希推进到 upto；非 block 时若其他线程正在计算则直接返回"""
+        if not self._lock.acquire(blocking=block):
+            return
+        try:
+            if upto <= self.offset:
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                while self.offset < upto:
+                    data = f.read(min(1024 * 1024, upto - self.offset))
+                    if not data:
+                        break
+                    self.hasher.update(data)
+                    self.offset += len(data)
+        finally:
+            self._lock.release()
+
+
+class _Range:
+    __slots__ = ("start", "end", "pos", "owner", "retries", "rate")
+
+    def __init__(self, start, end, pos=None):
+        self.start = start
+        self.end = end
+        self.pos = start if pos is None else pos  # 下一个待写入的字节
+        self.owner = None
+        self.retries = 0
+        self.rate = None  # 当前连接的实测速度（字节/秒），用于拆分分段
+
+    @property
+    def remaining(self):
+        return max(0, self.end - self.pos + 1)
+
+
+class _ChunkMap:
+    """
+    分段下载的进度表，与 .part 文件一同保存在磁盘上，用于中断后续传
+
+    文件内容: {"url", "total_size", "etag", "last_modified", "ranges": [[start, end, pos], ...]}
+    """
+
+    def __init__(self, path, url, total_size, validators):
+        self.path = path
+        self.meta = {"url": url, "total_size": total_size, **validators}
+        self.ranges = []
+        self.lock = threading.Lock()
+        self._saved_at = 0.0
+
+    def load(self):
+        """读取已保存的进度表，与当前文件不一致（大小或 ETag 变化）时返回 False"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if any(data.get(k) != v for k, v in self.meta.items()):
+            return False
+        self.ranges = [_Range(*r) for r in data["ranges"]]
+        return True
+
+    def save(self, force=False):
+        """原子地写出进度表；非 force 时最多每秒写一次，返回是否真的写出"""
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self._saved_at < 1.0:
+                return False
+            self._saved_at = now
+            data = {**self.meta, "ranges": [[r.start, r.end, r.pos] for r in self.ranges]}
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        return True
+
+    def done_bytes(self):
+        return sum(r.pos - r.start for r in self.ranges)
+
+    def frontier(self):
+        """从文件开头起连续写完的字节数"""
+        with self.lock:
+            for r in sorted(self.ranges, key=lambda r: r.start):
+                if r.remaining > 0:
+                    return r.pos
+        return self.meta["total_size"]
+
+    def claim(self, worker, rate=None):
+        """
+        为空闲线程分配一个分段：优先取无人负责的未完成分段，
+        否则拆分预计最晚完成的分段，接手后半部分
+
+        Args:
+            worker: 线程编号
+            rate: 该线程将使用的连接的预计速度（字节/秒，可选）。与被拆分分段的速度都已知时
+                按速度比例拆分，使两段预计同时完成；否则从中间拆开
+        """
+        with self.lock:
+            for r in self.ranges:
+                if r.owner is None and r.remaining > 0:
+                    r.owner = worker
+                    r.rate = None
+                    return r
+            busy = [r for r in self.ranges if r.owner is not None and r.remaining >= 2 * MIN_SPLIT_SIZE]
+            if not busy:
+                return None
+            victim = max(busy, key=lambda r: r.remaining / (r.rate or rate or 1.0))
+            keep = victim.remaining // 2
+            if rate and victim.rate:
+                keep = int(victim.remaining * victim.rate / (victim.rate + rate))
+                keep = min(max(keep, PROGRESS_STEP), victim.remaining - MIN_SPLIT_SIZE)
+            mid = victim.pos + keep
+            stolen = _Range(mid, victim.end)
+            stolen.owner = worker
+            victim.end = mid - 1
+            self.ranges.append(stolen)
+            return stolen
+
+
+def segmented_download(url, save_path, total_size, headers=None, validators=None,
+                       num_threads=4, chunk_size=256 * 1024, desc=None,
+                       session=None, slots=None, limiter=None, progress=True, on_progress=None,
+                       hasher=None):
+    """
+    可断点续传的多线程分段下载
+
+    数据写入 save_path + ".part"，进度表保存在 save_path + ".part.json"；中断后再次调用
+    会从已完成的位置继续。每个分段失败后单独退避重试，空闲线程会拆分最慢分段的剩余部分。
+
+    url 为多个镜像地址时，各线程每领取一个分段就选择当前单连接吞吐量最高的来源
+    （未测过速的来源先各试一次），快的镜像因此承担更多分段；反复失败、不支持 Range
+    或文件大小不一致的镜像会被停用，其余镜像接手。
+
+    Args:
+        url: 文件URL，或同一文件的多个镜像URL列表
+        save_path: 保存路径
+        total_size: 文件总大小
+        headers: 请求头
+        validators: {"etag", "last_modified"}，用于判断续传时远端文件是否已变化
+        num_threads: 线程数；"auto" 时从少量连接开始，吞吐量仍在提升就继续增加连接
+        chunk_size: 分块大小
+        desc: 进度条描述
+        session: 使用的 requests.Session，默认为共享会话
+        slots: 限制同时打开连接数的信号量（可选），每个请求期间占用一个
+        limiter: 带宽限制器（可选），需提供 consume(字节数) 方法
+        progress: 是否显示进度条
+        on_progress: 每写入一块数据后以字节数调用的回调（可选）
+        hasher: hashlib 对象（可选），下载过程中按文件顺序喂入内容
+
+    Returns:
+        保存的文件路径
+    """
+    headers = headers or {}
+    session = session or get_session()
+    slots = slots or contextlib.nullcontext()
+    part_path = f"{save_path}.part"
+    sources = [_Source(u) for u in ([url] if isinstance(url, str) else url)]
+    # 镜像列表按排序后的形式写入进度表，镜像顺序变化不影响续传
+    chunk_map = _ChunkMap(f"{part_path}.json", url if isinstance(url, str) else sorted(url),
+                          total_size, validators or {})
+    auto = num_threads == "auto"
+    if auto:
+        num_threads = AUTO_START_THREADS
+    if os.path.exists(part_path) and os.path.getsize(part_path) == total_size and chunk_map.load():
+        print(f"[-] 继续未完成的下载: 已完成 {chunk_map.done_bytes()}/{total_size} 字节")
+    else:
+        # 预分配目标文件，各线程直接把数据写到自己负责的偏移处
+        with open(part_path, 'wb') as f:
+            f.truncate(total_size)
+        part_size = total_size // num_threads
+        for i in range(num_threads):
+            start = i * part_size
+            end = total_size - 1 if i == num_threads - 1 else (start + part_size - 1)
+            chunk_map.ranges.append(_Range(start, end))
+        chunk_map.save(force=True)
+
+    start_time = time.perf_counter()
+    errors = []
+    prefix_hasher = _PrefixHasher(part_path, hasher) if hasher is not None else None
+    progress_bar = tqdm(
+        desc=desc or os.path.basename(save_path),
+        total=total_size,
+        initial=chunk_map.done_bytes(),
+        disable=not progress,
+        unit='B',
+        unit_scale=True,
+        unit_divisor=1024,
+        bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
+    )
+
+    def report(n):
+        progress_bar.update(n)
+        if on_progress is not None:
+            on_progress(n)
+
+    # 允许工作的线程数：编号不小于它的线程放下当前分段后退出（自动调整时用于减少连接）
+    limit = [num_threads]
+
+    def pick_source():
+        """选择单连接吞吐量最高的可用来源；没有可用来源时返回 None"""
+        with chunk_map.lock:
+            alive = [s for s in sources if not s.dead]
+            if not alive:
+                return None
+            # 每个尚未测速的来源先分到一个连接；之后选单连接速度最快的已测速来源，
+            # 不再把连接继续分给迟迟测不出速度的慢来源
+            untested = [s for s in alive if s.rate is None and s.active == 0]
+            tested = [s for s in alive if s.rate is not None]
+            if untested:
+                source = untested[0]
+            elif tested:
+                source = max(tested, key=lambda s: s.rate)
+            else:
+                source = min(alive, key=lambda s: s.active)
+            source.active += 1
+            return source
+
+    def fetch(rng, f, i, source):
+        """下载一个分段直到完成（分段可能在下载过程中被其他线程截短）"""
+        part_start = time.perf_counter()
+        with chunk_map.lock:
+            pos, end = rng.pos, rng.end
+        unreported = 0
+        last_time = part_start
+        try:
+            with slots, session.get(source.url, headers={'Range': f'bytes={pos}-{end}', **headers},
+                                    stream=True, timeout=30) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    raise RangeNotSupported(f"HTTP {r.status_code}")
+                content_range = r.headers.get('Content-Range', '')
+                if '/' in content_range and content_range.rsplit('/', 1)[1] not in ('*', str(total_size)):
+                    raise SourceMismatch(f"文件大小不一致: {content_range}")
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    if not chunk:
+                        continue
+                    if limiter is not None:
+                        limiter.consume(len(chunk))
+                    with chunk_map.lock:
+                        n = min(len(chunk), rng.end - rng.pos + 1)
+                        offset = rng.pos
+                    if n > 0:
+                        f.seek(offset)
+                        view = memoryview(chunk)[:n]
+                        while view:
+                            view = view[f.write(view):]
+                        with chunk_map.lock:
+                            rng.pos += n
+                        # 攒够一定字节数再更新总进度条
+                        unreported += n
+                        if unreported >= PROGRESS_STEP:
+                            report(unreported)
+                            now = time.perf_counter()
+                            if now > last_time:
+                                rng.rate = unreported / (now - last_time)
+                            source.update(unreported, now - last_time)
+                            last_time = now
+                            unreported = 0
+                        if chunk_map.save() and prefix_hasher is not None:
+                            prefix_hasher.advance(chunk_map.frontier())
+                    if rng.remaining == 0 or i >= limit[0]:
+                        break
+        finally:
+            if unreported:
+                report(unreported)
+        _report_download("part", rng.pos - pos, time.perf_counter() - part_start)
+        if rng.remaining > 0 and i < limit[0]:
+            raise IOError(f"分段 {rng.pos}-{rng.end} 连接提前结束")
+
+    def retire(source, e):
+        """停用一个来源；所有来源都不可用时记录错误"""
+        with chunk_map.lock:
+            if source.dead:
+                return
+            source.dead = True
+            all_dead = all(s.dead for s in sources)
+            if all_dead:
+                errors.append(e)
+        if not all_dead:
+            print(f"\n[停用来源 {source.url}] {e}")
+
+    def worker(i):
+        # 不使用用户态缓冲：写入返回后数据已交给操作系统，进度表中的 pos 才不会超前于文件内容
+        with open(part_path, 'r+b', buffering=0) as f:
+            while not errors and i < limit[0]:
+                source = pick_source()
+                if source is None:
+                    return
+                rng = chunk_map.claim(i, source.rate)
+                if rng is None:
+                    with chunk_map.lock:
+                        source.active -= 1
+                    return
+                try:
+                    fetch(rng, f, i, source)
+                    source.failures = 0
+                except (RangeNotSupported, SourceMismatch) as e:
+                    retire(source, e)
+                except Exception as e:
+                    rng.retries += 1
+                    source.failures += 1
+                    status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else 0
+                    # 还有其他来源时，连续失败过多的来源直接停用；只剩一个来源时按分段重试次数处理
+                    others = any(not s.dead for s in sources if s is not source)
+                    if (others and source.failures > MAX_RETRIES) or (400 <= status < 500 and status not in (408, 429)):
+                        retire(source, e)
+                    elif rng.retries > MAX_RETRIES * len(sources):
+                        errors.append(e)
+                    else:
+                        delay = min(30.0, RETRY_BACKOFF * 2 ** min(rng.retries, source.failures)) * random.uniform(0.5, 1.0)
+                        print(f"\n[分段 {rng.pos}-{rng.end} 下载失败，{delay:.1f}s 后重试] {e}")
+                        time.sleep(delay)
+                finally:
+                    with chunk_map.lock:
+                        rng.owner = None
+                        source.active -= 1
+
+    threads = []
+
+    def spawn(n):
+        limit[0] = len(threads) + n
+        for _ in range(n):
+            t = threading.Thread(target=worker, args=(len(threads),), daemon=True)
+            t.start()
+            threads.append(t)
+
+    spawn(num_threads)
+    try:
+        if auto:
+            _auto_tune(chunk_map, threads, spawn, errors, limit)
+        for t in threads:
+            t.join()
+    finally:
+        progress_bar.close()
+        chunk_map.save(force=True)
+
+    if errors:
+        if isinstance(errors[0], RangeNotSupported):
+            os.remove(part_path)
+            os.remove(chunk_map.path)
+        raise errors[0]
+    if any(r.remaining for r in chunk_map.ranges):
+        raise IOError("下载未完成")
+    if prefix_hasher is not None:
+        prefix_hasher.advance(total_size, block=True)
+    os.replace(part_path, save_path)
+    os.remove(chunk_map.path)
+    _report_download("multi", total_size, time.perf_counter() - start_time)
+    if progress:
+        mirrors = f"，{sum(not s.dead for s in sources)} 个镜像" if len(sources) > 1 else ""
+        print(f"✓ 多线程下载完成: {save_path}（{limit[0]} 个连接{mirrors}）")
+    return save_path
+
+
+def _auto_tune(chunk_map, threads, spawn, errors, limit):
+    """
+    逐步增加连接数：每个时间窗口测量一次吞吐量，比上一窗口提升超过 AUTO_MIN_GAIN 就把连接数翻倍；
+    翻倍后没有明显提升则退回上一次的连接数并停止调整。
+    新线程通过拆分剩余最多的分段获得任务，多出的线程放下的分段由其余线程接手。
+    """
+    last_rate = None
+    with chunk_map.lock:
+        last_done = chunk_map.done_bytes()
+    last_time = time.monotonic()
+    while len(threads) < AUTO_MAX_THREADS and not errors:
+        # 等待一个时间窗口；下载提前结束时立即返回
+        deadline = time.monotonic() + AUTO_INTERVAL
+        for t in list(threads):
+            t.join(max(0.0, deadline - time.monotonic()))
+        if not any(t.is_alive() for t in threads):
+            return
+        with chunk_map.lock:
+            done = chunk_map.done_bytes()
+        now = time.monotonic()
+        rate = (done - last_done) / (now - last_time)
+        if last_rate is not None and rate < last_rate * (1 + AUTO_MIN_GAIN):
+            if rate < last_rate:
+                limit[0] = previous
+            return
+        last_rate, last_done, last_time = rate, done, now
+        previous = len(threads)
+        spawn(min(len(threads), AUTO_MAX_THREADS - len(threads)))
+
+
+def download_file(url, save_path=None, chunk_size=256 * 1024, num_threads="auto",
+                  session=None, slots=None, limiter=None, progress=True, on_progress=None,
+                  expected_sha256=None, info=None):
     """
     使用tqdm显示下载进度条
     
@@ -13,18 +494,22 @@ def download_file(url, save_path=None, chunk_size=8192):
         url: 文件URL
         save_path: 保存路径
         chunk_size: 分块大小
+        num_threads: 分段下载的连接数，默认 "auto" 按实测吞吐量逐步增加（与 CPU 核心数无关）
+        session/slots/limiter/progress/on_progress: 见 segmented_download
+        expected_sha256: 期望的 SHA-256（可选），不一致时删除文件并抛出 ChecksumMismatch
+        info: 字典（可选），下载完成后写入 url, filename, size, etag, last_modified, sha256
     
     Returns:
         保存的文件路径
     """
-    import threading
     # 设置请求头
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+    headers = dict(DEFAULT_HEADERS)
+    session = session or get_session()
+    slots = slots or contextlib.nullcontext()
 
     # 预检 Range 支持
-    head = requests.head(url, headers=headers)
+    with slots:
+        head = session.head(url, headers=headers, allow_redirects=True, timeout=30)
     accept_ranges = head.headers.get('Accept-Ranges', '').lower()
     total_size = int(head.headers.get('content-length', 0))
 
@@ -40,80 +525,227 @@ def download_file(url, save_path=None, chunk_size=8192):
     # 创建目录（如果不存在）
     os.makedirs(os.path.dirname(save_path) if os.path.dirname(save_path) else '.', exist_ok=True)
 
-    def single_thread():
-        response = requests.get(url, headers=headers, stream=True)
-        response.raise_for_status()
-        with open(save_path, 'wb') as file, tqdm(
-            desc=f"{filename} (单线程下载)",
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-            bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
-        ) as progress_bar:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    file.write(chunk)
-                    progress_bar.update(len(chunk))
-        print(f"✓ 下载完成: {save_path}")
+    def single_thread(hasher):
+        start_time = time.perf_counter()
+        received = 0
+        with slots, session.get(url, headers=headers, stream=True, timeout=30) as response:
+            # 先检查状态码再创建文件，避免失败时留下空文件
+            response.raise_for_status()
+            with open(save_path, 'wb') as file, tqdm(
+                desc=f"{filename} (单线程下载)",
+                total=total_size,
+                disable=not progress,
+                unit='B',
+                unit_scale=True,
+                unit_divisor=1024,
+                bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
+            ) as progress_bar:
+                unreported = 0
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        if limiter is not None:
+                            limiter.consume(len(chunk))
+                        file.write(chunk)
+                        hasher.update(chunk)
+                        received += len(chunk)
+                        unreported += len(chunk)
+                        if unreported >= PROGRESS_STEP:
+                            progress_bar.update(unreported)
+                            if on_progress is not None:
+                                on_progress(unreported)
+                            unreported = 0
+                if unreported:
+                    progress_bar.update(unreported)
+                    if on_progress is not None:
+                        on_progress(unreported)
+        _report_download("single", received, time.perf_counter() - start_time)
+        if progress:
+            print(f"✓ 下载完成: {save_path}")
         return save_path
 
-    def multi_thread():
-        num_threads = min(8, max(2, os.cpu_count() or 4))
-        part_size = total_size // num_threads
-        results = [b''] * num_threads
-        locks = [threading.Lock() for _ in range(num_threads)]
-        downloaded_sizes = [0] * num_threads
-
-        # 创建总进度条
-        progress_bar = tqdm(
+    def multi_thread(hasher):
+        return segmented_download(
+            head.url, save_path, total_size,
+            headers=headers,
+            validators={'etag': head.headers.get('ETag', ''), 'last_modified': head.headers.get('Last-Modified', '')},
+            num_threads=num_threads or "auto",
+            chunk_size=chunk_size,
             desc=f"{filename} (多线程下载)",
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-            bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
+            session=session,
+            slots=slots,
+            limiter=limiter,
+            progress=progress,
+            on_progress=on_progress,
+            hasher=hasher
         )
 
-        def download_part(i, start, end):
-            range_header = {'Range': f'bytes={start}-{end}', **headers}
-            r = requests.get(url, headers=range_header, stream=True)
-            r.raise_for_status()
-            data = b''
-            for chunk in r.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    data += chunk
-                    with locks[i]:
-                        downloaded_sizes[i] += len(chunk)
-                        # 更新总进度条
-                        progress_bar.update(len(chunk))
-            results[i] = data
-
-        threads = []
-        for i in range(num_threads):
-            start = i * part_size
-            end = total_size - 1 if i == num_threads - 1 else (start + part_size - 1)
-            t = threading.Thread(target=download_part, args=(i, start, end))
-            threads.append(t)
-            t.start()
-        for t in threads:
-            t.join()
-        with open(save_path, 'wb') as f:
-            for part in results:
-                f.write(part)
-        progress_bar.close()
-        print(f"✓ 多线程下载完成: {save_path}")
-        return save_path
-
-    # 优先尝试多线程
+    # 优先尝试多线程；每次尝试使用新的哈希对象，回退时不会混入失败尝试的数据
+    hasher = hashlib.sha256()
     if accept_ranges == 'bytes' and total_size > 0:
         try:
-            return multi_thread()
-        except Exception as e:
-            print(f"[多线程下载失败，自动回退单线程] {e}")
-            return single_thread()
+            multi_thread(hasher)
+        except RangeNotSupported as e:
+            print(f"[服务器不支持分段下载，自动回退单线程] {e}")
+            hasher = hashlib.sha256()
+            single_thread(hasher)
     else:
-        return single_thread()
+        single_thread(hasher)
+
+    digest = hasher.hexdigest()
+    if expected_sha256 and digest != expected_sha256.lower():
+        os.remove(save_path)
+        raise ChecksumMismatch(f"{save_path}: SHA-256 为 {digest}，期望 {expected_sha256}")
+    if info is not None:
+        info.update({
+            'url': head.url,
+            'filename': filename,
+            'size': os.path.getsize(save_path),
+            'etag': head.headers.get('ETag', ''),
+            'last_modified': head.headers.get('Last-Modified', ''),
+            'sha256': digest,
+        })
+    return save_path
+
+def probe_mirrors(urls, session=None, headers=None):
+    """
+    并发向各镜像发送 HEAD 请求
+
+    Args:
+        urls: 镜像URL列表
+        session: 使用的 requests.Session，默认为共享会话
+        headers: 请求头
+
+    Returns:
+        与 urls 顺序一致的字典列表: url, final_url, filename, size, etag, last_modified,
+        accept_ranges, latency（秒）, error（失败时为异常对象，否则为 None）
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    session = session or get_session()
+    headers = headers or DEFAULT_HEADERS
+
+    def probe(url):
+        result = {'url': url, 'final_url': url, 'filename': '', 'size': 0, 'etag': '', 'last_modified': '',
+                  'accept_ranges': False, 'latency': float('inf'), 'error': None}
+        start = time.perf_counter()
+        try:
+            head = session.head(url, headers=headers, allow_redirects=True, timeout=15)
+            head.raise_for_status()
+        except requests.RequestException as e:
+            result['error'] = e
+            return result
+        result.update({
+            'final_url': head.url,
+            'filename': get_filename_from_response(url, head),
+            'size': int(head.headers.get('content-length', 0)),
+            'etag': head.headers.get('ETag', ''),
+            'last_modified': head.headers.get('Last-Modified', ''),
+            'accept_ranges': head.headers.get('Accept-Ranges', '').lower() == 'bytes',
+            'latency': time.perf_counter() - start,
+        })
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), 16))) as pool:
+        return list(pool.map(probe, urls))
+
+
+def download_mirrors(urls, save_path=None, expected_sha256=None, num_threads="auto",
+                     chunk_size=256 * 1024, session=None, slots=None, limiter=None,
+                     progress=True, on_progress=None, info=None):
+    """
+    从多个镜像同时下载同一个文件
+
+    先并发探测各镜像，只保留可访问、支持 Range 且文件大小与多数镜像一致的来源，
+    再由 segmented_download 把不同分段分给不同镜像，实测更快的镜像承担更多分段。
+    没有镜像支持 Range 时退回从响应最快的镜像单线程下载。镜像内容可能不同步，
+    建议提供 expected_sha256。
+
+    Args:
+        urls: 同一文件的镜像URL列表
+        save_path: 保存路径（文件或目录）
+        expected_sha256: 期望的 SHA-256（可选），不一致时删除文件并抛出 ChecksumMismatch
+        其余参数: 见 download_file
+
+    Returns:
+        保存的文件路径
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        raise ValueError("没有可用的镜像")
+    session = session or get_session()
+    headers = dict(DEFAULT_HEADERS)
+    probes = [p for p in probe_mirrors(urls, session, headers) if p['error'] is None]
+    if not probes:
+        raise IOError(f"所有镜像均无法访问: {', '.join(urls)}")
+
+    # 以多数镜像报告的大小为准，剔除内容可能不同步的镜像
+    sizes = [p['size'] for p in probes if p['size'] > 0]
+    total_size = max(set(sizes), key=sizes.count) if sizes else 0
+    usable = sorted((p for p in probes if p['accept_ranges'] and p['size'] == total_size),
+                    key=lambda p: p['latency'])
+    fastest = min(probes, key=lambda p: p['latency'])
+    if total_size <= 0 or not usable:
+        print(f"[镜像均不支持分段下载，使用 {fastest['url']}]")
+        return download_file(fastest['url'], save_path, chunk_size=chunk_size, num_threads=1,
+                             session=session, slots=slots, limiter=limiter, progress=progress,
+                             on_progress=on_progress, expected_sha256=expected_sha256, info=info)
+    skipped = len(urls) - len(usable)
+    if skipped and progress:
+        print(f"[-] 使用 {len(usable)} 个镜像（跳过 {skipped} 个不可用或大小不一致的镜像）")
+
+    first = usable[0]
+    filename = first['filename']
+    if save_path is None:
+        save_path = filename
+    elif os.path.isdir(save_path):
+        save_path = os.path.join(save_path, filename)
+    os.makedirs(os.path.dirname(save_path) if os.path.dirname(save_path) else '.', exist_ok=True)
+
+    hasher = hashlib.sha256()
+    try:
+        segmented_download(
+            [p['final_url'] for p in usable], save_path, total_size,
+            headers=headers,
+            validators={'etag': first['etag'] if len(usable) == 1 else ''},
+            num_threads=num_threads or "auto",
+            chunk_size=chunk_size,
+            desc=f"{filename} (多镜像下载)",
+            session=session,
+            slots=slots,
+            limiter=limiter,
+            progress=progress,
+            on_progress=on_progress,
+            hasher=hasher
+        )
+    except RangeNotSupported as e:
+        print(f"[镜像不支持分段下载，自动回退单线程] {e}")
+        return download_file(fastest['url'], save_path, chunk_size=chunk_size, num_threads=1,
+                             session=session, slots=slots, limiter=limiter, progress=progress,
+                             on_progress=on_progress, expected_sha256=expected_sha256, info=info)
+
+    digest = hasher.hexdigest()
+    if expected_sha256 and digest != expected_sha256.lower():
+        os.remove(save_path)
+        raise ChecksumMismatch(f"{save_path}: SHA-256 为 {digest}，期望 {expected_sha256}")
+    if info is not None:
+        info.update({
+            'url': first['final_url'],
+            'filename': filename,
+            'size': os.path.getsize(save_path),
+            'etag': first['etag'],
+            'last_modified': first['last_modified'],
+            'sha256': digest,
+        })
+    return save_path
+
+def _report_download(kind, size, elapsed):
+    """记录一次下载（或一个分段）的字节数、耗时与吞吐量"""
+    if not metrics.enabled():
+        return
+    metrics.inc("download_bytes_total", size, kind=kind)
+    metrics.observe("download_seconds", elapsed, kind=kind)
+    if elapsed > 0:
+        metrics.observe("download_throughput_bytes_per_second", size / elapsed,
+                        buckets=metrics.THROUGHPUT_BUCKETS, kind=kind)
 
 def get_filename_from_response(url, response):
     """
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+import dl_file
+
+
+class TokenBucket:
+    """
+    令牌桶带宽限制器，多个线程共享
+
+    Args:
+        rate: 每秒允许的字节数
+        burst: 桶容量（字节），默认为 1 秒的量
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n):
+        """取走 n 字节的令牌，不足时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # 单次请求超过桶容量时允许透支，避免永远等不到
+                if self._tokens >= min(n, self.capacity):
+                    self._tokens -= n
+                    return
+                wait = (min(n, self.capacity) - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DownloadManager:
+    """
+    多文件并发下载管理器
+
+    所有文件共享管理器自己的 Session，连接池大小为 max_connections（keep-alive 连接在分段和文件之间复用），
+    同时打开的连接总数不超过 max_connections，可选全局带宽上限。
+    run / download_async 可以并发调用，每次调用只下载自己的文件、单独统计。
+
+    Args:
+        max_connections: 全局最大连接数
+        max_files: 同时下载的文件数
+        threads_per_file: 每个文件的分段线程数
+        bandwidth_limit: 全局带宽上限（字节/秒），为空时不限速
+    """
+
+    def __init__(self, max_connections=8, max_files=4, threads_per_file=4, bandwidth_limit=None):
+        self.max_connections = max_connections
+        self.max_files = max_files
+        self.threads_per_file = threads_per_file
+        self.session = dl_file.new_session(pool_size=max_connections)
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.limiter = TokenBucket(bandwidth_limit) if bandwidth_limit else None
+        self._queue = []
+        self._lock = threading.Lock()
+        self.last_summary = None
+
+    def add(self, url, save_path=None):
+        """加入下载队列"""
+        with self._lock:
+            self._queue.append((url, save_path))
+        return self
+
+    def _download_one(self, url, save_path, progress_bar, totals):
+        result = {"url": url, "path": None, "bytes": 0}
+        start = time.perf_counter()
+
+        def on_progress(n):
+            result["bytes"] += n
+            with self._lock:
+                totals["bytes"] += n
+            progress_bar.update(n)
+
+        try:
+            result["path"] = dl_file.download_file(
+                url, save_path,
+                num_threads=self.threads_per_file,
+                session=self.session,
+                slots=self.slots,
+                limiter=self.limiter,
+                progress=False,
+                on_progress=on_progress
+            )
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = time.perf_counter() - start
+        result["throughput"] = result["bytes"] / result["seconds"] if result["seconds"] > 0 else 0.0
+        status = "✗" if "error" in result else "✓"
+        progress_bar.write(f"[{status}] {os.path.basename(str(result['path'] or url))} "
+                           f"{result['bytes'] / 1024 / 1024:.1f}MB, {result['throughput'] / 1024 / 1024:.2f}MB/s"
+                           + (f" {result['error']}" if "error" in result else ""))
+        return result
+
+    def run(self, items=None):
+        """
+        下载队列中（以及 items 中）的全部文件
+
+        Args:
+            items: 额外的 URL 或 (URL, 保存路径) 列表
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 url, path, bytes, seconds, throughput（失败时有 error）
+        """
+        with self._lock:
+            queue, self._queue = self._queue, []
+        queue += [(item, None) if isinstance(item, str) else tuple(item) for item in items or []]
+        return self._run(queue)
+
+    def _run(self, queue):
+        # 每次调用有自己的文件列表与字节计数，并发的调用之间互不影响
+        totals = {"bytes": 0}
+        start = time.perf_counter()
+        with tqdm(desc=f"{len(queue)} 个文件", unit='B', unit_scale=True, unit_divisor=1024) as progress_bar, \
+                ThreadPoolExecutor(max(1, min(self.max_files, len(queue)))) as pool:
+            futures = [pool.submit(self._download_one, url, path, progress_bar, totals) for url, path in queue]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        self.last_summary = {
+            "files": len(results),
+            "failed": sum("error" in r for r in results),
+            "bytes": totals["bytes"],
+            "seconds": elapsed,
+            "throughput": totals["bytes"] / elapsed if elapsed > 0 else 0.0,
+        }
+        return results
+
+    async def run_async(self, items=None):
+        """在 asyncio 中使用：下载在线程池中进行，不阻塞事件循环"""
+        return await asyncio.to_thread(self.run, items)
+
+    async def download_async(self, url, save_path=None):
+        """在 asyncio 中下载单个文件（不含队列中的文件），可与其他协程并发"""
+        return (await asyncio.to_thread(self._run, [(url, save_path)]))[0]
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def print_summary(self):
+        s = self.last_summary
+        print(f"[✓] {s['files']} 个文件，失败 {s['failed']} 个，共 {s['bytes'] / 1024 / 1024:.1f}MB，"
+              f"耗时 {s['seconds']:.1f}s，总吞吐量 {s['throughput'] / 1024 / 1024:.2f}MB/s")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="多文件并发下载")
+    parser.add_argument("urls", nargs="+", help="下载地址")
+    parser.add_argument("-o", "--output", default=".", help="保存目录")
+    parser.add_argument("-c", "--connections", type=int, default=8, help="全局最大连接数")
+    parser.add_argument("-f", "--files", type=int, default=4, help="同时下载的文件数")
+    parser.add_argument("-t", "--threads", type=int, default=4, help="每个文件的分段线程数")
+    parser.add_argument("--limit", type=float, default=None, help="带宽上限（MB/s）")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    manager = DownloadManager(args.connections, args.files, args.threads,
+                              args.limit * 1024 * 1024 if args.limit else None)
+    results = manager.run([(url, args.output) for url in args.urls])
+    manager.print_summary()
+    sys.exit(1 if any("error" in r for r in results) else 0)
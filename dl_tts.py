@@ -4,13 +4,32 @@
 IndexTTS2 自动安装脚本
 支持 Windows、Linux、macOS
 自动完成环境配置、仓库克隆、依赖安装和模型下载。
+
+各步骤组成依赖图：互不依赖的步骤（如克隆仓库与下载模型）并发执行，
+输出已存在且有效的步骤直接跳过，结束时打印每个步骤的耗时。
 """
+import functools
+import hashlib
+import json
 import os
 import sys
 import platform
 import subprocess
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
+import dl_file
+
+MODEL_REPO = "IndexTeam/IndexTTS-2"
+HF_ENDPOINTS = ["https://hf-mirror.com", "https://huggingface.co"]
+REPO_DIR = "index-tts"
+CHECKPOINTS_DIR = os.path.join(REPO_DIR, "checkpoints")
+# 模型先下载到仓库外的目录，与克隆仓库并发进行，两者都完成后再移入 checkpoints
+MODEL_STAGING_DIR = "index-tts-checkpoints"
+MODEL_MANIFEST = ".dl_tts_models.json"  # 模型文件清单（相对路径 -> 大小），用于判断模型是否完整
+SYNC_STAMP = ".dl_tts_synced"  # 写在 .venv 中，内容为同步时 uv.lock 的 SHA-256
 
 class Colors:
     HEADER = '\033[95m'
@@ -32,11 +51,11 @@ def print_warn(msg):
 def print_error(msg):
     print(f"{Colors.FAIL}[ERROR] {msg}{Colors.ENDC}")
 
-def run(cmd, check=True, verbose=True):
-    """执行shell命令"""
+def run(cmd, check=True, verbose=True, cwd=None):
+    """执行shell命令（cwd 为工作目录，各步骤并发执行，不能使用 os.chdir）"""
     if verbose:
-        print(f"运行: {cmd}")
-    result = subprocess.run(cmd, shell=True)
+        print(f"运行: {cmd}" + (f"  (于 {cwd})" if cwd else ""))
+    result = subprocess.run(cmd, shell=True, cwd=cwd)
     if check and result.returncode != 0:
         print_error(f"命令失败: {cmd}")
         sys.exit(1)
@@ -92,8 +111,17 @@ def install_git_lfs():
     run("git lfs install")
     print_ok("Git 和 Git LFS 已就绪")
 
+def git_lfs_ready():
+    """git 与 git-lfs 均已安装，且已执行过 git lfs install"""
+    if not (shutil.which("git") and shutil.which("git-lfs")):
+        return False
+    result = subprocess.run(["git", "config", "--global", "--get", "filter.lfs.process"],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+@functools.lru_cache(maxsize=None)
 def setup_mirrors():
-    """设置镜像源"""
+    """设置镜像源（每次运行只探测一次，之后直接返回缓存的结果）"""
     print_step("配置镜像源")
     
     # 检测是否为中国用户（通过ping检测延迟）
@@ -146,14 +174,31 @@ def install_uv():
         sys.exit(1)
     print_ok("UV 包管理器已安装")
 
+_uv_lock = threading.Lock()
+
+def ensure_uv():
+    """没有 uv 时安装；"uv" 步骤与下载模型的命令行工具回退可能同时需要，只安装一次"""
+    with _uv_lock:
+        if not shutil.which("uv"):
+            install_uv()
+
 def clone_repository():
     """克隆代码仓库"""
     print_step("克隆 IndexTTS2 代码仓库")
-    if not os.path.exists("index-tts"):
-        run("git clone https://github.com/index-tts/index-tts.git")
-    os.chdir("index-tts")
+    if not os.path.exists(REPO_DIR):
+        run(f"git clone https://github.com/index-tts/index-tts.git {REPO_DIR}")
     print_ok("代码仓库克隆完成")
 
+def repository_ready():
+    return os.path.isdir(os.path.join(REPO_DIR, ".git"))
+
+def _lock_digest():
+    try:
+        with open(os.path.join(REPO_DIR, "uv.lock"), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
 def install_dependencies():
     """安装项目依赖"""
     print_step("安装项目依赖")
@@ -163,7 +208,7 @@ def install_dependencies():
     for mirror in mirrors_config["pip_mirrors"]:
         try:
             cmd = f"uv sync --all-extras --default-index {mirror} --python {sys.executable}"
-            if run(cmd, check=False):
+            if run(cmd, check=False, cwd=REPO_DIR):
                 success = True
                 break
         except Exception as e:
@@ -172,17 +217,84 @@ def install_dependencies():
     if not success:
         print_error("依赖安装失败")
         sys.exit(1)
+    digest = _lock_digest()
+    if digest:
+        with open(os.path.join(REPO_DIR, ".venv", SYNC_STAMP), "w", encoding="utf-8") as f:
+            f.write(digest)
     print_ok("项目依赖安装完成")
 
+def dependencies_ready():
+    """.venv 存在，且上次同步时的 uv.lock 与当前一致"""
+    try:
+        with open(os.path.join(REPO_DIR, ".venv", SYNC_STAMP), "r", encoding="utf-8") as f:
+            stamp = f.read().strip()
+    except OSError:
+        return False
+    return stamp == _lock_digest()
+
+def list_model_files(repo=MODEL_REPO):
+    """
+    通过 HuggingFace API 列出模型仓库中的文件
+
+    Returns:
+        [(路径, 大小, SHA-256 或 None), ...]；LFS 文件的 SHA-256 来自仓库记录
+    """
+    session = dl_file.get_session()
+    for endpoint in HF_ENDPOINTS:
+        try:
+            r = session.get(f"{endpoint}/api/models/{repo}/tree/main", params={"recursive": "true"}, timeout=15)
+            r.raise_for_status()
+            return [(item["path"], item.get("size", 0), (item.get("lfs") or {}).get("oid"))
+                    for item in r.json() if item.get("type") == "file"]
+        except Exception as e:
+            print_warn(f"从 {endpoint} 获取文件列表失败: {e}")
+    return None
+
+def model_file_urls(path, repo=MODEL_REPO):
+    """同一个模型文件在各镜像上的下载地址"""
+    urls = [f"{endpoint}/{repo}/resolve/main/{path}" for endpoint in HF_ENDPOINTS]
+    urls.append(f"https://www.modelscope.cn/models/{repo}/resolve/master/{path}")
+    return urls
+
+def download_models_direct(local_dir=MODEL_STAGING_DIR, repo=MODEL_REPO):
+    """
+    同时从 hf-mirror、HuggingFace 和 ModelScope 下载模型文件（每个文件的不同分段来自不同镜像）
+
+    Returns:
+        是否全部下载成功
+    """
+    files = list_model_files(repo)
+    if not files:
+        return False
+    try:
+        for path, size, sha256 in files:
+            target = os.path.join(local_dir, path)
+            if os.path.isfile(target) and os.path.getsize(target) == size:
+                continue
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            dl_file.download_mirrors(model_file_urls(path, repo), target, expected_sha256=sha256)
+    except Exception as e:
+        print_warn(f"多镜像下载失败: {e}")
+        return False
+    return True
+
 def download_models():
-    """下载模型"""
+    """下载模型（到 MODEL_STAGING_DIR，由 place_models 移入仓库）"""
     print_step("下载 IndexTTS2 模型")
     
-    # 创建checkpoints目录
-    os.makedirs("checkpoints", exist_ok=True)
+    # 创建下载目录
+    local_dir = MODEL_STAGING_DIR
+    os.makedirs(local_dir, exist_ok=True)
+
+    # 优先同时从多个镜像下载，失败后再使用各平台的命令行工具
+    print("从多个镜像同时下载...")
+    if download_models_direct(local_dir):
+        print_ok("模型下载完成")
+        return
     
-    # 获取区域配置
+    # 获取区域配置；命令行工具通过 uv 安装（"models" 步骤不依赖 "uv" 步骤，多镜像下载不需要 uv）
     mirrors_config = setup_mirrors()
+    ensure_uv()
     success = False
     
     if mirrors_config["is_china"]:
@@ -190,7 +302,7 @@ def download_models():
         try:
             print("从 ModelScope 下载...")
             run(f"uv tool install 'modelscope' --python {sys.executable}")
-            if run("modelscope download --model IndexTeam/IndexTTS-2 --local_dir checkpoints", check=False):
+            if run(f"modelscope download --model IndexTeam/IndexTTS-2 --local_dir {local_dir}", check=False):
                 success = True
         except Exception as e:
             print_warn(f"从 ModelScope 下载失败: {e}")
@@ -200,7 +312,7 @@ def download_models():
             try:
                 print("\n从 HuggingFace 镜像下载...")
                 run(f"uv tool install 'huggingface-hub[cli,hf_xet]' --python {sys.executable}")
-                if run("hf download IndexTeam/IndexTTS-2 --local-dir=checkpoints", check=False):
+                if run(f"hf download IndexTeam/IndexTTS-2 --local-dir={local_dir}", check=False):
                     success = True
             except Exception as e:
                 print_warn(f"从 HuggingFace 镜像下载失败: {e}")
@@ -209,7 +321,7 @@ def download_models():
         try:
             print("从 HuggingFace 下载...")
             run(f"uv tool install 'huggingface-hub[cli,hf_xet]' --python {sys.executable}")
-            if run("hf download IndexTeam/IndexTTS-2 --local-dir=checkpoints", check=False):
+            if run(f"hf download IndexTeam/IndexTTS-2 --local-dir={local_dir}", check=False):
                 success = True
         except Exception as e:
             print_warn(f"从 HuggingFace 下载失败: {e}")
@@ -219,7 +331,7 @@ def download_models():
             try:
                 print("\n从 ModelScope 下载...")
                 run(F"uv tool install 'modelscope' --python {sys.executable}")
-                if run("modelscope download --model IndexTeam/IndexTTS-2 --local_dir checkpoints", check=False):
+                if run(f"modelscope download --model IndexTeam/IndexTTS-2 --local_dir {local_dir}", check=False):
                     success = True
             except Exception as e:
                 print_warn(f"从 ModelScope 下载失败: {e}")
@@ -229,6 +341,43 @@ def download_models():
         sys.exit(1)
     print_ok("模型下载完成")
 
+def models_ready(local_dir=CHECKPOINTS_DIR):
+    """模型文件清单存在，且清单中的文件都在、大小一致"""
+    try:
+        with open(os.path.join(local_dir, MODEL_MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return bool(manifest) and all(
+        os.path.isfile(os.path.join(local_dir, path)) and os.path.getsize(os.path.join(local_dir, path)) == size
+        for path, size in manifest.items())
+
+def place_models():
+    """把下载好的模型移入仓库的 checkpoints 目录（覆盖仓库自带的同名文件），并写出文件清单"""
+    print_step("放置模型文件")
+    manifest_path = os.path.join(CHECKPOINTS_DIR, MODEL_MANIFEST)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    for root, dirs, files in os.walk(MODEL_STAGING_DIR):
+        # 跳过命令行工具留下的 .cache 等目录
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.startswith("."):
+                continue
+            src = os.path.join(root, name)
+            rel = os.path.relpath(src, MODEL_STAGING_DIR).replace(os.sep, "/")
+            dst = os.path.join(CHECKPOINTS_DIR, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            os.replace(src, dst)
+            manifest[rel] = os.path.getsize(dst)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    shutil.rmtree(MODEL_STAGING_DIR, ignore_errors=True)
+    print_ok(f"模型文件已放入 {CHECKPOINTS_DIR}")
+
 def check_gpu_support():
     """检查GPU支持"""
     print_step("检查 GPU 支持")
@@ -236,7 +385,8 @@ def check_gpu_support():
         result = subprocess.run(
             [sys.executable, "tools/gpu_check.py"],
             capture_output=True,
-            text=True
+            text=True,
+            cwd=REPO_DIR
         )
         print(result.stdout)
         if result.returncode != 0:
@@ -244,37 +394,147 @@ def check_gpu_support():
     except Exception as e:
         print_warn(f"GPU 检查出错: {e}")
 
+class Step:
+    """
+    安装步骤
+
+    Args:
+        name: 步骤名
+        func: 执行函数
+        deps: 依赖的步骤名
+        skip: 返回 True 时跳过该步骤（输出已存在且有效），在依赖完成后才判断
+        desc: 显示名称
+    """
+
+    def __init__(self, name, func, deps=(), skip=None, desc=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.skip = skip
+        self.desc = desc or name
+
+def build_plan():
+    """IndexTTS2 的安装步骤；克隆仓库与下载模型互不依赖，会同时进行"""
+    return [
+        Step("python", check_python_version, desc="检查 Python 版本"),
+        Step("cuda", check_cuda, ["python"], desc="检查 CUDA 环境"),
+        Step("git", install_git_lfs, ["python"], skip=git_lfs_ready, desc="安装 Git 和 Git LFS"),
+        Step("mirrors", setup_mirrors, ["python"], desc="配置镜像源"),
+        Step("uv", ensure_uv, ["mirrors"], skip=lambda: bool(shutil.which("uv")), desc="安装 UV"),
+        Step("clone", clone_repository, ["git"], skip=repository_ready, desc="克隆代码仓库"),
+        Step("deps", install_dependencies, ["uv", "clone"], skip=dependencies_ready, desc="安装项目依赖"),
+        Step("models", download_models, ["mirrors"], skip=models_ready, desc="下载模型"),
+        Step("place", place_models, ["clone", "models"],
+             skip=lambda: not os.path.isdir(MODEL_STAGING_DIR) and models_ready(), desc="放置模型文件"),
+        Step("gpu", check_gpu_support, ["deps", "place"], desc="检查 GPU 支持"),
+    ]
+
+def plan_waves(steps):
+    """
+    按依赖关系把步骤分层：同一层的步骤互不依赖
+
+    Raises:
+        ValueError: 依赖了不存在的步骤，或存在循环依赖
+    """
+    names = {step.name for step in steps}
+    for step in steps:
+        missing = [d for d in step.deps if d not in names]
+        if missing:
+            raise ValueError(f"步骤 {step.name} 依赖了不存在的步骤: {', '.join(missing)}")
+    done, waves, pending = set(), [], list(steps)
+    while pending:
+        wave = [step for step in pending if all(d in done for d in step.deps)]
+        if not wave:
+            raise ValueError(f"存在循环依赖: {', '.join(step.name for step in pending)}")
+        waves.append(wave)
+        done.update(step.name for step in wave)
+        pending = [step for step in pending if step.name not in done]
+    return waves
+
+def _run_step(step):
+    start = time.perf_counter()
+    if step.skip is not None and step.skip():
+        print_ok(f"{step.desc}: 已就绪，跳过")
+        return "跳过", time.perf_counter() - start
+    try:
+        step.func()
+    except (Exception, SystemExit) as e:
+        # 步骤内部出错时会先打印原因再调用 sys.exit
+        if not isinstance(e, SystemExit):
+            print_error(f"{step.desc}失败: {e}")
+        return "失败", time.perf_counter() - start
+    return "完成", time.perf_counter() - start
+
+def run_plan(steps, max_workers=4):
+    """
+    按依赖关系执行步骤：依赖都已完成（或跳过）的步骤立即开始，互不依赖的步骤并发执行；
+    某个步骤失败时，依赖它的步骤不再执行，其他步骤继续
+
+    Args:
+        steps: Step 列表
+        max_workers: 同时执行的步骤数上限
+
+    Returns:
+        {步骤名: (状态, 耗时秒数)}，状态为 "完成"、"跳过"、"失败" 或 "未执行"
+    """
+    plan_waves(steps)  # 检查依赖关系
+    results = {}
+    pending = list(steps)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for step in list(pending):
+                if any(results.get(d, ("",))[0] in ("失败", "未执行") for d in step.deps):
+                    results[step.name] = ("未执行", 0.0)
+                    pending.remove(step)
+                elif all(results.get(d, ("",))[0] in ("完成", "跳过") for d in step.deps):
+                    pending.remove(step)
+                    running[pool.submit(_run_step, step)] = step
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future).name] = future.result()
+    return results
+
+def print_summary(steps, results, elapsed):
+    """打印每个步骤的状态与耗时"""
+    print_step("各步骤耗时")
+    for step in steps:
+        status, seconds = results.get(step.name, ("未执行", 0.0))
+        print(f"  {step.name:<10}{status:<6}{seconds:>8.1f}s  {step.desc}")
+    total = sum(seconds for _, seconds in results.values())
+    print(f"  总耗时 {elapsed:.1f}s（各步骤合计 {total:.1f}s）")
+
 def main():
     """主函数"""
+    import argparse
+    parser = argparse.ArgumentParser(description="IndexTTS2 自动安装脚本")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="同时执行的步骤数上限")
+    parser.add_argument("--dry-run", action="store_true", help="只打印执行计划与各步骤是否会被跳过")
+    args = parser.parse_args()
+    steps = build_plan()
+
+    if args.dry_run:
+        for i, wave in enumerate(plan_waves(steps), 1):
+            print(f"第 {i} 批（可并发）:")
+            for step in wave:
+                skip = "（已就绪，跳过）" if step.skip is not None and step.skip() else ""
+                deps = f" <- {', '.join(step.deps)}" if step.deps else ""
+                print(f"  {step.name:<10}{step.desc}{deps}{skip}")
+        return
+
     # 显示欢迎信息
     print(f"{Colors.HEADER}开始安装 IndexTTS2...{Colors.ENDC}")
+    start = time.perf_counter()
+    results = run_plan(steps, args.jobs)
+    print_summary(steps, results, time.perf_counter() - start)
 
-    # 1. 检查Python版本
-    check_python_version()
-
-    # 2. 检查CUDA环境
-    check_cuda()
-
-    # 3. 安装git和git-lfs
-    install_git_lfs()
-
-    # 4. 安装uv包管理器
-    install_uv()
-
-    # 5. 克隆代码仓库
-    clone_repository()
-
-    # 6. 安装依赖
-    install_dependencies()
-
-    # 7. 下载模型
-    download_models()
-
-    # 8. 检查GPU支持
-    check_gpu_support()
-
+    if any(status in ("失败", "未执行") for status, _ in results.values()):
+        print_error("安装未完成，修复问题后重新运行即可，已完成的步骤会自动跳过")
+        sys.exit(1)
     print(f"\n{Colors.OKGREEN}IndexTTS2 安装完成！{Colors.ENDC}")
-    print(f"{Colors.OKBLUE}可以进入 index-tts 目录使用了！{Colors.ENDC}")
+    print(f"{Colors.OKBLUE}可以进入 {REPO_DIR} 目录使用了！{Colors.ENDC}")
 
 if __name__ == "__main__":
     try:
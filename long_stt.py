@@ -0,0 +1,285 @@
+"""
+长录音并行识别
+
+一个长文件在 Speech_to_Text 中只能由一个识别器顺序解码。这里先按块读取并转换为 16kHz 单声道，
+用向量化的短时能量找出静音间隙，在间隙中点把音频切成互不依赖的片段，再由进程池中的多个识别器并行解码，
+最后按原顺序拼接结果，并把每句话与每个词的时间加上片段在整个文件中的偏移。
+
+- 读取、切分与解码流水线进行：只有最多 2 × 进程数 个片段在内存中等待解码，内存占用与文件长度无关
+- 片段长度在 MIN_SEGMENT_SECONDS 与 MAX_SEGMENT_SECONDS 之间，优先在最长的停顿处切分；
+  找不到足够长的停顿时在能量最低的一帧处切分
+"""
+import argparse
+import collections
+import concurrent.futures
+import difflib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import batch_stt
+import mono
+
+MIN_SEGMENT_SECONDS = 10.0
+MAX_SEGMENT_SECONDS = 30.0
+MIN_SILENCE = 0.3  # 可作为切分点的最短静音（秒）
+FRAME_MS = 20  # 能量分析帧长（毫秒）
+MARGIN_DB = 10.0  # 静音阈值比片段内的本底噪声（第 10 百分位帧能量）高出的分贝数
+CHUNK_BYTES = 4000 * 2  # 每次送入识别器的字节数，与 stt 一致
+
+
+def frame_energy_db(samples, frame_len):
+    """每帧的能量 20*log10(RMS)，RMS 以 int16 幅度计；不足一帧的尾部忽略"""
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    power = np.einsum("ij,ij->i", frames, frames) / frame_len
+    return 10 * np.log10(np.maximum(power, 1.0))
+
+
+def find_silences(samples, rate=mono.TARGET_RATE, min_silence=MIN_SILENCE, threshold_db=None,
+                  margin_db=MARGIN_DB, frame_ms=FRAME_MS):
+    """
+    找出不短于 min_silence 的静音段
+
+    Args:
+        samples: 一维 int16 数组
+        rate: 采样率
+        min_silence: 最短静音时长（秒）
+        threshold_db: 静音阈值，默认为本底噪声加 margin_db（且不高于响亮帧的能量减 margin_db），适应不同录音电平
+        margin_db: 自适应阈值与本底噪声、响亮帧能量之间的分贝数
+        frame_ms: 分析帧长（毫秒）
+
+    Returns:
+        (starts, ends)，静音段的起止样本下标数组
+    """
+    frame_len = max(1, int(rate * frame_ms / 1000))
+    energy = frame_energy_db(samples, frame_len)
+    if len(energy) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if threshold_db is None:
+        # 同时要求比响亮的帧（第 90 百分位）低 margin_db：平稳的噪声或持续的语音中没有“静音”
+        floor, loud = np.percentile(energy, [10, 90])
+        threshold_db = min(floor + margin_db, loud - margin_db)
+    silent = np.concatenate(([0], (energy < threshold_db).astype(np.int8), [0]))
+    edges = np.diff(silent)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) * frame_len >= min_silence * rate
+    return starts[keep] * frame_len, ends[keep] * frame_len
+
+
+def choose_cut(samples, lo, hi, rate=mono.TARGET_RATE, **kwargs):
+    """
+    在 [lo, hi] 中选择切分点：最长静音段的中点，没有静音段时为能量最低一帧的中点
+
+    Args:
+        kwargs: 传给 find_silences 的参数
+
+    Returns:
+        (切分点样本下标, 是否落在静音段中)
+    """
+    starts, ends = find_silences(samples[:hi], rate, **kwargs)
+    mids = (starts + ends) // 2
+    ok = (mids >= lo) & (mids <= hi)
+    if ok.any():
+        longest = np.argmax(np.where(ok, ends - starts, -1))
+        return int(mids[longest]), True
+    frame_len = max(1, int(rate * kwargs.get("frame_ms", FRAME_MS) / 1000))
+    energy = frame_energy_db(samples[lo:hi], frame_len)
+    if len(energy) == 0:
+        return hi, False
+    return lo + int(np.argmin(energy)) * frame_len + frame_len // 2, False
+
+
+def split_on_silence(blocks, rate=mono.TARGET_RATE, min_seconds=MIN_SEGMENT_SECONDS,
+                     max_seconds=MAX_SEGMENT_SECONDS, **kwargs):
+    """
+    把连续的音频块切分为在静音处断开的片段，最多缓存 max_seconds 的音频
+
+    Args:
+        blocks: 一维 int16 数组的可迭代对象（如 mono.stream_mono_16k）
+        rate: 采样率
+        min_seconds: 片段最短时长（秒），最后一个片段除外
+        max_seconds: 片段最长时长（秒）
+        kwargs: 传给 find_silences 的参数
+
+    Yields:
+        (片段在整个音频中的起始样本下标, 片段的 int16 数组)
+    """
+    lo = int(min_seconds * rate)
+    hi = max(lo + 1, int(max_seconds * rate))
+    pending = []
+    n_pending = 0
+    offset = 0
+    for block in blocks:
+        pending.append(block)
+        n_pending += len(block)
+        if n_pending < hi:
+            continue
+        buffer = np.concatenate(pending)
+        while len(buffer) >= hi:
+            cut, _ = choose_cut(buffer, lo, hi, rate, **kwargs)
+            cut = max(1, cut)
+            yield offset, buffer[:cut]
+            offset += cut
+            buffer = buffer[cut:]
+        pending = [buffer]
+        n_pending = len(buffer)
+    if n_pending:
+        yield offset, np.concatenate(pending)
+
+
+def _sentence(result, offset, end):
+    """把识别器的一句结果转换为带绝对时间的句子，没有词时间时使用片段的时间范围"""
+    text = result.get("text", "")
+    if not text:
+        return None
+    words = [dict(w, start=w["start"] + offset, end=w["end"] + offset) for w in result.get("result", [])]
+    sentence = {"start": words[0]["start"] if words else offset,
+                "end": words[-1]["end"] if words else end, "text": text}
+    if words:
+        sentence["words"] = words
+    return sentence
+
+
+def _decode_segment(segment):
+    start_sample, samples = segment
+    started = time.perf_counter()
+    offset = start_sample / mono.TARGET_RATE
+    end = offset + len(samples) / mono.TARGET_RATE
+    # 工作进程中的 STT 实例由 batch_stt._init_worker 创建
+    stt = batch_stt._worker_stt
+    if stt is None:
+        raise RuntimeError(f"工作进程初始化失败: {batch_stt._worker_error}")
+    rec = stt.recognizer_factory(stt.model, mono.TARGET_RATE)
+    if hasattr(rec, "SetWords"):
+        rec.SetWords(True)
+    data = samples.tobytes()
+    results = []
+    for i in range(0, len(data), CHUNK_BYTES):
+        if rec.AcceptWaveform(data[i:i + CHUNK_BYTES]):
+            results.append(json.loads(rec.Result()))
+    results.append(json.loads(rec.FinalResult()))
+    sentences = [s for s in (_sentence(r, offset, end) for r in results) if s is not None]
+    return {"start": offset, "end": end, "sentences": sentences, "elapsed": time.perf_counter() - started}
+
+
+def transcribe_segments(file_path, workers=None, model_path=None, stt_factory=None, **kwargs):
+    """
+    在静音处切分长录音并用多个进程并行识别
+
+    Args:
+        file_path: 音频文件路径（WAV/FLAC/OGG 等）
+        workers: 工作进程数，默认为 CPU 核心数；为 1 时在本进程中解码
+        model_path: 模型路径（可选），默认使用配置中的模型
+        stt_factory: 在每个工作进程中创建 STT 的无参可调用对象（需可 pickle），指定时忽略 model_path
+        kwargs: 传给 split_on_silence 的参数
+
+    Yields:
+        按时间顺序产出的片段结果: start, end, elapsed（秒）, sentences（每句 start, end, text，
+        识别器支持时还有 words），时间均相对于整个文件
+    """
+    workers = workers or os.cpu_count() or 1
+    segments = split_on_silence(mono.stream_mono_16k(file_path), **kwargs)
+    if workers == 1:
+        batch_stt._init_worker(model_path, stt_factory=stt_factory)
+        yield from map(_decode_segment, segments)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=batch_stt._init_worker,
+                                                initargs=(model_path, True, stt_factory)) as pool:
+        # 按提交顺序取结果；等待中的片段不超过 2 × 进程数，读取不会远远领先于解码
+        pending = collections.deque()
+        for segment in segments:
+            pending.append(pool.submit(_decode_segment, segment))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def transcribe_long(file_path, workers=None, model_path=None, stt_factory=None, **kwargs):
+    """
+    并行识别长录音
+
+    Returns:
+        (全文, 句子列表)，全文与 Speech_to_Text 的格式相同（各句以空格连接）
+    """
+    sentences = []
+    for segment in transcribe_segments(file_path, workers, model_path, stt_factory, **kwargs):
+        sentences.extend(segment["sentences"])
+    return " ".join(s["text"] for s in sentences), sentences
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    以 reference 为准的词错误率（替换 + 删除 + 插入）/ 参考词数，按空格分词，使用 difflib 对齐
+
+    中文模型的输出本身以空格分隔词语
+    """
+    ref = reference.split()
+    hyp = hypothesis.split()
+    if not ref:
+        return float(len(hyp) > 0)
+    errors = 0
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, ref, hyp, autojunk=False).get_opcodes():
+        if tag != "equal":
+            errors += max(i2 - i1, j2 - j1)
+    return errors / len(ref)
+
+
+def _timestamp(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes // 60):02d}:{int(minutes % 60):02d}:{seconds:04.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长录音并行识别：在静音处切分后多进程解码")
+    parser.add_argument("file", help="音频文件（WAV/FLAC/OGG 等）")
+    parser.add_argument("-o", "--output", help="按句输出 JSONL 文件（默认以时间戳格式输出到标准输出）")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="工作进程数（默认为 CPU 核心数）")
+    parser.add_argument("-m", "--model", default=None, help="模型路径（默认使用配置中的模型）")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SEGMENT_SECONDS, help="片段最短时长（秒）")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SEGMENT_SECONDS, help="片段最长时长（秒）")
+    parser.add_argument("--verify", action="store_true", help="再用单个识别器顺序识别一遍，报告两者的词错误率")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    texts = []
+    n_segments = 0
+    audio = 0.0
+    try:
+        for segment in transcribe_segments(args.file, args.workers, args.model,
+                                           min_seconds=args.min_seconds, max_seconds=args.max_seconds):
+            n_segments += 1
+            audio = segment["end"]
+            for sentence in segment["sentences"]:
+                texts.append(sentence["text"])
+                if args.output:
+                    out.write(json.dumps(sentence, ensure_ascii=False) + "\n")
+                else:
+                    out.write(f"[{_timestamp(sentence['start'])} - {_timestamp(sentence['end'])}] {sentence['text']}\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    wall = time.perf_counter() - start
+
+    print(f"[✓] {n_segments} 个片段，音频 {audio:.1f}s，耗时 {wall:.1f}s", file=sys.stderr)
+    if audio > 0:
+        print(f"    实时率 (RTF): {wall / audio:.4f}", file=sys.stderr)
+    if args.verify:
+        from stt import STT
+        start = time.perf_counter()
+        sequential = STT(model_path=args.model).Speech_to_Text(args.file)
+        print(f"[-] 顺序识别耗时 {time.perf_counter() - start:.1f}s，"
+              f"并行结果相对顺序结果的词错误率: {word_error_rate(sequential, ' '.join(texts)):.2%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
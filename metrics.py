@@ -0,0 +1,304 @@
+"""
+进程内的指标与追踪
+
+提供阶段耗时 (span)、计数器 (inc) 和直方图 (observe)，数据由导出器输出为
+JSON Lines 日志或 Prometheus textfile。默认关闭，关闭时 span() 返回共享的空上下文，
+inc()/observe() 只做两次布尔判断就返回。
+
+在 config.toml 的 [metrics] 中开启（第一次记录指标时读取，导入本模块时不读取配置），或在代码中调用 enable()。
+"""
+import atexit
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+
+PREFIX = "myagent_"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = tuple(1024 * 1024 * x for x in (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100))
+
+_enabled = False
+_configured = False  # 是否已按 config.toml（或 enable()/disable()）确定开关
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_exporters = []
+_flusher = None  # (线程, 停止事件)
+_NOOP = contextlib.nullcontext()
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def enabled():
+    return _enabled or (not _configured and _configure_from_config())
+
+
+def inc(name, value=1, **labels):
+    """计数器增加 value"""
+    if not _enabled and (_configured or not _configure_from_config()):
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """记录一次观测值到直方图（buckets 仅在该指标首次出现时生效）"""
+    if not _enabled and (_configured or not _configure_from_config()):
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = _Histogram(buckets)
+        hist.observe(value)
+
+
+class _Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        observe(f"{self.name}_seconds", duration, **self.labels)
+        event = {
+            "type": "span",
+            "ts": time.time(),
+            "name": self.name,
+            "duration": duration,
+            "labels": self.labels,
+        }
+        if exc_type is not None:
+            event["error"] = exc_type.__name__
+        for exporter in _exporters:
+            exporter.on_event(event)
+        return False
+
+
+def span(name, **labels):
+    """
+    记录一个阶段的耗时
+
+    用法:
+        with metrics.span("stt_decode", model="small"):
+            ...
+    """
+    if not _enabled and (_configured or not _configure_from_config()):
+        return _NOOP
+    return _Span(name, labels)
+
+
+def snapshot():
+    """返回当前所有指标的副本"""
+    with _lock:
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in _counters.items()]
+        histograms = [
+            {"name": n, "labels": dict(l), "buckets": list(h.buckets), "counts": list(h.counts),
+             "sum": h.sum, "count": h.count}
+            for (n, l), h in _histograms.items()
+        ]
+    return {"counters": counters, "histograms": histograms}
+
+
+def flush():
+    """将当前指标写入所有导出器"""
+    if not _exporters:
+        return
+    data = snapshot()
+    for exporter in _exporters:
+        exporter.flush(data)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+class JsonLinesExporter:
+    """每个 span 写一行 JSON；flush 时追加一行指标快照。文件保持打开，按行缓冲"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+
+    def on_event(self, event):
+        self._write(event)
+
+    def flush(self, data):
+        self._write({"type": "snapshot", "ts": time.time(), **data})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items()) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class PrometheusTextfileExporter:
+    """
+    以 Prometheus 文本格式写出全部指标（供 node_exporter 的 textfile collector 读取）
+
+    先写临时文件再替换，避免采集时读到写了一半的文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def on_event(self, event):
+        pass
+
+    def close(self):
+        pass
+
+    def flush(self, data):
+        lines = []
+        typed = set()
+        for c in data["counters"]:
+            name = PREFIX + c["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(c['labels'])} {c['value']}")
+        for h in data["histograms"]:
+            name = PREFIX + h["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(h["buckets"] + ["+Inf"], h["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(h['labels'], {'le': bound})} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(h['labels'])} {h['sum']}")
+            lines.append(f"{name}_count{_format_labels(h['labels'])} {h['count']}")
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+def enable(exporters=(), flush_interval=None):
+    """
+    开启指标收集
+
+    Args:
+        exporters: 导出器列表
+        flush_interval: 定期 flush 的间隔（秒），为空时只在进程退出时 flush
+    """
+    global _enabled, _configured, _flusher
+    _stop_flusher()
+    _close_exporters(keep=exporters)
+    _exporters[:] = list(exporters)
+    _enabled = True
+    _configured = True
+    if flush_interval:
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(flush_interval):
+                flush()
+        _flusher = (threading.Thread(target=loop, name="metrics-flush", daemon=True), stop)
+        _flusher[0].start()
+
+
+def disable():
+    """flush 后关闭指标收集：停止定期 flush 的线程并关闭导出器"""
+    global _enabled, _configured
+    _stop_flusher()
+    flush()
+    _enabled = False
+    _configured = True
+    _close_exporters()
+    _exporters.clear()
+
+
+def _stop_flusher():
+    """通知定期 flush 的线程退出并等待它结束"""
+    global _flusher
+    if _flusher is None:
+        return
+    thread, stop = _flusher
+    _flusher = None
+    stop.set()
+    if thread is not threading.current_thread():
+        thread.join()
+
+
+def _close_exporters(keep=()):
+    for exporter in _exporters:
+        # 自定义导出器可以不实现 close
+        if not any(exporter is k for k in keep) and hasattr(exporter, "close"):
+            exporter.close()
+
+
+def _configure_from_config():
+    """
+    按 config.toml 的 [metrics] 开启指标收集（只执行一次）；没有配置文件时保持关闭
+
+    Returns:
+        是否已开启
+    """
+    global _configured
+    with _lock:
+        if _configured:
+            return _enabled
+        _configured = True
+    from settings import load_config
+    try:
+        cfg = load_config().metrics
+    except FileNotFoundError:
+        return False
+    if not cfg.enabled:
+        return False
+    exporters = []
+    if cfg.jsonl_path:
+        exporters.append(JsonLinesExporter(cfg.jsonl_path))
+    if cfg.prometheus_path:
+        exporters.append(PrometheusTextfileExporter(cfg.prometheus_path))
+    enable(exporters, cfg.flush_interval)
+    return True
+
+
+atexit.register(flush)
@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import OrderedDict
+from settings import load_config
+
+
+def _model_size(path):
+    """以模型目录在磁盘上的大小估算其内存占用（字节）"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class _Entry:
+    def __init__(self):
+        self.model = None
+        self.size = 0
+        self.refs = 0
+        self.error = None
+        self.ready = threading.Event()
+
+
+class ModelRegistry:
+    """
+    进程内共享的 Vosk 模型注册表
+
+    同一路径的模型只加载一次；正在被识别器使用（引用计数 > 0）的模型不会被淘汰，
+    其余模型在总占用超过上限时按最近最少使用（LRU）顺序释放。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(str(path))
+
+    def _get_or_load(self, path, ref):
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            loader = entry is None
+            if loader:
+                entry = _Entry()
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if ref:
+                entry.refs += 1
+
+        if loader:
+            try:
+                import vosk
+                entry.model = vosk.Model(str(path))
+                entry.size = _model_size(key)
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    self._entries.pop(key, None)
+            entry.ready.set()
+            with self._lock:
+                self._evict()
+        else:
+            entry.ready.wait()
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.model
+
+    def _evict(self):
+        """在持有锁的情况下，按 LRU 顺序释放未被引用的模型直到不超过上限"""
+        total = sum(e.size for e in self._entries.values())
+        # 最近使用的模型始终保留，避免刚加载完就被释放
+        for key in list(self._entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs > 0 or not entry.ready.is_set():
+                continue
+            total -= entry.size
+            del self._entries[key]
+
+    def acquire(self, path):
+        """获取模型并增加引用计数，用完后需调用 release"""
+        return self._get_or_load(path, ref=True)
+
+    def release(self, path):
+        """减少模型的引用计数"""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+            self._evict()
+
+    def preload(self, path):
+        """
+        在后台线程中预加载模型（不持有引用）
+
+        Returns:
+            加载线程
+        """
+        def load():
+            try:
+                self._get_or_load(path, ref=False)
+            except Exception as e:
+                print(f"[模型预加载失败] {path}: {e}")
+
+        t = threading.Thread(target=load, daemon=True)
+        t.start()
+        return t
+
+    def loaded(self):
+        """返回已加载模型的路径列表（按最近使用排序）"""
+        with self._lock:
+            return [k for k, e in self._entries.items() if e.ready.is_set()]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """进程内共享的注册表，第一次使用时按 config.toml 中 [stt] MODEL_CACHE_MB 创建（导入本模块时不读取配置）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(int(load_config().stt.MODEL_CACHE_MB * 1024 * 1024))
+        return _registry
+
+
+def acquire(path):
+    return get_registry().acquire(path)
+
+
+def release(path):
+    return get_registry().release(path)
+
+
+def preload(path):
+    return get_registry().preload(path)
@@ -1,14 +1,273 @@
 # mono.py 备选方案
-import librosa
-import soundfile as sf
-import toml
-import pathlib
-import random
-with open("config.toml", "r",encoding="utf-8") as f:
-    config = toml.load(f)
+import functools
+import math
+import wave
+import numpy as np
+import metrics
+import temp_audio
+from settings import load_config
+
+TARGET_RATE = 16000
+BLOCK_SECONDS = 0.5  # 流式读取时每块的时长（秒）
+_ZERO_CROSSINGS = 10  # 每侧保留的 sinc 过零点数，决定每个输出样本的滤波器阶数
+_KAISER_BETA = 8.0
+_ROLLOFF = 0.95
+
+
+def load_audio(file_path):
+    """
+    读取音频文件为 int16 数组
+
+    Args:
+        file_path: 文件路径，或 temp_audio.MemoryAudio 等文件对象
+
+    Returns:
+        (samples, sample_rate)，samples 形状为 (帧数, 声道数)
+    """
+    try:
+        with wave.open(temp_audio.wave_target(file_path), "rb") as wf:
+            if wf.getsampwidth() == 2 and wf.getcomptype() == "NONE":
+                channels = wf.getnchannels()
+                data = wf.readframes(wf.getnframes())
+                return np.frombuffer(data, dtype=np.int16).reshape(-1, channels), wf.getframerate()
+    except (wave.Error, EOFError):
+        pass
+    # 非 16 位 PCM 的 WAV 或其他格式（FLAC/OGG 等）交给 soundfile 解码
+    import soundfile as sf
+    samples, sample_rate = sf.read(temp_audio.wave_target(file_path), dtype="int16", always_2d=True)
+    return samples, sample_rate
+
+
+def downmix(samples, channels=1):
+    """
+    将交错排列或 (帧数, 声道数) 的 int16 数据混合为单声道
+
+    Returns:
+        一维 int16 数组
+    """
+    samples = np.asarray(samples, dtype=np.int16)
+    if samples.ndim == 1:
+        samples = samples.reshape(-1, channels)
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    # 先扩宽到 int32 再求和，避免溢出
+    return (samples.sum(axis=1, dtype=np.int32) // samples.shape[1]).astype(np.int16)
+
+
+@functools.lru_cache(maxsize=16)
+def _polyphase_kernels(src_rate, dst_rate):
+    """
+    设计 src_rate -> dst_rate 的低通滤波器并拆分为多相形式，结果按采样率对缓存
+
+    Returns:
+        (kernels, up, down)，kernels 形状为 (up, taps)，每行已按卷积方向翻转
+    """
+    g = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    taps = 2 * _ZERO_CROSSINGS * max(up, down) // up + 1
+    length = taps * up
+    cutoff = _ROLLOFF * 0.5 / max(up, down)  # 以上采样后的采样率归一化
+    n = np.arange(length) - (length - 1) // 2  # 中心对齐到整数样本，与 resample 中的延迟一致
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, _KAISER_BETA) * up
+    kernels = h.reshape(taps, up).T[:, ::-1].astype(np.float32)
+    return np.ascontiguousarray(kernels), up, down
+
+
+def resample(samples, src_rate, dst_rate=TARGET_RATE):
+    """
+    多相 FIR 重采样
+
+    Args:
+        samples: 一维 int16 数组
+        src_rate: 原采样率
+        dst_rate: 目标采样率
+
+    Returns:
+        一维 int16 数组
+    """
+    samples = np.asarray(samples, dtype=np.int16)
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    kernels, up, down = _polyphase_kernels(src_rate, dst_rate)
+    phases, taps = kernels.shape
+    delay = (taps * up - 1) // 2
+
+    # 前补 taps-1 个零，使窗口 padded[i:i+taps] 对应 x[i-taps+1 .. i]
+    padded = np.zeros(len(samples) + 2 * taps, dtype=np.float32)
+    padded[taps - 1:taps - 1 + len(samples)] = samples
+    windows = np.lib.stride_tricks.sliding_window_view(padded, taps)
+
+    # 相位相同的输出样本间隔 up 个，对应的输入窗口间隔 down 个，
+    # 因此每个相位只需一次跨步视图与滤波器的矩阵乘法
+    n_out = -(-len(samples) * up // down)
+    out = np.empty(n_out, dtype=np.float32)
+    for m0 in range(min(up, n_out)):
+        t = m0 * down + delay
+        count = len(range(m0, n_out, up))
+        start = t // up
+        out[m0::up] = windows[start:start + (count - 1) * down + 1:down] @ kernels[t % up]
+    np.clip(np.rint(out), -32768, 32767, out=out)
+    return out.astype(np.int16)
+
+
+class StreamingResampler:
+    """
+    分块重采样：与 resample 使用同一组多相滤波器，块与块之间保留滤波器所需的历史样本，
+    逐块送入与一次性处理整段音频的结果一致，内存占用只与块大小有关
+
+    Args:
+        src_rate: 原采样率
+        dst_rate: 目标采样率
+    """
+
+    def __init__(self, src_rate, dst_rate=TARGET_RATE):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self._passthrough = src_rate == dst_rate
+        if self._passthrough:
+            return
+        self._kernels, self._up, self._down = _polyphase_kernels(src_rate, dst_rate)
+        self._taps = self._kernels.shape[1]
+        self._delay = (self._taps * self._up - 1) // 2
+        # 缓冲区对应 resample 中 padded 数组的一段：开头补 taps-1 个零，_base 为 _buf[0] 的下标
+        self._buf = np.zeros(self._taps - 1, dtype=np.float32)
+        self._base = 0
+        self._received = 0  # 已送入的输入样本数
+        self._produced = 0  # 已输出的样本数
+
+    def _emit(self, n_out):
+        """输出到第 n_out 个样本（不含）为止、输入已足够计算的样本"""
+        m = np.arange(self._produced, n_out)
+        t = m * self._down + self._delay
+        starts = t // self._up
+        # 第 m 个输出需要 padded[start:start+taps]
+        ready = np.searchsorted(starts + self._taps, self._base + len(self._buf), side="right")
+        m, t, starts = m[:ready], t[:ready], starts[:ready]
+        out = np.empty(len(m), dtype=np.float32)
+        if len(m):
+            # 与 resample 相同：相位相同的输出间隔 up 个，对应的窗口间隔 down 个，每个相位一次矩阵乘法
+            windows = np.lib.stride_tricks.sliding_window_view(self._buf, self._taps)
+            for r in range(min(self._up, len(m))):
+                start = starts[r] - self._base
+                count = len(range(r, len(m), self._up))
+                out[r::self._up] = windows[start:start + (count - 1) * self._down + 1:self._down] @ \
+                    self._kernels[t[r] % self._up]
+            self._produced += len(m)
+        # 丢弃之后不再需要的历史样本
+        next_start = (self._produced * self._down + self._delay) // self._up
+        drop = min(next_start - self._base, len(self._buf))
+        if drop > 0:
+            self._buf = self._buf[drop:]
+            self._base += drop
+        np.clip(np.rint(out), -32768, 32767, out=out)
+        return out.astype(np.int16)
+
+    def process(self, samples):
+        """
+        送入一块一维 int16 数据
+
+        Returns:
+            这块数据新产生的输出（一维 int16 数组，可能为空）
+        """
+        samples = np.asarray(samples, dtype=np.int16)
+        if self._passthrough:
+            return samples
+        self._buf = np.concatenate([self._buf, samples.astype(np.float32)])
+        self._received += len(samples)
+        return self._emit(-(-self._received * self._up // self._down))
+
+    def flush(self):
+        """输入结束：补零并输出剩余的样本"""
+        if self._passthrough:
+            return np.empty(0, dtype=np.int16)
+        self._buf = np.concatenate([self._buf, np.zeros(2 * self._taps, dtype=np.float32)])
+        return self._emit(-(-self._received * self._up // self._down))
+
+
+def convert_buffer(samples, sample_rate, channels=1):
+    """
+    在内存中将 int16 音频转换为 16kHz 单声道
+
+    Args:
+        samples: bytes、交错排列的一维 int16 数组或 (帧数, 声道数) 数组
+        sample_rate: 采样率
+        channels: 声道数（samples 为一维数据时使用）
+
+    Returns:
+        一维 int16 数组；输入已是 16kHz 单声道时不做任何处理
+    """
+    if isinstance(samples, (bytes, bytearray, memoryview)):
+        samples = np.frombuffer(samples, dtype=np.int16)
+    with metrics.span("mono_convert", src_rate=sample_rate):
+        mono = downmix(samples, channels)
+        out = resample(mono, sample_rate, TARGET_RATE)
+    metrics.inc("mono_frames_total", len(out))
+    return out
+
+
+def iter_blocks(file_path, block_seconds=BLOCK_SECONDS):
+    """
+    按固定时长分块读取音频文件，不把整个文件读入内存
+
+    Yields:
+        (samples, sample_rate)，samples 形状为 (帧数, 声道数) 的 int16 数组
+    """
+    try:
+        wf = wave.open(temp_audio.wave_target(file_path), "rb")
+    except (wave.Error, EOFError):
+        wf = None
+    if wf is not None:
+        with wf:
+            if wf.getsampwidth() == 2 and wf.getcomptype() == "NONE":
+                channels, rate = wf.getnchannels(), wf.getframerate()
+                block_frames = max(1, int(block_seconds * rate))
+                while True:
+                    data = wf.readframes(block_frames)
+                    if not data:
+                        return
+                    yield np.frombuffer(data, dtype=np.int16).reshape(-1, channels), rate
+    # 非 16 位 PCM 的 WAV 或其他格式（FLAC/OGG 等）由 soundfile 分块解码
+    import soundfile as sf
+    with sf.SoundFile(temp_audio.wave_target(file_path)) as f:
+        block_frames = max(1, int(block_seconds * f.samplerate))
+        for block in f.blocks(blocksize=block_frames, dtype="int16", always_2d=True):
+            yield block, f.samplerate
+
+
+def stream_mono_16k(file_path, block_seconds=BLOCK_SECONDS):
+    """
+    流式读取音频文件并逐块转换为 16kHz 单声道，内存占用与文件长度无关
+
+    Yields:
+        一维 int16 数组（最后一块可能较短）
+    """
+    resampler = None
+    for samples, sample_rate in iter_blocks(file_path, block_seconds):
+        if resampler is None:
+            resampler = StreamingResampler(sample_rate, TARGET_RATE)
+        out = resampler.process(downmix(samples))
+        metrics.inc("mono_frames_total", len(out))
+        if len(out):
+            yield out
+    if resampler is not None:
+        out = resampler.flush()
+        if len(out):
+            yield out
+
+
+def load_mono_16k(file_path):
+    """读取音频文件并在内存中转换为 16kHz 单声道 int16 数组"""
+    samples, sample_rate = load_audio(file_path)
+    return convert_buffer(samples, sample_rate)
+
 
 def convert_to_mono_16k(file_path):
-    signal, sample_rate = librosa.load(file_path, sr=16000, mono=True)
-    temp_path = pathlib.Path(config["record"]["mono_save_path"]) / f"{random.randint(0, 10000)}.wav"
-    sf.write(temp_path, signal, 16000)
+    """转换为 16kHz 单声道 WAV，保存到 [record] mono_save_path 下由 temp_audio 分配的唯一文件名"""
+    signal = load_mono_16k(file_path)
+    temp_path = temp_audio.get_manager(load_config().record.mono_save_path).create(prefix="mono-")
+    with wave.open(temp_audio.wave_target(temp_path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(TARGET_RATE)
+        wf.writeframes(signal.tobytes())
     return temp_path
@@ -1,28 +1,62 @@
-import pyaudio
 import wave
-import toml
 import numpy as np
-import pathlib
 import time
-with open("config.toml", "r",encoding="utf-8") as f:
-    config = toml.load(f)
+import metrics
+import temp_audio
+from settings import legacy_threshold_db, load_config
+from vad import VAD
+
+def _with_defaults(SILENCE_THRESHOLD=None, **params):
+    """
+    未指定（为 None）的录音参数取 config.toml 中 [record] 的值
+
+    旧版按峰值计算的 SILENCE_THRESHOLD 参数换算为 VAD_THRESHOLD_DB（未同时指定 VAD_THRESHOLD_DB 时）
+    """
+    cfg = load_config().record
+    if SILENCE_THRESHOLD is not None and params.get("VAD_THRESHOLD_DB") is None:
+        params["VAD_THRESHOLD_DB"] = legacy_threshold_db(SILENCE_THRESHOLD)
+    for name, value in params.items():
+        if value is None:
+            params[name] = cfg.pyaudio_format if name == "FORMAT" else getattr(cfg, name)
+    return params
 
 def calculate_rms(data, sample_width=2):
     """计算音频数据的RMS（音量）"""
     audio_data = np.frombuffer(data, dtype=np.int16 if sample_width == 2 else np.int8)
-    rms = np.sqrt(np.mean(audio_data ** 2))  # 计算 RMS
+    rms = np.sqrt(np.mean(audio_data.astype(np.float64) ** 2))  # 计算 RMS（先扩宽，避免 int16 平方溢出）
     return rms
 
-def record_wav(
-    FORMAT=eval(config["record"]["FORMAT"]),  # 修正拼写错误：ORMAT -> FORMAT
-    CHANNELS=config["record"]["CHANNELS"],
-    RATE=config["record"]["RATE"],
-    CHUNK=config["record"]["CHUNK"],
-    SILENCE_THRESHOLD=config["record"].get("SILENCE_THRESHOLD", 500),
-    SILENCE_DURATION=config["record"].get("SILENCE_DURATION", 2.0),
-    MAX_DURATION=config["record"].get("MAX_DURATION", 30.0),
-    SAVE_PATH=config["record"].get("SAVE_PATH", "./")
+def stream_chunks(
+    FORMAT=None,
+    CHANNELS=None,
+    RATE=None,
+    CHUNK=None,
+    SILENCE_THRESHOLD=None,
+    SILENCE_DURATION=None,
+    MAX_DURATION=None,
+    vad=None,
+    VAD_THRESHOLD_DB=None
 ):
+    """
+    从麦克风逐块读取音频，检测到声音后开始产出数据块，静音或超时后结束
+
+    Args:
+        与 record_wav 相同的录音参数
+        vad: 自定义的 VAD 实例（可选），默认按配置创建
+        VAD_THRESHOLD_DB: 开始录音的阈值（10ms 帧 RMS 的 dB）；SILENCE_THRESHOLD 为旧版的峰值阈值，会换算为该值
+
+    Yields:
+        原始 PCM 数据块 (bytes)
+    """
+    import pyaudio
+    params = _with_defaults(
+        FORMAT=FORMAT, CHANNELS=CHANNELS, RATE=RATE, CHUNK=CHUNK,
+        SILENCE_THRESHOLD=SILENCE_THRESHOLD, SILENCE_DURATION=SILENCE_DURATION, MAX_DURATION=MAX_DURATION,
+        VAD_THRESHOLD_DB=VAD_THRESHOLD_DB
+    )
+    FORMAT, CHANNELS, RATE, CHUNK = params["FORMAT"], params["CHANNELS"], params["RATE"], params["CHUNK"]
+    SILENCE_DURATION, MAX_DURATION = params["SILENCE_DURATION"], params["MAX_DURATION"]
+
     p = pyaudio.PyAudio()
     stream = p.open(
         format=FORMAT,
@@ -33,41 +67,37 @@ def record_wav(
     )
 
     print("开始录音... (等待声音输入)")
-    frames = []
-    silent_frames = 0
-    silence_limit = int(SILENCE_DURATION * RATE / CHUNK)
+    if vad is None:
+        vad = VAD.from_config(RATE, CHUNK, CHANNELS, threshold_db=params["VAD_THRESHOLD_DB"], hangover=SILENCE_DURATION)
+    recorded_chunks = 0
+    read_chunks = 0
+    chunk_bytes = CHUNK * CHANNELS * pyaudio.get_sample_size(FORMAT)
     max_frames = int(MAX_DURATION * RATE / CHUNK) if MAX_DURATION else None
-    started = False
+    start_time = time.perf_counter()
 
     try:
         while True:
             data = stream.read(CHUNK, exception_on_overflow=False)
-            audio_data = np.frombuffer(data, dtype=np.int16)
-            amplitude = np.abs(audio_data)
-            dB = 20 * np.log10(np.max(amplitude) if np.max(amplitude) > 0 else 1)
+            read_chunks += 1
+            was_triggered = vad.triggered
+            kept = vad.process(data)
             # 调试信息：打印当前音量（可选）
-            print(f"当前音量 dB: {dB}", end="\r")  # 动态显示
-            # 检测是否开始录音（有声音输入）
-            if not started:
-                if dB > SILENCE_THRESHOLD:
-                    started = True
-                    print("\n检测到声音，开始录音...")
-                else:
-                    continue
-            
-            frames.append(data)
-            
+            print(f"当前音量 dB: {vad.level_db:.1f}", end="\r")  # 动态显示
+            if vad.triggered and not was_triggered:
+                print("\n检测到声音，开始录音...")
+                metrics.observe("record_wait_for_speech_seconds", time.perf_counter() - start_time)
+
+            for block in kept:
+                yield block
+            recorded_chunks += sum(len(block) for block in kept) // chunk_bytes
+
             # 检测静音
-            if dB < SILENCE_THRESHOLD:
-                silent_frames += 1
-                if silent_frames > silence_limit:
-                    print(f"\n检测到{SILENCE_DURATION}秒静音，停止录音。")
-                    break
-            else:
-                silent_frames = 0
-            
+            if vad.ended:
+                print(f"\n检测到{SILENCE_DURATION}秒静音，停止录音。")
+                break
+
             # 检查最大录音时长
-            if max_frames and len(frames) >= max_frames:
+            if max_frames and recorded_chunks >= max_frames:
                 print(f"\n达到最大录音时长{MAX_DURATION}秒，停止录音。")
                 break
 
@@ -78,17 +108,112 @@ def record_wav(
         stream.stop_stream()
         stream.close()
         p.terminate()
+        metrics.observe("record_duration_seconds", time.perf_counter() - start_time)
+        metrics.inc("record_chunks_read_total", read_chunks)
+        metrics.inc("record_chunks_kept_total", recorded_chunks)
+        metrics.inc("record_bytes_total", recorded_chunks * chunk_bytes)
 
-    # 保存录音文件
-    save_path = pathlib.Path(SAVE_PATH) / f"{time.strftime('%Y%m%d%H%M%S')}.wav"
-    with wave.open(str(save_path), 'wb') as wave_file:
-        wave_file.setnchannels(CHANNELS)
-        wave_file.setsampwidth(p.get_sample_size(FORMAT))
-        wave_file.setframerate(RATE)
-        wave_file.writeframes(b''.join(frames))
+def record_wav(
+    FORMAT=None,
+    CHANNELS=None,
+    RATE=None,
+    CHUNK=None,
+    SILENCE_THRESHOLD=None,
+    SILENCE_DURATION=None,
+    MAX_DURATION=None,
+    SAVE_PATH=None,
+    VAD_THRESHOLD_DB=None
+):
+    """
+    录音并保存为 WAV 文件，未指定的参数取 config.toml 中 [record] 的值
+
+    Returns:
+        保存的文件路径（由 temp_audio 分配，文件名唯一；[temp] mode = "memory" 时不在磁盘上创建文件）
+    """
+    import pyaudio
+    params = _with_defaults(
+        FORMAT=FORMAT, CHANNELS=CHANNELS, RATE=RATE, CHUNK=CHUNK,
+        SILENCE_THRESHOLD=SILENCE_THRESHOLD, SILENCE_DURATION=SILENCE_DURATION, MAX_DURATION=MAX_DURATION,
+        VAD_THRESHOLD_DB=VAD_THRESHOLD_DB
+    )
+    SAVE_PATH = load_config().record.SAVE_PATH if SAVE_PATH is None else SAVE_PATH
+
+    # 边录边写：每个数据块直接追加到 WAV 文件，关闭时回填文件头中的长度，
+    # 内存占用与录音时长无关，也没有结束时拼接全部数据的复制
+    save_path = temp_audio.get_manager(SAVE_PATH).create()
+    with wave.open(temp_audio.wave_target(save_path), 'wb') as wave_file:
+        wave_file.setnchannels(params["CHANNELS"])
+        wave_file.setsampwidth(pyaudio.get_sample_size(params["FORMAT"]))
+        wave_file.setframerate(params["RATE"])
+        for data in stream_chunks(**params):
+            wave_file.writeframesraw(data)
 
     print(f"录音文件已保存为 {save_path}")
     return save_path
 
+class PcmBuffer:
+    """
+    预先分配的 int16 PCM 缓冲区
+
+    容量按最长录音时长（加上预录时长）一次分配，数据块直接复制到缓冲区中；
+    仅当录音超出预估容量时才按倍数扩容。
+
+    Args:
+        rate: 采样率
+        channels: 声道数
+        max_duration: 预估的最长时长（秒），为空时先按 10 秒分配
+    """
+
+    def __init__(self, rate, channels, max_duration=None):
+        self.channels = channels
+        capacity = int((max_duration or 10.0) * rate) * channels
+        self._data = np.empty(max(capacity, channels), dtype=np.int16)
+        self._size = 0
+
+    def append(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        end = self._size + len(samples)
+        if end > len(self._data):
+            grown = np.empty(max(end, 2 * len(self._data)), dtype=np.int16)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:end] = samples
+        self._size = end
+
+    def __len__(self):
+        return self._size // self.channels
+
+    def view(self):
+        """返回已录制数据的视图（不复制），形状为 (帧数, 声道数)"""
+        return self._data[:self._size].reshape(-1, self.channels)
+
+def record_pcm(
+    FORMAT=None,
+    CHANNELS=None,
+    RATE=None,
+    CHUNK=None,
+    SILENCE_THRESHOLD=None,
+    SILENCE_DURATION=None,
+    MAX_DURATION=None,
+    VAD_THRESHOLD_DB=None
+):
+    """
+    录音到内存中预先分配的缓冲区，不写文件（仅支持 16 位格式）
+
+    Returns:
+        (samples, RATE)，samples 为 (帧数, 声道数) 的 int16 数组
+    """
+    params = _with_defaults(
+        FORMAT=FORMAT, CHANNELS=CHANNELS, RATE=RATE, CHUNK=CHUNK,
+        SILENCE_THRESHOLD=SILENCE_THRESHOLD, SILENCE_DURATION=SILENCE_DURATION, MAX_DURATION=MAX_DURATION,
+        VAD_THRESHOLD_DB=VAD_THRESHOLD_DB
+    )
+    RATE, MAX_DURATION = params["RATE"], params["MAX_DURATION"]
+    pre_roll = load_config().record.VAD_PRE_ROLL
+    buffer = PcmBuffer(RATE, params["CHANNELS"], MAX_DURATION + pre_roll + params["CHUNK"] / RATE if MAX_DURATION else None)
+    for data in stream_chunks(**params):
+        buffer.append(data)
+    return buffer.view(), RATE
+
 if __name__ == "__main__":
     record_wav()
@@ -0,0 +1,336 @@
+"""
+边下载边解压：通过 HTTP Range 随机访问远端 ZIP
+
+先读取压缩包末尾的中央目录，再把需要的条目按偏移分批，由多个线程分别发 Range 请求，
+边接收边解压写入目标目录。磁盘上不会出现完整的压缩包，安装过程约等于一次网络传输；
+与磁盘上已有文件一致（大小与 CRC32 相同）的条目直接跳过。
+"""
+import collections
+import fnmatch
+import os
+import random
+import shutil
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+import dl_file
+import unzip
+
+BATCH_SIZE = 8 * 1024 * 1024  # 相邻的小条目合并为一个请求，单个请求最多覆盖的字节数
+MAX_GAP = 64 * 1024  # 两个条目之间的间隔小于该值时合并请求，间隔部分直接丢弃
+WRITE_SIZE = 1024 * 1024  # 每次读取/解压的块大小
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+
+class HttpRangeFile:
+    """
+    只读、可 seek 的远端文件，供 zipfile 读取中央目录
+
+    按块发 Range 请求，并缓存最近读过的若干块。
+
+    Args:
+        url: 文件URL
+        size: 文件大小
+        session: 使用的 requests.Session
+        block_size: 每次请求的最小字节数
+    """
+
+    def __init__(self, url, size, session=None, block_size=256 * 1024, max_blocks=16):
+        self.url = url
+        self.size = size
+        self.session = session or dl_file.get_session()
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self._pos = 0
+        self._blocks = collections.OrderedDict()
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self._pos = max(0, min(offset, self.size))
+        return self._pos
+
+    def _get(self, start, end):
+        headers = {'Range': f'bytes={start}-{end - 1}', 'Accept-Encoding': 'identity', **dl_file.DEFAULT_HEADERS}
+        r = self.session.get(self.url, headers=headers, timeout=30)
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise dl_file.RangeNotSupported(f"HTTP {r.status_code}")
+        return r.content
+
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is None:
+            start = index * self.block_size
+            block = self._get(start, min(self.size, start + self.block_size))
+            self._blocks[index] = block
+            if len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(index)
+        return block
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self._pos
+        n = min(n, self.size - self._pos)
+        if n <= 0:
+            return b""
+        if n > self.block_size:
+            # 大块读取直接请求，不进缓存
+            data = self._get(self._pos, self._pos + n)
+            self._pos += len(data)
+            return data
+        out = bytearray()
+        while n > 0:
+            index, offset = divmod(self._pos, self.block_size)
+            piece = self._block(index)[offset:offset + n]
+            if not piece:
+                break
+            out += piece
+            self._pos += len(piece)
+            n -= len(piece)
+        return bytes(out)
+
+    def close(self):
+        self._blocks.clear()
+
+
+def _read_exact(raw, n):
+    data = raw.read(n)
+    while len(data) < n:
+        more = raw.read(n - len(data))
+        if not more:
+            raise IOError(f"连接提前结束（还差 {n - len(data)} 字节）")
+        data += more
+    return data
+
+
+def _skip(raw, n):
+    while n > 0:
+        n -= len(_read_exact(raw, min(n, WRITE_SIZE)))
+
+
+def _extract_entry(raw, info, target, on_bytes):
+    """
+    从响应流中读取一个条目（本地文件头 + 数据）并解压到 target
+
+    Returns:
+        从流中读取的字节数
+    """
+    header = _LOCAL_HEADER.unpack(_read_exact(raw, _LOCAL_HEADER.size))
+    if header[0] != _LOCAL_SIGNATURE:
+        raise zipfile.BadZipFile(f"{info.filename}: 本地文件头损坏")
+    name_len, extra_len = header[-2:]
+    _skip(raw, name_len + extra_len)
+    consumed = _LOCAL_HEADER.size + name_len + extra_len
+    on_bytes(consumed)
+
+    decompressor = zlib.decompressobj(-15) if info.compress_type == zipfile.ZIP_DEFLATED else None
+    crc = 0
+    written = 0
+    part_path = f"{target}.part"
+    with open(part_path, 'wb') as f:
+        remaining = info.compress_size
+        while remaining > 0:
+            data = _read_exact(raw, min(remaining, WRITE_SIZE))
+            remaining -= len(data)
+            on_bytes(len(data))
+            if decompressor is None:
+                out = data
+            else:
+                # 限制单次输出大小，高压缩比的数据也不会一次占用大量内存
+                out = decompressor.decompress(data, WRITE_SIZE)
+                while decompressor.unconsumed_tail:
+                    f.write(out)
+                    crc = zlib.crc32(out, crc)
+                    written += len(out)
+                    out = decompressor.decompress(decompressor.unconsumed_tail, WRITE_SIZE)
+            f.write(out)
+            crc = zlib.crc32(out, crc)
+            written += len(out)
+        if decompressor is not None:
+            out = decompressor.flush()
+            f.write(out)
+            crc = zlib.crc32(out, crc)
+            written += len(out)
+    if crc != info.CRC or written != info.file_size:
+        os.remove(part_path)
+        raise zipfile.BadZipFile(f"{info.filename}: CRC 或大小校验失败")
+    os.replace(part_path, target)
+    return consumed + info.compress_size
+
+
+def _wanted(name, include, exclude):
+    if include and not any(fnmatch.fnmatch(name, p) for p in include):
+        return False
+    return not (exclude and any(fnmatch.fnmatch(name, p) for p in exclude))
+
+
+def _make_batches(entries):
+    """把按偏移排序的 (info, start, end, target) 合并为若干个连续的请求"""
+    batches = []
+    for entry in entries:
+        if batches:
+            last = batches[-1]
+            if entry[1] - last[-1][2] <= MAX_GAP and entry[2] - last[0][1] <= BATCH_SIZE:
+                last.append(entry)
+                continue
+        batches.append([entry])
+    return batches
+
+
+def list_entries(url, session=None):
+    """返回远端 ZIP 的条目列表（zipfile.ZipInfo），只下载中央目录"""
+    session = session or dl_file.get_session()
+    remote = _open_remote(url, session)
+    with zipfile.ZipFile(remote) as zf:
+        return zf.infolist()
+
+
+def _open_remote(url, session):
+    head = session.head(url, headers=dl_file.DEFAULT_HEADERS, allow_redirects=True, timeout=30)
+    head.raise_for_status()
+    size = int(head.headers.get('content-length', 0))
+    if head.headers.get('Accept-Ranges', '').lower() != 'bytes' or size <= 0:
+        raise dl_file.RangeNotSupported("服务器不支持 Range 请求")
+    return HttpRangeFile(head.url, size, session)
+
+
+def install(url, extract_to, include=None, exclude=None, num_threads=4, session=None, progress=True):
+    """
+    不落地压缩包，直接把远端 ZIP 解压到 extract_to
+
+    Args:
+        url: ZIP 文件URL（服务器需支持 Range 请求）
+        extract_to: 解压目标路径
+        include: 只解压匹配这些通配符的条目（可选）
+        exclude: 跳过匹配这些通配符的条目（可选）
+        num_threads: 并发请求数
+        session: 使用的 requests.Session，默认为共享会话
+        progress: 是否显示进度条
+
+    Returns:
+        解压出（或已是最新）的文件路径列表
+
+    Raises:
+        dl_file.RangeNotSupported: 服务器不支持 Range 请求，调用方应退回整包下载
+    """
+    session = session or dl_file.get_session()
+    start_time = time.perf_counter()
+    remote = _open_remote(url, session)
+    os.makedirs(extract_to, exist_ok=True)
+
+    with zipfile.ZipFile(remote) as zf:
+        infos = zf.infolist()
+        # 每个条目在压缩包中占据 [header_offset, 下一个条目或中央目录的起点)
+        bounds = sorted({i.header_offset for i in infos} | {zf.start_dir})
+        next_offset = dict(zip(bounds, bounds[1:]))
+
+        paths = []
+        streamed = []
+        fallback = []
+        skipped = 0
+        for info in infos:
+            if not _wanted(info.filename, include, exclude):
+                continue
+            target = unzip.safe_join(extract_to, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            paths.append(target)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if unzip.file_matches(target, info.file_size, info.CRC):
+                skipped += 1
+            elif info.flag_bits & 0x1 or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                fallback.append((info, target))
+            else:
+                streamed.append((info, info.header_offset, next_offset[info.header_offset], target))
+
+        streamed.sort(key=lambda e: e[1])
+        batches = _make_batches(streamed)
+        total = sum(b[-1][2] - b[0][1] for b in batches) + sum(i.compress_size for i, _ in fallback)
+        print(f"[-] 共 {len(paths)} 个文件，{skipped} 个已是最新，需下载 {total / 1024 / 1024:.1f}MB")
+
+        progress_bar = tqdm(desc=os.path.basename(remote.url), total=total, disable=not progress,
+                            unit='B', unit_scale=True, unit_divisor=1024)
+
+        def fetch_batch(batch):
+            done = 0
+            retries = 0
+            while done < len(batch):
+                pending = batch[done:]
+                start, end = pending[0][1], pending[-1][2]
+                headers = {'Range': f'bytes={start}-{end - 1}', 'Accept-Encoding': 'identity', **dl_file.DEFAULT_HEADERS}
+                try:
+                    with session.get(remote.url, headers=headers, stream=True, timeout=30) as r:
+                        r.raise_for_status()
+                        if r.status_code != 206:
+                            raise dl_file.RangeNotSupported(f"HTTP {r.status_code}")
+                        pos = start
+                        for info, entry_start, entry_end, target in pending:
+                            _skip(r.raw, entry_start - pos)
+                            progress_bar.update(entry_start - pos)
+                            pos = entry_start + _extract_entry(r.raw, info, target, progress_bar.update)
+                            done += 1
+                        progress_bar.update(end - pos)
+                except dl_file.RangeNotSupported:
+                    raise
+                except Exception as e:
+                    retries += 1
+                    if retries > dl_file.MAX_RETRIES:
+                        raise
+                    delay = min(30.0, 0.5 * 2 ** retries) * random.uniform(0.5, 1.0)
+                    progress_bar.write(f"[{pending[0][0].filename} 下载失败，{delay:.1f}s 后重试] {e}")
+                    time.sleep(delay)
+
+        try:
+            with ThreadPoolExecutor(num_threads) as pool:
+                # 大的批次先开始，避免最后只剩一个大文件在下载
+                for _ in pool.map(fetch_batch, sorted(batches, key=lambda b: b[0][1] - b[-1][2])):
+                    pass
+            # 加密或其他压缩算法的条目交给 zipfile 处理
+            for info, target in fallback:
+                with zf.open(info) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, WRITE_SIZE)
+                progress_bar.update(info.compress_size)
+        finally:
+            progress_bar.close()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"[✓] 解压完成: {extract_to}（{elapsed:.1f}s，{total / 1024 / 1024 / max(elapsed, 1e-9):.2f}MB/s）")
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="边下载边解压远端 ZIP")
+    parser.add_argument("url", help="ZIP 文件地址")
+    parser.add_argument("-o", "--output", default=os.path.join("Model", "stt"), help="解压目标目录")
+    parser.add_argument("-i", "--include", action="append", help="只解压匹配的条目（通配符，可多次指定）")
+    parser.add_argument("-x", "--exclude", action="append", help="跳过匹配的条目（通配符，可多次指定）")
+    parser.add_argument("-t", "--threads", type=int, default=4, help="并发请求数")
+    parser.add_argument("-l", "--list", action="store_true", help="只列出条目，不解压")
+    args = parser.parse_args()
+
+    if args.list:
+        for info in list_entries(args.url):
+            print(f"{info.file_size:>14,}  {info.filename}")
+    else:
+        install(args.url, args.output, args.include, args.exclude, args.threads)
@@ -0,0 +1,146 @@
+"""
+config.toml 的统一加载入口
+
+整个进程只解析一次配置文件，各模块通过 load_config() 取得带类型的配置对象，
+不再各自在导入时读取。
+"""
+import dataclasses
+import functools
+import math
+import sys
+import tomllib
+from dataclasses import dataclass, field
+
+CONFIG_PATH = "config.toml"
+# 旧版 SILENCE_THRESHOLD 按数据块内的峰值计算 dB，语音的峰值比短时 RMS 约高 12 dB
+LEGACY_PEAK_TO_RMS_DB = 12.0
+
+
+@dataclass(frozen=True)
+class RecordConfig:
+    FORMAT: str = "pyaudio.paInt16"
+    CHANNELS: int = 1
+    RATE: int = 44100
+    CHUNK: int = 1024
+    RECORD_SECONDS: float = 5
+    VAD_THRESHOLD_DB: float = 50
+    SILENCE_THRESHOLD: float = None  # 旧版的峰值阈值，仅用于兼容旧配置，见 legacy_threshold_db
+    SILENCE_DURATION: float = 2.0
+    MAX_DURATION: float = 30.0
+    SAVE_PATH: str = "./"
+    DEFAULT_SPT_MODEL_PATH: str = ""
+    mono_save_path: str = "./mono"
+    VAD_HYSTERESIS_DB: float = 6.0
+    VAD_PRE_ROLL: float = 0.3
+    VAD_MAX_ZCR: float = 0.4
+
+    @property
+    def pyaudio_format(self):
+        """将 FORMAT（如 "pyaudio.paInt16"）解析为 PyAudio 常量"""
+        import pyaudio
+        return getattr(pyaudio, self.FORMAT.rsplit(".", 1)[-1])
+
+
+@dataclass(frozen=True)
+class STTConfig:
+    MODEL_CACHE_MB: float = 4096
+    CATALOG_PATH: str = "./cache/stt_models.json"
+    CATALOG_TTL_HOURS: float = 168
+    SERVER_ADDRESS: str = "127.0.0.1:2700"
+    SERVER_MAX_SESSIONS: int = 8
+    SERVER_WORKERS: int = 0
+    SERVER_MODELS: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class AIConfig:
+    api_key: str = ""
+    base_url: str = ""
+    model: dict = field(default_factory=dict)
+    max_history_items: int = 15
+    system_prompt: str = ""
+    timeout: float = 60.0
+    first_token_timeout: float = 30.0
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    enabled: bool = False
+    jsonl_path: str = ""
+    prometheus_path: str = ""
+    flush_interval: float = 10.0
+
+
+@dataclass(frozen=True)
+class DownloadConfig:
+    cache_dir: str = "./cache/downloads"
+    cache_max_mb: float = 4096
+
+
+@dataclass(frozen=True)
+class TempConfig:
+    mode: str = "disk"
+    max_mb: float = 512
+    max_age_hours: float = 24
+
+
+@dataclass(frozen=True)
+class Config:
+    auto_clean_temp: bool = True
+    record: RecordConfig = field(default_factory=RecordConfig)
+    stt: STTConfig = field(default_factory=STTConfig)
+    ai: AIConfig = field(default_factory=AIConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    download: DownloadConfig = field(default_factory=DownloadConfig)
+    temp: TempConfig = field(default_factory=TempConfig)
+    raw: dict = field(default_factory=dict)
+
+
+def legacy_threshold_db(silence_threshold):
+    """
+    把旧版的 SILENCE_THRESHOLD（数据块峰值的 dB，int16 最高约 90.3）换算为 VAD_THRESHOLD_DB（10ms 帧 RMS 的 dB）
+    """
+    return min(float(silence_threshold), 20 * math.log10(32767)) - LEGACY_PEAK_TO_RMS_DB
+
+
+def _record_section(data):
+    """[record]：只写了旧版 SILENCE_THRESHOLD 的配置换算为 VAD_THRESHOLD_DB，并提示改用新键"""
+    record = _section(RecordConfig, data)
+    if "SILENCE_THRESHOLD" in data and "VAD_THRESHOLD_DB" not in data:
+        threshold_db = legacy_threshold_db(data["SILENCE_THRESHOLD"])
+        print(f"[!] config.toml [record] SILENCE_THRESHOLD = {data['SILENCE_THRESHOLD']} 是旧版的峰值阈值，"
+              f"已换算为 VAD_THRESHOLD_DB = {threshold_db:.1f}；请改用 VAD_THRESHOLD_DB"
+              f"（10ms 帧 RMS 的 dB，默认 {RecordConfig.VAD_THRESHOLD_DB:g}）", file=sys.stderr)
+        record = dataclasses.replace(record, VAD_THRESHOLD_DB=threshold_db)
+    return record
+
+
+def _section(cls, data):
+    """只取数据类中声明过的键，未知键保留在 Config.raw 中"""
+    names = {f.name for f in dataclasses.fields(cls)}
+    return cls(**{k: v for k, v in data.items() if k in names})
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(path=CONFIG_PATH):
+    """
+    读取并缓存配置文件
+
+    Args:
+        path: 配置文件路径
+
+    Returns:
+        Config 对象；修改配置文件后需调用 load_config.cache_clear() 重新加载
+    """
+    with open(path, "rb") as f:
+        raw = tomllib.load(f)
+    return Config(
+        auto_clean_temp=raw.get("Auto-Clean_Temp", True),
+        record=_record_section(raw.get("record", {})),
+        stt=_section(STTConfig, raw.get("stt", {})),
+        ai=_section(AIConfig, raw.get("ai", {})),
+        metrics=_section(MetricsConfig, raw.get("metrics", {})),
+        download=_section(DownloadConfig, raw.get("download", {})),
+        temp=_section(TempConfig, raw.get("temp", {})),
+        raw=raw,
+    )
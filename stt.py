@@ -1,76 +1,223 @@
 import wave
 import json
-import vosk
+import sys
 import os
+import numpy as np
+import time
+import metrics
 import mono
-import record
-
-import toml
-try:
-    if os.path.exists("./tmp"):
-        os.makedirs("./tmp")
-except:
-    pass
+import model_cache
+import temp_audio
+from settings import load_config
+
+def _kaldi_recognizer(model, sample_rate):
+    import vosk
+    return vosk.KaldiRecognizer(model, sample_rate)
+
 class STT():
-    def __init__(self) -> None:
-        with open("config.toml", "r", encoding="utf-8") as f:
-            self.config = toml.load(f)
-        # 使用配置中的模型路径
-        model_path = self.config["record"]["DEFAULT_SPT_MODEL_PATH"]
-        self.model = vosk.Model(model_path)
-        
+    def __init__(self, preload: bool = False, model_path: str = None, model=None, recognizer_factory=None) -> None:
+        """
+        Args:
+            preload: 为 True 时在后台线程加载模型，构造立即返回，首次使用模型时再等待加载完成
+            model_path: 模型路径（可选），默认使用配置中的模型
+            model: 直接使用给定的模型对象（可选），不经过模型注册表
+            recognizer_factory: 以 (model, sample_rate) 创建识别器的函数，默认为 vosk.KaldiRecognizer
+        """
+        self.config = load_config()
+        self.recognizer_factory = recognizer_factory or _kaldi_recognizer
+        self._shared = model is None
+        if not self._shared:
+            self.model_path = model_path
+            self._model = model
+            return
+        # 使用配置中的模型路径，模型由进程内共享的注册表提供
+        self.model_path = model_path or self.config.record.DEFAULT_SPT_MODEL_PATH
+        self._model = None
+        if preload:
+            model_cache.preload(self.model_path)
+        else:
+            self._model = model_cache.acquire(self.model_path)
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = model_cache.acquire(self.model_path)
+        return self._model
+
+    def _switch_model(self, model_path):
+        """切换到指定模型，已加载过的路径直接复用"""
+        if self._shared and os.path.abspath(str(model_path)) == os.path.abspath(str(self.model_path)):
+            return
+        model = model_cache.acquire(model_path)
+        self.close()
+        self.model_path = model_path
+        self._model = model
+        self._shared = True
+
+    def close(self):
+        """释放对当前模型的引用"""
+        if self._model is not None:
+            self._model = None
+            if self._shared:
+                model_cache.release(self.model_path)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
     def Speech_to_Text(self, file_path: str = None, model_path: str = None, use_mono: bool = True, use_record: bool = False):
         # 处理录音情况
         if use_record or file_path is None:
+            # 录音期间在后台加载尚未就绪的模型
+            if model_path is not None:
+                model_cache.preload(model_path)
+            elif self._model is None:
+                model_cache.preload(self.model_path)
+            import record
             file_path = record.record_wav()
+            recorded = temp_audio.get_manager(self.config.record.SAVE_PATH)
+        else:
+            recorded = None
         
-        # 处理模型路径
-        if model_path is not None:
-            self.model = vosk.Model(model_path)
-        
-        # 处理单声道转换
-        actual_file_path = file_path
-        if use_mono:
-            actual_file_path = mono.convert_to_mono_16k(file_path)
-        
-        # 打开音频文件并验证格式
-        wf = wave.open(str(actual_file_path), "rb")
-        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != "NONE":
-            print("音频文件必须是16位单声道WAV格式")
-            wf.close()
-            return None
-        
-        # 初始化识别器
-        rec = vosk.KaldiRecognizer(self.model, wf.getframerate())
-        results = []
-        
-        # 读取并处理音频数据
-        while True:
-            data = wf.readframes(4000)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                result = json.loads(rec.Result())
-                results.append(result.get("text", ""))
-        
-        # 获取最终结果
-        final_result = json.loads(rec.FinalResult())
-        results.append(final_result.get("text", ""))
-        
-        # 关闭文件
-        wf.close()
-        
-        # 清理临时文件（如果是转换后的）
-        if use_mono and actual_file_path != file_path:
-            try:
-                os.remove(actual_file_path)
-            except:
-                pass
-        
+        # 本次录音的临时文件识别完（或出错、格式不符）即释放（Auto-Clean_Temp 关闭时保留在磁盘上）
+        wf = None
+        try:
+            # 处理模型路径
+            if model_path is not None:
+                self._switch_model(model_path)
+
+            # 读取音频：use_mono 时边读边转换为 16kHz 单声道（支持 FLAC/OGG 等），内存占用与文件长度无关
+            if use_mono:
+                sample_rate = mono.TARGET_RATE
+                chunks = self._iter_chunks(mono.stream_mono_16k(file_path), 4000 * 2)
+            else:
+                wf = wave.open(temp_audio.wave_target(file_path), "rb")
+                if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != "NONE":
+                    print("音频文件必须是16位单声道WAV格式")
+                    return None
+                sample_rate = wf.getframerate()
+                chunks = iter(lambda: wf.readframes(4000), b"")
+
+            # 初始化识别器
+            rec = self.recognizer_factory(self.model, sample_rate)
+            results = []
+            n_bytes = 0
+
+            # 读取并处理音频数据
+            decode_start = time.perf_counter()
+            for data in chunks:
+                n_bytes += len(data)
+                if rec.AcceptWaveform(data):
+                    result = json.loads(rec.Result())
+                    results.append(result.get("text", ""))
+
+            # 获取最终结果
+            final_result = json.loads(rec.FinalResult())
+            results.append(final_result.get("text", ""))
+            metrics.observe("stt_decode_seconds", time.perf_counter() - decode_start)
+            metrics.inc("stt_audio_seconds_total", n_bytes / 2 / sample_rate)
+        finally:
+            if wf is not None:
+                wf.close()
+            if recorded is not None:
+                recorded.release(file_path)
+
         # 组合并返回结果
         full_text = " ".join([r for r in results if r])
         return full_text.strip()
 
+    @staticmethod
+    def _iter_chunks(blocks, size):
+        """把任意长度的音频块（bytes 或 int16 数组）重新切分为固定字节数，最后一块可能较短"""
+        pending = bytearray()
+        for block in blocks:
+            pending += block.tobytes() if hasattr(block, "tobytes") else block
+            n = len(pending) - len(pending) % size
+            for i in range(0, n, size):
+                yield bytes(pending[i:i + size])
+            del pending[:n]
+        if pending:
+            yield bytes(pending)
+
+    @staticmethod
+    def _results(rec, chunks):
+        """
+        依次把数据块送入识别器
+
+        Yields:
+            {"partial": 文本} 识别中的中间结果，或 {"text": 文本} 一句话的最终结果
+        """
+        for data in chunks:
+            if rec.AcceptWaveform(data):
+                text = json.loads(rec.Result()).get("text", "")
+                if text:
+                    yield {"text": text}
+            else:
+                partial = json.loads(rec.PartialResult()).get("partial", "")
+                if partial:
+                    yield {"partial": partial}
+
+        # 数据结束后取出剩余结果
+        text = json.loads(rec.FinalResult()).get("text", "")
+        if text:
+            yield {"text": text}
+
+    def stream_file(self, file_path, model_path: str = None, block_seconds: float = mono.BLOCK_SECONDS):
+        """
+        边读取边识别音频文件（WAV/FLAC/OGG 等）：文件按块解码、重采样为 16kHz 单声道后立即送入识别器，
+        内存占用与文件长度无关，长录音的第一句结果在读完整个文件之前就会产出
+
+        Args:
+            file_path: 音频文件路径
+            model_path: 模型路径（可选）
+            block_seconds: 每次读取的音频时长（秒）
+
+        Yields:
+            {"partial": 文本} 识别中的中间结果，或 {"text": 文本} 一句话的最终结果
+        """
+        if model_path is not None:
+            self._switch_model(model_path)
+        rec = self.recognizer_factory(self.model, mono.TARGET_RATE)
+        chunks = self._iter_chunks(mono.stream_mono_16k(file_path, block_seconds), 4000 * 2)
+        yield from self._results(rec, chunks)
+
+    def Speech_to_Text_stream(self, model_path: str = None):
+        """
+        边录音边识别：麦克风数据块直接送入识别器，不经过磁盘
+
+        Args:
+            model_path: 模型路径（可选）
+
+        Yields:
+            {"partial": 文本} 识别中的中间结果，或 {"text": 文本} 一句话的最终结果
+        """
+        if model_path is not None:
+            self._switch_model(model_path)
+
+        import record
+        channels = self.config.record.CHANNELS
+        rec = self.recognizer_factory(self.model, self.config.record.RATE)
+
+        def chunks():
+            for data in record.stream_chunks():
+                # 多声道数据先混合为单声道
+                if channels > 1:
+                    data = mono.downmix(np.frombuffer(data, dtype=np.int16), channels).tobytes()
+                yield data
+
+        yield from self._results(rec, chunks())
+
 if __name__ == "__main__":
-    stt = STT()
-    print(stt.Speech_to_Text())
+    stt = STT(preload=True)
+    files = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--stream" in sys.argv:
+        results = stt.stream_file(files[0]) if files else stt.Speech_to_Text_stream()
+        for result in results:
+            if "partial" in result:
+                print(f"... {result['partial']}", end="\r")
+            else:
+                print(result["text"])
+    else:
+        print(stt.Speech_to_Text(files[0] if files else None))
@@ -0,0 +1,346 @@
+"""
+Vosk 模型目录
+
+解析 https://alphacephei.com/vosk/models 的模型表格，保存为本地 JSON 索引（带过期时间），
+过期后先返回旧索引、在后台刷新。查询时按语言与大小走预先建好的索引，词错率与关键字在结果中逐个过滤。
+"""
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from settings import load_config
+
+MODELS_URL = "https://alphacephei.com/vosk/models"
+
+_SIZE_RE = re.compile(r"([\d.]+)\s*([KMGT])", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_SIZE_UNITS = {"K": 1 / 1024, "M": 1, "G": 1024, "T": 1024 * 1024}
+
+
+class _ModelTableParser(HTMLParser):
+    """
+    流式解析模型页面中 class="table table-bordered" 的表格，不构建整棵 DOM 树
+
+    解析结果为 self.tables：每个表格是行的列表，每行是 [(单元格文本, 单元格内第一个链接, 是否为表头), ...]
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables = []
+        self._depth = 0  # 嵌套在目标表格内的 table 层数
+        self._row = None
+        self._cell = None
+        self._href = None
+        self._is_header = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            if self._depth:
+                self._depth += 1
+            elif dict(attrs).get("class", "") == "table table-bordered":
+                self._depth = 1
+                self.tables.append([])
+        elif not self._depth:
+            return
+        elif tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+            self._href = None
+            self._is_header = tag == "th"
+        elif tag == "a" and self._cell is not None and self._href is None:
+            self._href = dict(attrs).get("href") or ""
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+        if tag == "table":
+            self._depth -= 1
+        elif tag in ("td", "th") and self._cell is not None:
+            # 与 get_text(strip=True) 一致：去掉各段文本首尾空白后直接拼接
+            text = "".join(part.strip() for part in self._cell)
+            self._row.append((text, self._href or "", self._is_header))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self.tables[-1].append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def _size_mb(size):
+    m = _SIZE_RE.search(size)
+    return round(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()], 1) if m else None
+
+
+def _wer(wer_speed):
+    m = _NUMBER_RE.search(wer_speed)
+    return float(m.group()) if m else None
+
+
+def _lang(name):
+    """从模型名推断语言代码，如 vosk-model-small-cn-0.22 -> cn，vosk-model-en-us-0.22 -> en-us"""
+    tokens = re.sub(r"^vosk-(model|recasepunc)-", "", name).split("-")
+    if tokens and tokens[0] == "small":
+        tokens = tokens[1:]
+    if not tokens:
+        return ""
+    lang = tokens[0]
+    if len(tokens) > 1 and len(tokens[1]) == 2 and tokens[1].isalpha():
+        lang += "-" + tokens[1]
+    return lang.lower()
+
+
+def _model(category, name, url, size, wer_speed, notes, license):
+    return {
+        "category": category,
+        "name": name,
+        "url": url,
+        "size": size,
+        "wer_speed": wer_speed,
+        "notes": notes,
+        "license": license,
+        "lang": _lang(name),
+        "size_mb": _size_mb(size),
+        "wer": _wer(wer_speed),
+    }
+
+
+def parse_models(html):
+    """
+    解析模型页面
+
+    Args:
+        html: 页面 HTML 文本
+
+    Returns:
+        模型信息字典列表，字段同旧版 get_stt_model_list，另有 lang, size_mb, wer
+    """
+    parser = _ModelTableParser()
+    parser.feed(html)
+    parser.close()
+    models = []
+
+    # 第一个表格（主要模型表格）：5 列；只有第一列有文字、没有链接的行是分类标题
+    current_category = ""
+    for row in parser.tables[0] if parser.tables else []:
+        if any(is_header for _, _, is_header in row):
+            continue
+        texts = [text for text, _, _ in row]
+        if len(row) == 5 and (row[0][1] or any(texts[1:])):
+            models.append(_model(current_category, texts[0], row[0][1], *texts[1:]))
+        elif texts and texts[0] and not any(texts[1:]):
+            current_category = texts[0]
+
+    # 第二个表格（标点模型表格）：3 列
+    current_category = ""
+    for row in parser.tables[1] if len(parser.tables) > 1 else []:
+        texts = [text for text, _, _ in row]
+        if len(row) == 3 and row[0][1]:
+            models.append(_model(f"Punctuation - {current_category}", texts[0], row[0][1], texts[1], "",
+                                 "Punctuation and case restoration model", texts[2]))
+        elif texts and texts[0] and not any(texts[1:]):
+            current_category = texts[0]
+    return models
+
+
+class Catalog:
+    """
+    带索引的模型目录
+
+    Args:
+        models: parse_models 返回的模型列表
+        fetched_at: 抓取时间（时间戳）
+    """
+
+    def __init__(self, models, fetched_at=0.0):
+        self.models = models
+        self.fetched_at = fetched_at
+        self.by_name = {m["name"]: m for m in models}
+        # 每种语言的模型按大小排序，按大小上限查询时用二分查找截断
+        self.by_lang = {}
+        for m in models:
+            self.by_lang.setdefault(m["lang"], []).append(m)
+        for lst in self.by_lang.values():
+            lst.sort(key=self._size_key)
+        self._sizes = {lang: [self._size_key(m) for m in lst] for lang, lst in self.by_lang.items()}
+
+    @staticmethod
+    def _size_key(model):
+        return model["size_mb"] if model["size_mb"] is not None else float("inf")
+
+    def languages(self):
+        return sorted(self.by_lang)
+
+    def search(self, lang=None, max_size_mb=None, max_wer=None, keyword=None, downloadable=True):
+        """
+        查询模型
+
+        Args:
+            lang: 语言代码；"en" 同时匹配 en-us、en-in 等
+            max_size_mb: 大小上限（MB）
+            max_wer: 词错率上限（页面上第一个测试集的数值）
+            keyword: 模型名中包含的子串
+            downloadable: 只返回有下载链接的模型
+
+        Returns:
+            按大小从小到大排序的模型列表
+        """
+        if lang:
+            lang = lang.lower()
+            groups = [key for key in self.by_lang if key == lang or key.startswith(lang + "-")]
+        else:
+            groups = list(self.by_lang)
+
+        results = []
+        for key in groups:
+            lst = self.by_lang[key]
+            if max_size_mb is not None:
+                lst = lst[:bisect.bisect_right(self._sizes[key], max_size_mb)]
+            for m in lst:
+                if downloadable and not m["url"]:
+                    continue
+                if max_wer is not None and (m["wer"] is None or m["wer"] > max_wer):
+                    continue
+                if keyword and keyword not in m["name"]:
+                    continue
+                results.append(m)
+        if len(groups) > 1:
+            results.sort(key=self._size_key)
+        return results
+
+    def to_json(self):
+        return {"fetched_at": self.fetched_at, "models": self.models}
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+def fetch_catalog(url=MODELS_URL, html_path=None):
+    """
+    抓取并解析模型页面
+
+    Args:
+        url: 模型页面地址
+        html_path: 已保存的页面文件（可选），指定时不访问网络
+
+    Returns:
+        Catalog 对象
+    """
+    if html_path:
+        with open(html_path, "r", encoding="utf-8") as f:
+            return Catalog(parse_models(f.read()), os.path.getmtime(html_path))
+    import dl_file
+    print("[-] Getting STT model list...")
+    rp = dl_file.get_session().get(url, timeout=30)
+    rp.raise_for_status()
+    rp.encoding = "utf-8"
+    return Catalog(parse_models(rp.text), time.time())
+
+
+def _save(catalog, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog.to_json(), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return Catalog(data["models"], data.get("fetched_at", 0.0))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+_refreshing = threading.Lock()
+
+
+def refresh(path=None, url=MODELS_URL):
+    """重新抓取模型页面并写入索引文件"""
+    path = path or load_config().stt.CATALOG_PATH
+    catalog = fetch_catalog(url)
+    _save(catalog, path)
+    return catalog
+
+
+def _refresh_in_background(path, url):
+    if not _refreshing.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            refresh(path, url)
+        except Exception as e:
+            print(f"[后台刷新模型列表失败] {e}")
+        finally:
+            _refreshing.release()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def load_catalog(path=None, ttl=None, url=MODELS_URL, html_path=None, background=True):
+    """
+    读取模型目录
+
+    有索引文件且未过期时直接使用；已过期时先返回旧索引，同时在后台刷新
+    （background=False 时同步刷新）；没有索引文件时同步抓取。抓取失败时退回旧索引。
+
+    Args:
+        path: 索引文件路径，默认取 config.toml 中 [stt] CATALOG_PATH
+        ttl: 过期时间（秒），默认取 [stt] CATALOG_TTL_HOURS
+        url: 模型页面地址
+        html_path: 已保存的页面文件（可选），指定时解析该文件并更新索引，不访问网络
+        background: 过期时是否在后台刷新
+
+    Returns:
+        Catalog 对象
+    """
+    config = load_config().stt
+    path = path or config.CATALOG_PATH
+    ttl = config.CATALOG_TTL_HOURS * 3600 if ttl is None else ttl
+
+    if html_path:
+        catalog = fetch_catalog(html_path=html_path)
+        _save(catalog, path)
+        return catalog
+
+    catalog = _load(path)
+    if catalog is not None and catalog.age() < ttl:
+        return catalog
+    if catalog is not None and background:
+        _refresh_in_background(path, url)
+        return catalog
+    try:
+        return refresh(path, url)
+    except Exception as e:
+        if catalog is None:
+            raise
+        print(f"[获取模型列表失败，使用已保存的列表] {e}")
+        return catalog
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="查询 Vosk 模型目录")
+    parser.add_argument("-l", "--lang", help="语言代码，如 cn, en, en-us")
+    parser.add_argument("-s", "--max-size", type=float, help="大小上限（MB）")
+    parser.add_argument("-w", "--max-wer", type=float, help="词错率上限")
+    parser.add_argument("-k", "--keyword", help="模型名中包含的文字")
+    parser.add_argument("--html", help="解析已保存的页面文件（离线）")
+    parser.add_argument("--refresh", action="store_true", help="忽略过期时间，立即重新抓取")
+    args = parser.parse_args()
+
+    catalog = refresh() if args.refresh else load_catalog(html_path=args.html, background=False)
+    results = catalog.search(args.lang, args.max_size, args.max_wer, args.keyword)
+    for m in results:
+        wer = f"{m['wer']:.2f}" if m["wer"] is not None else "-"
+        print(f"{m['name']:<45}{m['lang']:<8}{m['size']:>8}{wer:>8}  {m['license']}")
+    print(f"[-] {len(results)}/{len(catalog.models)} 个模型，可用语言: {', '.join(catalog.languages())}")
@@ -0,0 +1,436 @@
+"""
+本地语音识别服务
+
+同一台机器上的多个进程（智能体）共用一个服务进程：每个模型只加载一次（经 model_cache），
+每个连接是一个识别会话，拥有自己的识别器（KaldiRecognizer），在线程池中解码并实时返回中间结果。
+同时进行的会话数有上限，超出时新会话排队等待，等待超时则被拒绝。
+客户端只能按名称选择服务端已加载或 [stt] SERVER_MODELS 中配置的模型，不能让服务端加载任意路径；
+模型在单独的加载线程中加载，不占用解码线程。
+
+协议（Unix 套接字或 TCP）：每帧为 4 字节大端长度 + 1 字节类型 + 内容
+    客户端 -> 服务端  S 开始，内容为 JSON {"sample_rate": 16000, "channels": 1, "model": 模型名（可选）}
+                      A 音频，int16 PCM
+                      E 结束
+    服务端 -> 客户端  R JSON：{"partial": ...} 中间结果、{"text": ...} 一句话的结果，
+                      最后一帧为 {"final": 全文, "stats": {...}}，出错时为 {"error": ...}
+
+    python stt_server.py serve [--listen unix:./tmp/stt.sock | 127.0.0.1:2700] [--max-sessions 8]
+    python stt_server.py transcribe a.wav [--listen ...]
+"""
+import asyncio
+import json
+import os
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import metrics
+import mono
+from settings import load_config
+
+_HEADER = struct.Struct(">IB")
+MAX_FRAME = 16 * 1024 * 1024  # 单帧最大字节数
+CHUNK_BYTES = 8000  # 客户端每帧发送的音频字节数（16kHz 单声道 0.25 秒）
+
+START = ord("S")
+AUDIO = ord("A")
+END = ord("E")
+RESULT = ord("R")
+
+
+class ServerBusy(RuntimeError):
+    """服务端会话数已满，排队超时"""
+
+
+class UnknownModel(ValueError):
+    """客户端请求的模型不在服务端允许的模型中"""
+
+
+async def read_frame(reader):
+    """
+    读取一帧
+
+    Returns:
+        (类型, 内容)
+
+    Raises:
+        asyncio.IncompleteReadError: 连接已关闭
+        ValueError: 帧长度超过 MAX_FRAME
+    """
+    length, kind = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"帧过大: {length} 字节")
+    return kind, await reader.readexactly(length)
+
+
+def write_frame(writer, kind, payload=b""):
+    writer.write(_HEADER.pack(len(payload), kind))
+    writer.write(payload)
+
+
+def parse_address(address):
+    """
+    解析监听地址
+
+    Returns:
+        ("unix", 路径) 或 ("tcp", (主机, 端口))
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+async def _connect(address):
+    kind, target = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+
+def _feed(rec, data):
+    """把一块音频送入识别器，返回 {"text": 一句话的结果} 或 {"partial": 中间结果}"""
+    if rec.AcceptWaveform(data):
+        return {"text": json.loads(rec.Result()).get("text", "")}
+    return {"partial": json.loads(rec.PartialResult()).get("partial", "")}
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class STTServer:
+    """
+    Args:
+        stt: 默认使用的 STT 实例（可选），为空时按配置中的模型按需创建
+        max_sessions: 同时进行的会话数上限，默认取 config.toml 中 [stt] SERVER_MAX_SESSIONS
+        workers: 解码线程数，默认取 [stt] SERVER_WORKERS（0 表示 CPU 核心数）
+        admission_timeout: 会话数已满时新会话最多排队的秒数
+        models: 客户端可以选择的模型 {名称: 模型路径或已加载的 STT 实例}，默认取 [stt] SERVER_MODELS
+    """
+
+    def __init__(self, stt=None, max_sessions=None, workers=None, admission_timeout=5.0, models=None):
+        config = load_config().stt
+        self.max_sessions = max_sessions or config.SERVER_MAX_SESSIONS
+        workers = workers or config.SERVER_WORKERS or os.cpu_count() or 1
+        self.admission_timeout = admission_timeout
+        # Vosk 解码时释放 GIL，各会话的识别器可以在线程池中并行解码
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt-session")
+        # 加载模型可能需要数秒，放在单独的线程中，不占用正在解码的会话的线程
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-loader")
+        self.models = dict(config.SERVER_MODELS if models is None else models)
+        self._stts = {name: model for name, model in self.models.items() if not isinstance(model, str)}
+        if stt is not None:
+            self._stts[None] = stt
+        self._loading = {}
+        self._slots = None
+        self._server = None
+        self._unix_path = None
+        self.active = 0
+        self.total = 0
+        self.rejected = 0
+
+    def _check_model(self, name):
+        """
+        Raises:
+            UnknownModel: name 不是允许的模型名（None 表示默认模型）
+        """
+        if name is not None and name not in self.models:
+            available = ", ".join(sorted(self.models)) or "无"
+            raise UnknownModel(f"未知的模型: {name}（可用: {available}）")
+
+    async def _get_stt(self, name):
+        """每个模型共用一个 STT 实例；首次使用时在加载线程中加载，不阻塞其他会话的解码"""
+        stt = self._stts.get(name)
+        if stt is not None and stt._model is not None:
+            return stt
+        loop = asyncio.get_running_loop()
+        loading = self._loading.get(name)
+        if loading is None:
+            def load():
+                if stt is not None:
+                    stt.model  # 后台预加载中的模型在此等待加载完成
+                    return stt
+                from stt import STT
+                return STT(model_path=self.models.get(name))
+            loading = self._loading[name] = asyncio.ensure_future(loop.run_in_executor(self._loader, load))
+        try:
+            stt = await asyncio.shield(loading)
+        finally:
+            if loading.done():
+                self._loading.pop(name, None)
+        self._stts[name] = stt
+        return stt
+
+    @staticmethod
+    async def _send(writer, message):
+        write_frame(writer, RESULT, json.dumps(message, ensure_ascii=False).encode("utf-8"))
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != START:
+                raise ValueError("第一帧必须是开始帧")
+            params = json.loads(payload or b"{}")
+            try:
+                self._check_model(params.get("model"))
+            except UnknownModel as e:
+                await self._send(writer, {"error": str(e)})
+                return
+            wait_start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.admission_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                metrics.inc("stt_server_rejected_total")
+                await self._send(writer, {"error": "busy", "active": self.active})
+                return
+            try:
+                await self._session(reader, writer, params, time.perf_counter() - wait_start)
+            finally:
+                self._slots.release()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # 客户端提前断开
+        except Exception as e:
+            try:
+                await self._send(writer, {"error": f"{type(e).__name__}: {e}"})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _session(self, reader, writer, params, queued):
+        loop = asyncio.get_running_loop()
+        rate = int(params.get("sample_rate", mono.TARGET_RATE))
+        channels = int(params.get("channels", 1))
+        stt = await self._get_stt(params.get("model"))
+        rec = await loop.run_in_executor(self._executor, lambda: stt.recognizer_factory(stt.model, rate))
+
+        self.active += 1
+        self.total += 1
+        start = time.perf_counter()
+        latencies = []
+        texts = []
+        n_bytes = 0
+        first_result = None
+        last_partial = ""
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == END:
+                    break
+                if kind != AUDIO:
+                    raise ValueError(f"未知的帧类型: {kind}")
+                received = time.perf_counter()
+                n_bytes += len(payload)
+                if channels > 1:
+                    payload = mono.downmix(np.frombuffer(payload, dtype=np.int16), channels).tobytes()
+                result = await loop.run_in_executor(self._executor, _feed, rec, payload)
+                # 中间结果没有变化时不重复发送
+                if "text" in result:
+                    last_partial = ""
+                    if result["text"]:
+                        texts.append(result["text"])
+                        await self._send(writer, result)
+                elif result["partial"] and result["partial"] != last_partial:
+                    last_partial = result["partial"]
+                    await self._send(writer, result)
+                latencies.append(time.perf_counter() - received)
+                if first_result is None and (last_partial or texts):
+                    first_result = time.perf_counter() - start
+
+            final = json.loads(await loop.run_in_executor(self._executor, rec.FinalResult)).get("text", "")
+            if final:
+                texts.append(final)
+            audio_seconds = n_bytes / 2 / channels / rate
+            elapsed = time.perf_counter() - start
+            stats = {
+                "audio_seconds": audio_seconds,
+                "elapsed": elapsed,
+                "queued": queued,
+                "chunks": len(latencies),
+                "first_result": first_result,
+                "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "latency_p50": _percentile(latencies, 0.5),
+                "latency_p95": _percentile(latencies, 0.95),
+                "latency_max": max(latencies, default=0.0),
+            }
+            metrics.observe("stt_server_queue_seconds", queued)
+            metrics.observe("stt_server_chunk_latency_p95_seconds", stats["latency_p95"])
+            metrics.inc("stt_server_audio_seconds_total", audio_seconds)
+            await self._send(writer, {"final": " ".join(texts), "stats": stats})
+        finally:
+            self.active -= 1
+
+    async def start(self, address=None):
+        """
+        开始监听
+
+        Args:
+            address: "unix:路径" 或 "主机:端口"（端口为 0 时随机分配），默认取 [stt] SERVER_ADDRESS
+        """
+        address = address or load_config().stt.SERVER_ADDRESS
+        self._slots = asyncio.Semaphore(self.max_sessions)
+        kind, target = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(target):
+                # 上次异常退出留下的套接字文件；仍有服务在监听时不覆盖
+                with socket.socket(socket.AF_UNIX) as s:
+                    if s.connect_ex(target) == 0:
+                        raise OSError(f"已有服务在监听 {target}")
+                os.remove(target)
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            self._server = await asyncio.start_unix_server(self._handle, path=target)
+            self._unix_path = target
+        else:
+            self._server = await asyncio.start_server(self._handle, *target)
+        return self
+
+    @property
+    def address(self):
+        """实际监听的地址（可直接传给客户端）"""
+        if self._unix_path:
+            return f"unix:{self._unix_path}"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"{host}:{port}"
+
+    def stats(self):
+        return {"active": self.active, "total": self.total, "rejected": self.rejected,
+                "max_sessions": self.max_sessions}
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        if self._unix_path and os.path.exists(self._unix_path):
+            os.remove(self._unix_path)
+        self._executor.shutdown(wait=False)
+        self._loader.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def recognize(address, chunks, sample_rate=mono.TARGET_RATE, channels=1, model=None, on_result=None):
+    """
+    客户端：把音频发给识别服务并等待最终结果
+
+    Args:
+        address: 服务地址，格式同 STTServer.start
+        chunks: int16 PCM 数据块（bytes）的可迭代对象或异步可迭代对象，如麦克风数据流
+        sample_rate: 采样率
+        channels: 声道数，多声道数据由服务端混合为单声道
+        model: 模型名（可选），须为服务端允许的模型，默认使用服务端的默认模型
+        on_result: 收到中间结果或一句话结果时的回调，参数为结果字典
+
+    Returns:
+        {"final": 全文, "stats": 服务端统计的会话耗时与延迟}
+
+    Raises:
+        ServerBusy: 服务端会话数已满
+        RuntimeError: 服务端返回错误（包括请求了服务端不允许的模型）
+    """
+    reader, writer = await _connect(address)
+
+    async def receive():
+        while True:
+            kind, payload = await read_frame(reader)
+            message = json.loads(payload)
+            if "error" in message:
+                if message["error"] == "busy":
+                    raise ServerBusy(f"识别服务繁忙（{message.get('active')} 个会话进行中）")
+                raise RuntimeError(f"识别服务出错: {message['error']}")
+            if "final" in message:
+                return message
+            if on_result is not None:
+                on_result(message)
+
+    try:
+        params = {"sample_rate": sample_rate, "channels": channels}
+        if model:
+            params["model"] = model
+        write_frame(writer, START, json.dumps(params).encode("utf-8"))
+        receiver = asyncio.create_task(receive())
+        try:
+            if hasattr(chunks, "__aiter__"):
+                async for data in chunks:
+                    if receiver.done():
+                        break
+                    write_frame(writer, AUDIO, data)
+                    await writer.drain()
+            else:
+                for data in chunks:
+                    if receiver.done():
+                        break
+                    write_frame(writer, AUDIO, data)
+                    await writer.drain()
+            if not receiver.done():
+                write_frame(writer, END)
+                await writer.drain()
+        except ConnectionError:
+            pass  # 服务端已关闭连接（如拒绝了会话），原因由 receiver 给出
+        return await receiver
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def transcribe_file(file_path, address=None, model=None, on_result=None):
+    """
+    通过识别服务识别音频文件（在本进程中边读取边转换为 16kHz 单声道并发送）
+
+    Returns:
+        识别出的文本
+    """
+    address = address or load_config().stt.SERVER_ADDRESS
+    chunks = (block.tobytes() for block in mono.stream_mono_16k(file_path, CHUNK_BYTES / 2 / mono.TARGET_RATE))
+    return asyncio.run(recognize(address, chunks, model=model, on_result=on_result))["final"]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="本地语音识别服务")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="启动服务")
+    serve.add_argument("--listen", help="监听地址，unix:路径 或 主机:端口，默认取 [stt] SERVER_ADDRESS")
+    serve.add_argument("--model", help="默认模型路径，默认取 [record] DEFAULT_SPT_MODEL_PATH")
+    serve.add_argument("--max-sessions", type=int, help="同时进行的会话数上限")
+    serve.add_argument("--workers", type=int, help="解码线程数")
+    client = sub.add_parser("transcribe", help="识别音频文件")
+    client.add_argument("files", nargs="+", help="音频文件")
+    client.add_argument("--listen", help="服务地址")
+    client.add_argument("--model", help="模型名（[stt] SERVER_MODELS 中的名称）")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        async def main():
+            from stt import STT
+            stt = STT(model_path=args.model) if args.model else STT()
+            server = await STTServer(stt, args.max_sessions, args.workers).start(args.listen)
+            print(f"[-] 识别服务已启动: {server.address}（最多 {server.max_sessions} 个会话）")
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+    else:
+        for path in args.files:
+            print(f"{path}: {transcribe_file(path, args.listen, args.model)}")
@@ -0,0 +1,246 @@
+"""
+临时音频文件管理
+
+录音（record）、格式转换（mono）与识别（stt）共用的临时文件：
+- 文件名由时间戳、进程号和进程内计数组成，并发录音或转换时不会重名互相覆盖
+- mode = "memory" 时不在磁盘上创建文件：Linux 上使用 memfd（匿名内存文件），
+  返回 /proc/self/fd/N 路径，只接受路径的库也能直接读写；其他系统返回内存中的 MemoryAudio 对象
+- Auto-Clean_Temp 开启时，目录总大小超过 [temp] max_mb 或文件超过 max_age_hours 后，
+  按最近使用时间删除最旧的文件；识别完录音后也会立即删除该录音
+"""
+import io
+import itertools
+import os
+import pathlib
+import re
+import threading
+import time
+from settings import load_config
+
+PROTECT_SECONDS = 60.0  # 最近这么多秒内写入或使用过的文件不会被淘汰（可能正在录音或识别）
+CLEAN_INTERVAL = 10.0  # 两次自动清理的最短间隔（秒）
+
+# 只清理本模块生成的文件，以及旧版本录音（20240101120000.wav）的命名
+_MANAGED_NAME = re.compile(r"^(?:.*\d{14}-\d+-\d+|\d{14})\.(?:wav|flac|ogg|raw)$")
+# 旧版本的转换结果（1234.wav）只在专用的 [record] mono_save_path 目录中清理，其他目录中同样命名的可能是用户文件
+_LEGACY_MONO_NAME = re.compile(r"^\d{1,5}\.wav$")
+
+_counter = itertools.count()
+
+
+def unique_name(prefix="", suffix=".wav"):
+    """生成唯一的文件名：时间戳-进程号-进程内计数"""
+    return f"{prefix}{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{next(_counter)}{suffix}"
+
+
+class MemoryAudio(io.BytesIO):
+    """内存中的音频文件，可直接传给 wave.open、soundfile 与 mono.load_audio"""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def __str__(self):
+        return f"<内存音频 {self.name}>"
+
+
+def wave_target(target):
+    """
+    把临时音频转换为 wave.open / soundfile 接受的参数
+
+    内存对象会先回到开头（写完后直接读取时需要），路径转换为字符串
+    """
+    if hasattr(target, "read"):
+        target.seek(0)
+        return target
+    return str(target)
+
+
+class TempAudioManager:
+    """
+    Args:
+        root: 临时文件目录
+        mode: "disk" 或 "memory"，默认取 config.toml 中 [temp] mode
+        max_bytes: 总大小上限（字节），默认取 [temp] max_mb
+        max_age: 最长保留时间（秒），默认取 [temp] max_age_hours
+        auto_clean: 是否自动清理，默认取 Auto-Clean_Temp
+    """
+
+    def __init__(self, root, mode=None, max_bytes=None, max_age=None, auto_clean=None):
+        config = load_config()
+        self.root = pathlib.Path(root)
+        self.mode = mode or config.temp.mode
+        if self.mode not in ("disk", "memory"):
+            raise ValueError(f"未知的临时文件模式: {self.mode}")
+        self.max_bytes = max_bytes if max_bytes is not None else int(config.temp.max_mb * 1024 * 1024)
+        self.max_age = max_age if max_age is not None else config.temp.max_age_hours * 3600
+        self.auto_clean = config.auto_clean_temp if auto_clean is None else auto_clean
+        self._lock = threading.Lock()
+        self._memfds = {}  # "/proc/self/fd/N" -> [fd, 最近使用时间]
+        self._cleaned_at = 0.0
+        mono_dir = os.path.abspath(config.record.mono_save_path)
+        self._legacy_mono = (os.path.abspath(self.root) == mono_dir
+                             and mono_dir != os.path.abspath(config.record.SAVE_PATH))
+
+    def create(self, prefix="", suffix=".wav"):
+        """
+        分配一个新的临时音频
+
+        Returns:
+            disk 模式为 root 下的路径（目录不存在时自动创建）；memory 模式在 Linux 上为
+            memfd 的 /proc/self/fd/N 路径，其他系统为 MemoryAudio 对象
+        """
+        name = unique_name(prefix, suffix)
+        self.maybe_cleanup()
+        if self.mode == "memory":
+            if not hasattr(os, "memfd_create"):
+                return MemoryAudio(name)
+            fd = os.memfd_create(name)
+            path = pathlib.Path(f"/proc/self/fd/{fd}")
+            with self._lock:
+                self._memfds[str(path)] = [fd, time.time()]
+            return path
+        self.root.mkdir(parents=True, exist_ok=True)
+        return self.root / name
+
+    def touch(self, target):
+        """标记为刚使用过，推迟淘汰"""
+        if hasattr(target, "read"):
+            return
+        with self._lock:
+            entry = self._memfds.get(str(target))
+            if entry is not None:
+                entry[1] = time.time()
+                return
+        try:
+            os.utime(target)
+        except OSError:
+            pass
+
+    def release(self, target):
+        """
+        使用完毕：开启自动清理时删除磁盘文件；memfd 与内存对象总是释放
+        （已打开它们的读写方不受影响）
+        """
+        if hasattr(target, "read"):
+            target.close()
+            return
+        with self._lock:
+            entry = self._memfds.pop(str(target), None)
+        if entry is not None:
+            os.close(entry[0])
+        elif self.auto_clean:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+    def _disk_files(self):
+        """[(路径, 大小, 修改时间), ...]，只包含本模块管理的文件名"""
+        files = []
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return files
+        for entry in entries:
+            if not (_MANAGED_NAME.match(entry.name) or (self._legacy_mono and _LEGACY_MONO_NAME.match(entry.name))):
+                continue
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    st = entry.stat()
+                    files.append((entry.path, st.st_size, st.st_mtime))
+            except OSError:
+                continue
+        return files
+
+    def _memfd_files(self):
+        with self._lock:
+            items = list(self._memfds.items())
+        files = []
+        for path, (fd, used) in items:
+            try:
+                files.append((path, os.fstat(fd).st_size, used))
+            except OSError:
+                continue
+        return files
+
+    def usage(self):
+        """当前占用的字节数"""
+        files = self._memfd_files() if self.mode == "memory" else self._disk_files()
+        return sum(size for _, size, _ in files)
+
+    def cleanup(self, now=None):
+        """
+        删除超过最长保留时间的文件，然后按最近使用时间从旧到新删除，直到总大小不超过上限；
+        PROTECT_SECONDS 内用过的文件不删除。Auto-Clean_Temp 关闭时什么都不做
+
+        Returns:
+            删除的文件数
+        """
+        if not self.auto_clean:
+            return 0
+        now = time.time() if now is None else now
+        files = self._memfd_files() if self.mode == "memory" else self._disk_files()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for path, size, used in sorted(files, key=lambda f: f[2]):
+            if now - used < PROTECT_SECONDS:
+                break
+            if now - used <= self.max_age and total <= self.max_bytes:
+                break
+            if self.mode == "memory":
+                self.release(path)
+            else:
+                self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def maybe_cleanup(self):
+        """距上次清理超过 CLEAN_INTERVAL 时执行一次 cleanup"""
+        if not self.auto_clean:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._cleaned_at < CLEAN_INTERVAL:
+                return
+            self._cleaned_at = now
+        self.cleanup()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(root=None):
+    """
+    按目录共享的管理器
+
+    Args:
+        root: 临时文件目录，默认取 config.toml 中 [record] SAVE_PATH
+    """
+    root = os.path.abspath(root or load_config().record.SAVE_PATH)
+    with _managers_lock:
+        if root not in _managers:
+            _managers[root] = TempAudioManager(root)
+        return _managers[root]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="查看或清理临时音频目录")
+    parser.add_argument("root", nargs="?", help="目录，默认为 [record] SAVE_PATH")
+    parser.add_argument("--clean", action="store_true", help="按配额与保留时间清理一次")
+    args = parser.parse_args()
+
+    manager = get_manager(args.root)
+    if args.clean:
+        print(f"[-] 删除了 {manager.cleanup()} 个文件")
+    print(f"[-] {manager.root}: {manager.usage() / 1024 / 1024:.1f}MB / {manager.max_bytes / 1024 / 1024:.0f}MB")
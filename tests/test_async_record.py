@@ -0,0 +1,117 @@
+"""async_record.AsyncRecorder：用模拟音频源检查队列溢出、流结束、停止与语音检测"""
+import asyncio
+
+import numpy as np
+
+from async_record import AsyncRecorder
+from benchmarks.fake_audio import FakeAudioSource
+from vad import VAD
+
+RATE = 16000
+
+
+def _numbered_chunks(n, chunk):
+    """第 i 块的每个采样都等于 i，便于确认收到的是哪些块"""
+    return np.repeat(np.arange(n, dtype=np.int16), chunk)
+
+
+def _chunk_ids(chunks):
+    return [int(np.frombuffer(c, dtype=np.int16)[0]) for c in chunks]
+
+
+async def _wait_stream_end(recorder):
+    stream = recorder._stream
+    while stream.is_active():
+        await asyncio.sleep(0.01)
+    # 让音频线程已投递的 _put 全部执行
+    await asyncio.sleep(0.05)
+
+
+def test_chunks_until_end_of_stream():
+    signal = _numbered_chunks(50, 256)
+
+    async def main():
+        async with AsyncRecorder(FakeAudioSource(signal, realtime=False), queue_size=64,
+                                 RATE=RATE, CHANNELS=1, CHUNK=256) as recorder:
+            chunks = [c async for c in recorder.chunks()]
+        return recorder, chunks
+
+    recorder, chunks = asyncio.run(main())
+    assert b"".join(chunks) == signal.tobytes()
+    assert recorder.chunks_received == 50
+    assert recorder.dropped == 0
+
+
+def test_queue_overflow_drops_oldest_chunks():
+    signal = _numbered_chunks(40, 256)
+
+    async def main():
+        recorder = AsyncRecorder(FakeAudioSource(signal, realtime=False), queue_size=4,
+                                 RATE=RATE, CHANNELS=1, CHUNK=256)
+        await recorder.start()
+        stream = recorder._stream
+        # 不消费，直到音频源送完：队列只能保留最新的 4 块
+        await _wait_stream_end(recorder)
+        chunks = [c async for c in recorder.chunks()]
+        await recorder.stop()
+        return recorder, stream, chunks
+
+    recorder, stream, chunks = asyncio.run(main())
+    assert recorder.chunks_received == 40
+    assert recorder.dropped == 36
+    assert _chunk_ids(chunks) == [36, 37, 38, 39]
+    assert recorder._stream is None
+    assert not stream._thread.is_alive()
+
+
+def test_stop_while_recording():
+    # 循环播放的实时音频源不会自己结束，stop 后 chunks() 取空队列即结束
+    signal = _numbered_chunks(10, 256)
+
+    async def main():
+        recorder = AsyncRecorder(FakeAudioSource(signal, realtime=True, loop=True), queue_size=8,
+                                 RATE=RATE, CHANNELS=1, CHUNK=256)
+        await recorder.start()
+        stream = recorder._stream
+        received = []
+        async for chunk in recorder.chunks():
+            received.append(chunk)
+            if len(received) == 5:
+                await recorder.stop()
+        return recorder, stream, received
+
+    recorder, stream, received = asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert len(received) >= 5
+    assert _chunk_ids(received[:5]) == [0, 1, 2, 3, 4]
+    assert not stream._thread.is_alive() and not stream.is_active()
+    assert recorder.chunks_received == len(received) + recorder.dropped
+
+
+def _utterance(speech_seconds, silence_after):
+    t = np.arange(int(speech_seconds * RATE)) / RATE
+    tone = (3000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    return np.concatenate([np.zeros(RATE, dtype=np.int16), tone,
+                           np.zeros(int(silence_after * RATE), dtype=np.int16)])
+
+
+async def _speech(signal, chunk=1600):
+    vad = VAD(RATE, chunk, threshold_db=50, hangover=0.5, pre_roll=0.3)
+    async with AsyncRecorder(FakeAudioSource(signal, realtime=False), queue_size=1 << 12,
+                             RATE=RATE, CHANNELS=1, CHUNK=chunk) as recorder:
+        return b"".join([c async for c in recorder.speech_chunks(vad)]), vad
+
+
+def test_speech_chunks_stop_after_silence():
+    signal = _utterance(1.0, 3.0)
+    data, vad = asyncio.run(_speech(signal))
+    # 预录 3 块 + 语音 10 块 + 静音超过拖尾（5 块）的第 6 块后结束
+    assert vad.ended
+    assert data == signal[int(0.7 * RATE):int(2.6 * RATE)].tobytes()
+
+
+def test_speech_chunks_end_of_stream():
+    # 静音未超过拖尾时长音频就结束了：产出到流结束为止
+    signal = _utterance(1.0, 0.2)
+    data, vad = asyncio.run(_speech(signal))
+    assert not vad.ended
+    assert data == signal[int(0.7 * RATE):].tobytes()
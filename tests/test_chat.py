@@ -0,0 +1,97 @@
+"""chat：对本地模拟的 OpenAI 兼容接口流式对话"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("httpx")
+
+import chat
+from benchmarks.mock_openai import REPLY, MockOpenAIServer
+
+
+def _client(server, **kwargs):
+    return chat.ChatClient(api_key="mock", base_url=server.base_url, model=server.model, **kwargs)
+
+
+def test_stream_order_and_stats():
+    async def main(server):
+        async with _client(server) as client:
+            pieces = [p async for p in client.stream([{"role": "user", "content": "hi"}])]
+            return pieces, client.last_stats
+
+    with MockOpenAIServer(ttft=0.2, tokens_per_second=50, tokens=20) as server:
+        pieces, stats = asyncio.run(main(server))
+    # 每个 token 一段，按顺序到达
+    assert pieces == [{"text": c} for c in REPLY[:20]]
+    assert stats["model"] == server.model
+    assert stats["tokens"] == 20  # 取自 usage
+    assert not stats["cancelled"]
+    assert 0.2 <= stats["ttft"] < 1.0
+    assert stats["tokens_per_second"] == pytest.approx(50, rel=0.3)
+    assert stats["elapsed"] >= stats["ttft"] + 19 / 50 * 0.9
+
+
+def test_first_token_timeout():
+    async def main(server):
+        async with _client(server, first_token_timeout=0.2) as client:
+            start = time.perf_counter()
+            with pytest.raises(TimeoutError, match="没有收到"):
+                async for _ in client.stream([{"role": "user", "content": "hi"}]):
+                    pass
+            return time.perf_counter() - start
+
+    with MockOpenAIServer(ttft=1.5) as server:
+        assert asyncio.run(main(server)) < 1.0
+
+
+def test_cancel_keeps_partial_reply():
+    async def main(server):
+        async with _client(server) as client:
+            session = chat.ChatSession(client, system_prompt="")
+            pieces = []
+            received = asyncio.Event()
+
+            async def consume():
+                async for piece in session.reply("请详细介绍一下"):
+                    pieces.append(piece)
+                    if len(pieces) == 5:
+                        received.set()
+
+            task = asyncio.create_task(consume())
+            await received.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # 服务端在下一次写入时发现连接已断开
+            deadline = time.perf_counter() + 2
+            while not server.cancelled and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            return "".join(pieces), session.history, client.last_stats
+
+    with MockOpenAIServer(ttft=0.05, tokens_per_second=50, tokens=60) as server:
+        partial, history, stats = asyncio.run(main(server))
+        cancelled = server.cancelled
+    assert len(partial) >= 5
+    assert history == [{"role": "user", "content": "请详细介绍一下"},
+                       {"role": "assistant", "content": partial}]
+    assert stats["cancelled"]
+    assert cancelled == 1
+
+
+def test_connection_reused_across_turns():
+    async def main(server):
+        async with _client(server) as client:
+            assert await client.warmup()
+            session = chat.ChatSession(client, system_prompt="")
+            return [await session.ask(f"问题 {i}") for i in range(3)], session.history
+
+    with MockOpenAIServer(ttft=0.01, tokens_per_second=1000, tokens=10) as server:
+        answers, history = asyncio.run(main(server))
+        connections, requests = server.connections, server.requests
+    assert answers == [REPLY[:10]] * 3
+    assert len(history) == 6
+    # 预热与三轮对话共用一个 keep-alive 连接
+    assert requests == 4
+    assert connections == 1
@@ -0,0 +1,138 @@
+"""dl_file 分段下载：本地 Range 服务器注入故障与限速"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+import dl_file
+from benchmarks.local_http import RangeServer
+
+MB = 1024 * 1024
+
+
+def _download(server, path, size, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        dl_file.segmented_download(server.url, str(path), size, num_threads=4, progress=False,
+                                   session=requests.Session(), **kwargs)
+    return out.getvalue()
+
+
+def test_failed_ranges_are_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(dl_file, "RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(dl_file, "MAX_RETRIES", 50)
+    data = os.urandom(4 * MB)
+    path = tmp_path / "file.bin"
+    with RangeServer(data, fail_rate=0.25, drop_rate=0.25, seed=1) as server:
+        out = _download(server, path, len(data))
+    assert path.read_bytes() == data
+    assert server.faults["error"] > 0 and server.faults["drop"] > 0
+    assert "重试" in out
+    assert not os.path.exists(f"{path}.part") and not os.path.exists(f"{path}.part.json")
+
+
+def test_permanent_failure_keeps_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(dl_file, "RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(dl_file, "MAX_RETRIES", 1)
+    data = os.urandom(2 * MB)
+    path = tmp_path / "file.bin"
+    with RangeServer(data, fail_rate=1.0) as server:
+        try:
+            _download(server, path, len(data))
+        except requests.HTTPError:
+            pass
+        else:
+            raise AssertionError("全部请求失败时应抛出异常")
+    # 进度表保留，之后可以续传
+    assert os.path.exists(f"{path}.part.json")
+    assert not path.exists()
+
+
+def _saved_progress(json_path):
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            return sum(pos - start for start, _, pos in json.load(f)["ranges"])
+    except (OSError, ValueError):
+        return 0
+
+
+def test_resume_after_killed_run(tmp_path):
+    data = os.urandom(16 * MB)
+    path = tmp_path / "file.bin"
+    json_path = f"{path}.part.json"
+    with RangeServer(data, conn_bandwidth=512 * 1024) as server:
+        script = ("import sys, dl_file; dl_file.segmented_download(sys.argv[1], sys.argv[2], int(sys.argv[3]), "
+                  "num_threads=4, progress=False)")
+        proc = subprocess.Popen([sys.executable, "-c", script, server.url, str(path), str(len(data))],
+                                cwd=os.getcwd(), stdout=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 20
+            while _saved_progress(json_path) < 2 * MB and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            proc.kill()
+            proc.wait()
+        saved = _saved_progress(json_path)
+        assert 0 < saved < len(data)
+
+        server.conn_bandwidth = None
+        written = []
+        out = _download(server, path, len(data), on_progress=written.append)
+    assert "继续未完成的下载" in out
+    assert path.read_bytes() == data
+    # 只下载进度表中未完成的部分
+    assert sum(written) == len(data) - saved
+
+
+def _unreachable_url():
+    # 绑定后立即关闭的端口：连接被拒绝
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/file.bin"
+
+
+def _download_mirrors(urls, path, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        dl_file.download_mirrors(urls, str(path), num_threads=4, progress=False,
+                                 session=requests.Session(), **kwargs)
+    return out.getvalue()
+
+
+def test_mirrors_split_by_speed(tmp_path, monkeypatch):
+    # 较小的最小拆分量，使快镜像下载完自己的分段后能接手慢镜像剩下的部分
+    monkeypatch.setattr(dl_file, "MIN_SPLIT_SIZE", 256 * 1024)
+    data = os.urandom(4 * MB)
+    path = tmp_path / "file.bin"
+    info = {}
+    with RangeServer(data, conn_bandwidth=4 * MB) as fast, \
+            RangeServer(data, conn_bandwidth=256 * 1024) as slow, \
+            RangeServer(data[:-1]) as stale:
+        _download_mirrors([slow.url, stale.url, _unreachable_url(), fast.url], path,
+                          expected_sha256=hashlib.sha256(data).hexdigest(), info=info)
+    assert path.read_bytes() == data
+    assert info["sha256"] == hashlib.sha256(data).hexdigest()
+    # 大小不一致与无法访问的镜像被剔除，较快的镜像承担更多分段
+    assert stale.bytes_sent == 0
+    assert fast.bytes_sent > 2 * slow.bytes_sent > 0
+    assert not os.path.exists(f"{path}.part") and not os.path.exists(f"{path}.part.json")
+
+
+def test_mirrors_checksum_mismatch_removes_file(tmp_path):
+    data = os.urandom(2 * MB)
+    path = tmp_path / "file.bin"
+    with RangeServer(data) as a, RangeServer(data) as b:
+        try:
+            _download_mirrors([a.url, b.url], path, expected_sha256="0" * 64)
+        except dl_file.ChecksumMismatch:
+            pass
+        else:
+            raise AssertionError("SHA-256 不一致时应抛出 ChecksumMismatch")
+    assert not path.exists()
+    assert not os.path.exists(f"{path}.part") and not os.path.exists(f"{path}.part.json")
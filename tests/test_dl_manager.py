@@ -0,0 +1,46 @@
+"""dl_manager：并发的 run / download_async 调用各自下载、各自统计"""
+import asyncio
+import contextlib
+import io
+import os
+
+from dl_manager import DownloadManager
+from benchmarks.local_http import RangeServer
+
+KB = 1024
+
+
+def test_session_pool_matches_max_connections():
+    with DownloadManager(max_connections=48) as manager:
+        adapter = manager.session.get_adapter("http://127.0.0.1/")
+        assert adapter._pool_maxsize == 48
+        with DownloadManager(max_connections=4) as other:
+            assert other.session is not manager.session
+
+
+def test_concurrent_download_async(tmp_path):
+    files = [os.urandom((i + 1) * 256 * KB) for i in range(4)]
+    with contextlib.ExitStack() as stack:
+        servers = [stack.enter_context(RangeServer(data, latency=0.02, path=f"/f{i}.bin"))
+                   for i, data in enumerate(files)]
+        manager = stack.enter_context(DownloadManager(max_connections=8, threads_per_file=2))
+        # 队列中的文件只由 run 下载，download_async 不会取走
+        manager.add(servers[0].url, str(tmp_path / "queued.bin"))
+
+        async def main():
+            return await asyncio.gather(
+                *(manager.download_async(s.url, str(tmp_path / f"f{i}.bin")) for i, s in enumerate(servers)))
+
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            results = asyncio.run(main())
+            assert not os.path.exists(tmp_path / "queued.bin")
+            queued = manager.run()
+
+    for i, (data, result) in enumerate(zip(files, results)):
+        assert "error" not in result
+        assert result["path"] == str(tmp_path / f"f{i}.bin")
+        assert result["bytes"] == len(data)
+        assert (tmp_path / f"f{i}.bin").read_bytes() == data
+    assert [r["path"] for r in queued] == [str(tmp_path / "queued.bin")]
+    assert manager.last_summary["files"] == 1
+    assert manager.last_summary["bytes"] == len(files[0])
@@ -0,0 +1,92 @@
+"""dl_tts 安装步骤的依赖调度（用桩步骤，不执行真实安装）"""
+import contextlib
+import io
+import threading
+
+import pytest
+
+import dl_tts
+from dl_tts import Step
+
+
+def _run(steps, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = dl_tts.run_plan(steps, **kwargs)
+    return {name: status for name, (status, _) in results.items()}
+
+
+def test_independent_steps_run_in_parallel():
+    # 两个步骤互相等待对方开始：顺序执行时 Barrier 超时，步骤失败
+    barrier = threading.Barrier(2, timeout=5)
+    order = []
+    steps = [
+        Step("root", lambda: order.append("root")),
+        Step("a", barrier.wait, ["root"]),
+        Step("b", barrier.wait, ["root"]),
+        Step("end", lambda: order.append("end"), ["a", "b"]),
+    ]
+    assert [[s.name for s in wave] for wave in dl_tts.plan_waves(steps)] == [["root"], ["a", "b"], ["end"]]
+    assert _run(steps) == {"root": "完成", "a": "完成", "b": "完成", "end": "完成"}
+    assert order == ["root", "end"]
+
+
+def test_failure_marks_dependents_not_run():
+    ran = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    def exit_():
+        # 步骤内部打印原因后调用 sys.exit
+        raise SystemExit(1)
+
+    steps = [
+        Step("fail", fail),
+        Step("child", lambda: ran.append("child"), ["fail"]),
+        Step("grandchild", lambda: ran.append("grandchild"), ["child"]),
+        Step("exit", exit_),
+        Step("after_exit", lambda: ran.append("after_exit"), ["exit"]),
+        Step("other", lambda: ran.append("other")),
+    ]
+    assert _run(steps) == {"fail": "失败", "child": "未执行", "grandchild": "未执行",
+                           "exit": "失败", "after_exit": "未执行", "other": "完成"}
+    assert ran == ["other"]
+
+
+def test_skipped_step_satisfies_dependents():
+    ran = []
+    checked = []
+    steps = [
+        Step("first", lambda: ran.append("first")),
+        # skip 在依赖完成之后才判断
+        Step("cached", lambda: ran.append("cached"), ["first"], skip=lambda: checked.append(list(ran)) or True),
+        Step("next", lambda: ran.append("next"), ["cached"], skip=lambda: False),
+    ]
+    assert _run(steps) == {"first": "完成", "cached": "跳过", "next": "完成"}
+    assert ran == ["first", "next"]
+    assert checked == [["first"]]
+
+
+def test_cycle_and_missing_dependency_are_rejected():
+    ran = []
+    cycle = [
+        Step("ok", lambda: ran.append("ok")),
+        Step("a", lambda: ran.append("a"), ["ok", "c"]),
+        Step("b", lambda: ran.append("b"), ["a"]),
+        Step("c", lambda: ran.append("c"), ["b"]),
+    ]
+    with pytest.raises(ValueError, match="循环依赖"):
+        dl_tts.plan_waves(cycle)
+    with pytest.raises(ValueError, match="循环依赖"):
+        _run(cycle)
+    with pytest.raises(ValueError, match="不存在的步骤"):
+        _run([Step("a", lambda: ran.append("a"), ["missing"])])
+    # 检查在执行任何步骤之前完成
+    assert ran == []
+
+
+def test_build_plan_is_valid():
+    steps = {step.name: step for step in dl_tts.build_plan()}
+    dl_tts.plan_waves(list(steps.values()))
+    # 多镜像下载模型不需要 uv，与安装 uv、克隆仓库同时开始
+    assert "uv" not in steps["models"].deps
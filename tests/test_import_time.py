@@ -0,0 +1,16 @@
+"""导入耗时：在全新解释器中导入各入口模块，不应拉入重量级依赖，耗时不超过预算"""
+import pytest
+
+from benchmarks.bench_import import measure
+
+MODULES = ["stt", "record", "mono", "chat"]
+FORBIDDEN = {"librosa", "vosk", "pyaudio", "requests"}
+BUDGET_MS = 500  # 主要是 numpy 的导入耗时（约 100ms），留出机器差异的余量
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_is_light(module):
+    ms, heavy = measure(module, 3)
+    assert ms is not None, f"导入 {module} 失败: {heavy}"
+    assert not FORBIDDEN & set(heavy), f"导入 {module} 时加载了 {sorted(FORBIDDEN & set(heavy))}"
+    assert ms < BUDGET_MS, f"导入 {module} 耗时 {ms:.0f}ms，超过 {BUDGET_MS}ms"
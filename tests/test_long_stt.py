@@ -0,0 +1,42 @@
+"""long_stt：静音处切分后并行识别，结果与顺序识别一致"""
+import contextlib
+import functools
+import io
+
+import pytest
+
+import long_stt
+from benchmarks.bench_long_stt import _max_time_error, _tone_stt, make_fixture
+
+
+@pytest.fixture(scope="module")
+def fixture(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("long_stt") / "long.wav")
+    return path, make_fixture(path, 60, 16000)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_matches_sequential(fixture, workers):
+    path, truth = fixture
+    factory = functools.partial(_tone_stt, 0.0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sequential = factory().Speech_to_Text(path)
+    segments = list(long_stt.transcribe_segments(path, workers, stt_factory=factory,
+                                                 min_seconds=5, max_seconds=15))
+    sentences = [s for seg in segments for s in seg["sentences"]]
+    text = " ".join(s["text"] for s in sentences)
+
+    assert len(segments) >= 4
+    assert text == sequential == " ".join(w for w, _ in truth)
+    assert long_stt.transcribe_long(path, workers, stt_factory=factory, min_seconds=5, max_seconds=15)[0] == text
+
+    # 片段首尾相接；加上片段偏移后，句子与词的时间在整个文件中单调递增
+    assert [seg["start"] for seg in segments[1:]] == pytest.approx([seg["end"] for seg in segments[:-1]])
+    words = [w for s in sentences for w in s["words"]]
+    starts = [w["start"] for w in words]
+    assert starts == sorted(starts) and len(set(starts)) == len(starts)
+    assert all(w["start"] < w["end"] for w in words)
+    for seg in segments:
+        for s in seg["sentences"]:
+            assert seg["start"] <= s["start"] <= s["end"] <= seg["end"] + 1e-6
+    assert _max_time_error(truth, words) < 0.05
@@ -0,0 +1,62 @@
+"""metrics：定期 flush 的线程与 JSON Lines 导出器"""
+import json
+import threading
+import time
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def _restore_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    monkeypatch.setattr(metrics, "_configured", True)
+    metrics.reset()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def _flushers():
+    return [t for t in threading.enumerate() if t.name == "metrics-flush"]
+
+
+def test_disable_stops_flusher(tmp_path):
+    exporter = metrics.JsonLinesExporter(str(tmp_path / "metrics.jsonl"))
+    metrics.enable([exporter], flush_interval=0.02)
+    thread = metrics._flusher[0]
+    time.sleep(0.1)
+    metrics.disable()
+    assert not thread.is_alive()
+    assert _flushers() == []
+
+    # disable 后立即以很长的间隔重新开启：只有一个 flush 线程
+    metrics.enable([metrics.JsonLinesExporter(str(tmp_path / "metrics.jsonl"))], flush_interval=3600)
+    metrics.enable([metrics.JsonLinesExporter(str(tmp_path / "metrics.jsonl"))], flush_interval=3600)
+    assert len(_flushers()) == 1
+    metrics.disable()
+    assert _flushers() == []
+
+    snapshots = [json.loads(line) for line in (tmp_path / "metrics.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert len(snapshots) >= 3 and all(r["type"] == "snapshot" for r in snapshots)
+
+
+def test_jsonl_exporter_keeps_file_open(tmp_path):
+    path = tmp_path / "logs" / "metrics.jsonl"
+    exporter = metrics.JsonLinesExporter(str(path))
+    metrics.enable([exporter])
+    handle = exporter._file
+    for i in range(3):
+        with metrics.span("stage", step=i):
+            pass
+    metrics.inc("files_total", 2)
+    metrics.flush()
+    # 按行缓冲：不关闭文件也能读到每一行
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert exporter._file is handle and not handle.closed
+    assert [r["labels"]["step"] for r in records if r["type"] == "span"] == [0, 1, 2]
+    assert records[-1]["counters"] == [{"name": "files_total", "labels": {}, "value": 2}]
+    metrics.disable()
+    assert handle.closed
+    metrics.flush()  # 关闭后的 flush（如 atexit）不出错
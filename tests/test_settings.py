@@ -0,0 +1,46 @@
+import pytest
+
+import record
+import settings
+from settings import load_config
+
+
+def _load(tmp_path, record_section):
+    path = tmp_path / "config.toml"
+    path.write_text(f"[record]\n{record_section}\n", encoding="utf-8")
+    return load_config(str(path)).record
+
+
+def test_shipped_config_uses_vad_threshold(capsys):
+    cfg = load_config().record
+    assert cfg.SILENCE_THRESHOLD is None
+    assert 20 <= cfg.VAD_THRESHOLD_DB <= 80
+    assert "SILENCE_THRESHOLD" not in capsys.readouterr().err
+
+
+def test_legacy_silence_threshold_is_converted_with_warning(tmp_path, capsys):
+    cfg = _load(tmp_path, "SILENCE_THRESHOLD = 90")
+    assert cfg.VAD_THRESHOLD_DB == pytest.approx(90 - settings.LEGACY_PEAK_TO_RMS_DB)
+    err = capsys.readouterr().err
+    assert "SILENCE_THRESHOLD" in err and "VAD_THRESHOLD_DB" in err
+
+    # 旧代码的默认值 500 超出 int16 峰值范围，按满幅换算
+    (tmp_path / "old").mkdir()
+    cfg = _load(tmp_path / "old", "SILENCE_THRESHOLD = 500")
+    assert cfg.VAD_THRESHOLD_DB < 80
+
+
+def test_new_key_wins_over_legacy(tmp_path, capsys):
+    cfg = _load(tmp_path, "SILENCE_THRESHOLD = 90\nVAD_THRESHOLD_DB = 45")
+    assert cfg.VAD_THRESHOLD_DB == 45
+    assert capsys.readouterr().err == ""
+
+
+def test_record_legacy_kwarg_is_converted():
+    params = record._with_defaults(SILENCE_THRESHOLD=90, VAD_THRESHOLD_DB=None, RATE=None)
+    assert "SILENCE_THRESHOLD" not in params
+    assert params["VAD_THRESHOLD_DB"] == pytest.approx(90 - settings.LEGACY_PEAK_TO_RMS_DB)
+    assert params["RATE"] == load_config().record.RATE
+
+    params = record._with_defaults(SILENCE_THRESHOLD=None, VAD_THRESHOLD_DB=None)
+    assert params["VAD_THRESHOLD_DB"] == load_config().record.VAD_THRESHOLD_DB
@@ -0,0 +1,89 @@
+"""stt.STT.Speech_to_Text：录音的临时文件在任何情况下都会释放"""
+import contextlib
+import io
+import sys
+import types
+import wave
+
+import numpy as np
+import pytest
+
+import temp_audio
+from benchmarks.bench_stt import FakeModel, FakeRecognizer
+from stt import STT
+
+
+class _Manager:
+    def __init__(self):
+        self.released = []
+
+    def release(self, target):
+        self.released.append(target)
+
+
+def _write_wav(path, channels, seconds=1.0, rate=16000):
+    samples = (1000 * np.sin(np.arange(int(seconds * rate) * channels) / 10)).astype(np.int16)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+    return str(path)
+
+
+@pytest.fixture
+def recording(monkeypatch):
+    """模拟 record.record_wav 与临时文件管理器，返回 (设置录音文件的函数, 管理器)"""
+    manager = _Manager()
+    fake_record = types.SimpleNamespace(path=None)
+    fake_record.record_wav = lambda: fake_record.path
+    monkeypatch.setitem(sys.modules, "record", fake_record)
+    monkeypatch.setattr(temp_audio, "get_manager", lambda root=None: manager)
+
+    def use(path):
+        fake_record.path = path
+        return path
+    return use, manager
+
+
+def _stt(factory=FakeRecognizer):
+    return STT(model=FakeModel(), recognizer_factory=factory)
+
+
+def test_recording_released_after_decode(recording, tmp_path):
+    use, manager = recording
+    path = use(_write_wav(tmp_path / "rec.wav", 1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert _stt().Speech_to_Text(use_mono=False) is not None
+    assert manager.released == [path]
+
+
+def test_recording_released_on_format_error(recording, tmp_path):
+    use, manager = recording
+    path = use(_write_wav(tmp_path / "stereo.wav", 2))
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        assert _stt().Speech_to_Text(use_mono=False) is None
+    assert "16位单声道" in out.getvalue()
+    assert manager.released == [path]
+
+
+def test_recording_released_on_decode_error(recording, tmp_path):
+    use, manager = recording
+    path = use(_write_wav(tmp_path / "rec.wav", 1))
+
+    class BrokenRecognizer(FakeRecognizer):
+        def AcceptWaveform(self, data):
+            raise RuntimeError("decode failed")
+
+    with pytest.raises(RuntimeError, match="decode failed"):
+        _stt(BrokenRecognizer).Speech_to_Text(use_mono=False)
+    assert manager.released == [path]
+
+
+def test_file_input_is_not_released(recording, tmp_path):
+    _, manager = recording
+    path = _write_wav(tmp_path / "input.wav", 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        text = _stt().Speech_to_Text(path, use_mono=False)
+    assert isinstance(text, str)
+    assert manager.released == []
@@ -0,0 +1,87 @@
+"""stt_catalog：解析保存下来的模型页面（不访问网络）"""
+import json
+import os
+
+import pytest
+
+import stt_catalog
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "data", "vosk_models.html")
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return stt_catalog.fetch_catalog(html_path=FIXTURE)
+
+
+def test_parse_models(catalog):
+    m = catalog.by_name["vosk-model-small-cn-0.22"]
+    assert m["category"] == "Chinese"
+    assert m["url"] == "https://alphacephei.com/vosk/models/vosk-model-small-cn-0.22.zip"
+    assert m["lang"] == "cn"
+    assert m["size_mb"] == 42
+    assert m["wer"] == 23.54
+
+    m = catalog.by_name["vosk-model-en-us-0.22"]
+    assert m["category"] == "English"
+    assert m["lang"] == "en-us"
+    assert m["size_mb"] == 1.8 * 1024
+    assert m["wer"] == 5.69
+    assert catalog.by_name["vosk-model-en-in-0.5"]["lang"] == "en-in"
+
+    # 没有下载链接的模型保留，但 url 为空；没有词错率的模型 wer 为 None
+    assert catalog.by_name["vosk-model-en-us-0.42-gigaspeech"]["url"] == ""
+    assert catalog.by_name["vosk-model-spk-0.4"]["wer"] is None
+    assert catalog.by_name["vosk-model-spk-0.4"]["category"] == "Speaker identification model"
+    # 分类标题行和表头不是模型
+    assert "English" not in catalog.by_name and "Model" not in catalog.by_name
+
+
+def test_parse_punctuation_table(catalog):
+    punctuation = [m for m in catalog.models if m["category"].startswith("Punctuation")]
+    assert [m["name"] for m in punctuation] == ["vosk-recasepunc-en-0.22", "vosk-recasepunc-ru-0.22"]
+    m = punctuation[0]
+    assert m["category"] == "Punctuation - English"
+    assert m["lang"] == "en"
+    assert m["size_mb"] == 1.6 * 1024
+    assert m["wer_speed"] == "" and m["wer"] is None
+    assert m["notes"] == "Punctuation and case restoration model"
+    assert m["license"] == "Apache 2.0"
+    assert punctuation[1]["category"] == "Punctuation - Russian"
+
+
+def test_search(catalog):
+    names = lambda models: [m["name"] for m in models]
+    # "en" 同时匹配 en-us、en-in，结果按大小排序；没有下载链接的模型默认不返回
+    assert names(catalog.search("en")) == ["vosk-model-small-en-us-0.15", "vosk-model-en-in-0.5",
+                                          "vosk-recasepunc-en-0.22", "vosk-model-en-us-0.22"]
+    assert names(catalog.search("en-us")) == ["vosk-model-small-en-us-0.15", "vosk-model-en-us-0.22"]
+    assert "vosk-model-en-us-0.42-gigaspeech" in names(catalog.search("en-us", downloadable=False))
+    assert names(catalog.search("cn", max_size_mb=100)) == ["vosk-model-small-cn-0.22"]
+    assert names(catalog.search("en", max_wer=6)) == ["vosk-model-en-us-0.22"]
+    assert names(catalog.search(keyword="recasepunc")) == ["vosk-recasepunc-en-0.22", "vosk-recasepunc-ru-0.22"]
+    assert names(catalog.search(max_size_mb=42)) == ["vosk-model-spk-0.4", "vosk-model-small-en-us-0.15",
+                                                     "vosk-model-small-cn-0.22"]
+    assert catalog.search("xx") == []
+    assert "cn" in catalog.languages() and "en-us" in catalog.languages()
+
+
+def test_load_catalog_saves_index(tmp_path):
+    path = str(tmp_path / "models.json")
+    saved = stt_catalog.load_catalog(path=path, html_path=FIXTURE)
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)["models"]) == len(saved.models)
+
+    # 未过期时直接读取索引文件，不访问网络
+    loaded = stt_catalog.load_catalog(path=path, ttl=float("inf"), url="http://127.0.0.1:9/")
+    assert loaded.models == saved.models
+    assert loaded.search("cn", max_size_mb=100)[0]["name"] == "vosk-model-small-cn-0.22"
+
+
+def test_load_catalog_falls_back_to_stale_index(tmp_path, capsys):
+    path = str(tmp_path / "models.json")
+    stt_catalog.load_catalog(path=path, html_path=FIXTURE)
+    # 索引已过期且抓取失败时退回旧索引
+    catalog = stt_catalog.load_catalog(path=path, ttl=0, url="http://127.0.0.1:9/", background=False)
+    assert "vosk-model-cn-0.22" in catalog.by_name
+    assert "使用已保存的列表" in capsys.readouterr().out
@@ -0,0 +1,152 @@
+"""stt_server：进程内启动识别服务，客户端送入合成音频"""
+import asyncio
+import json
+import time
+
+import numpy as np
+import pytest
+
+import stt_server
+from benchmarks.bench_stt import FakeModel, FakeRecognizer
+from stt import STT
+
+RATE = 16000
+
+
+class PartialRecognizer(FakeRecognizer):
+    """中间结果为已送入的整秒数，每 5 秒给出一句（帧数）"""
+
+    def PartialResult(self):
+        return json.dumps({"partial": f"{self.frames // self.sample_rate}s"})
+
+
+def _audio(seconds, channels=1):
+    t = np.arange(int(seconds * RATE)) / RATE
+    samples = (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    return np.repeat(samples[:, None], channels, axis=1).tobytes()
+
+
+def _chunks(data, step=stt_server.CHUNK_BYTES):
+    return [data[i:i + step] for i in range(0, len(data), step)]
+
+
+def _server(tmp_path, **kwargs):
+    stt = STT(model=FakeModel(), recognizer_factory=PartialRecognizer)
+    return stt_server.STTServer(stt, **kwargs), f"unix:{tmp_path / 'stt.sock'}"
+
+
+def test_partial_and_final_frames(tmp_path):
+    async def main():
+        server, address = _server(tmp_path, max_sessions=2, workers=2)
+        async with await server.start(address):
+            results = []
+            final = await stt_server.recognize(server.address, _chunks(_audio(12)), on_result=results.append)
+            return final, results, server.stats()
+
+    final, results, stats = asyncio.run(main())
+    texts = [r["text"] for r in results if "text" in r]
+    partials = [r["partial"] for r in results if "partial" in r]
+    # FakeRecognizer 每 5 秒音频给出一句，内容为累计帧数
+    assert texts == [str(5 * RATE), str(10 * RATE)]
+    assert final["final"] == f"{5 * RATE} {10 * RATE} {12 * RATE}"
+    # 中间结果按顺序增长，相同的中间结果不重复发送
+    assert partials and partials == sorted(set(partials), key=partials.index)
+    assert "11s" in partials
+    assert final["stats"]["audio_seconds"] == pytest.approx(12)
+    assert final["stats"]["chunks"] == len(_chunks(_audio(12)))
+    assert final["stats"]["first_result"] is not None
+    assert 0 <= final["stats"]["latency_p50"] <= final["stats"]["latency_max"]
+    assert stats == {"active": 0, "total": 1, "rejected": 0, "max_sessions": 2}
+
+
+def test_concurrent_sessions(tmp_path):
+    async def main():
+        server, address = _server(tmp_path, max_sessions=8, workers=4)
+        async with await server.start(address):
+            # 每个会话的音频时长不同（奇数号为双声道），最终结果（帧数）应各自对应
+            finals = await asyncio.gather(
+                *(stt_server.recognize(server.address, _chunks(_audio(1 + i / 2, channels=1 + i % 2)),
+                                       channels=1 + i % 2)
+                  for i in range(6)))
+            return finals, server.stats()
+
+    finals, stats = asyncio.run(main())
+    for i, final in enumerate(finals):
+        assert final["final"] == str(int((1 + i / 2) * RATE))
+        assert final["stats"]["audio_seconds"] == pytest.approx(1 + i / 2)
+    assert stats["total"] == 6 and stats["active"] == 0 and stats["rejected"] == 0
+
+
+def test_busy_server_rejects_new_sessions(tmp_path):
+    async def main():
+        server, address = _server(tmp_path, max_sessions=1, workers=2, admission_timeout=0.2)
+        async with await server.start(address):
+            release = asyncio.Event()
+            started = asyncio.Event()
+
+            async def held():
+                # 占住唯一的会话，直到 release
+                for chunk in _chunks(_audio(1)):
+                    yield chunk
+                started.set()
+                await release.wait()
+
+            first = asyncio.create_task(stt_server.recognize(server.address, held()))
+            await started.wait()
+            with pytest.raises(stt_server.ServerBusy):
+                await stt_server.recognize(server.address, _chunks(_audio(1)))
+            busy = server.stats()
+            release.set()
+            result = await first
+            # 会话结束后新会话可以进入
+            again = await stt_server.recognize(server.address, _chunks(_audio(1)))
+            return busy, result, again, server.stats()
+
+    busy, result, again, stats = asyncio.run(asyncio.wait_for(main(), timeout=10))
+    assert busy["active"] == 1 and busy["rejected"] == 1
+    assert result["final"] == again["final"] == str(RATE)
+    assert stats == {"active": 0, "total": 2, "rejected": 1, "max_sessions": 1}
+
+
+def test_unknown_model_is_rejected(tmp_path):
+    async def main():
+        server, address = _server(tmp_path, models={"other": STT(model=FakeModel(), recognizer_factory=FakeRecognizer)})
+        async with await server.start(address):
+            with pytest.raises(RuntimeError, match="未知的模型"):
+                await stt_server.recognize(server.address, _chunks(_audio(1)), model="/etc")
+            named = await stt_server.recognize(server.address, _chunks(_audio(1)), model="other")
+            return named, server.stats()
+
+    named, stats = asyncio.run(main())
+    assert named["final"] == str(RATE)
+    assert stats["total"] == 1
+
+
+def test_model_loading_does_not_block_sessions(tmp_path, monkeypatch):
+    import stt as stt_module
+    loading = []
+
+    class SlowSTT(STT):
+        def __init__(self, model_path=None, **kwargs):
+            loading.append(model_path)
+            time.sleep(1.0)
+            super().__init__(model=FakeModel(), recognizer_factory=PartialRecognizer)
+
+    monkeypatch.setattr(stt_module, "STT", SlowSTT)
+
+    async def main():
+        # 只有一个解码线程：模型若在解码线程中加载，默认模型的会话要等加载结束
+        server, address = _server(tmp_path, workers=1, models={"slow": "/models/slow"})
+        async with await server.start(address):
+            slow = asyncio.create_task(stt_server.recognize(server.address, _chunks(_audio(1)), model="slow"))
+            while not loading:
+                await asyncio.sleep(0.01)
+            start = time.perf_counter()
+            fast = await stt_server.recognize(server.address, _chunks(_audio(1)))
+            fast_seconds = time.perf_counter() - start
+            return fast, fast_seconds, await slow
+
+    fast, fast_seconds, slow = asyncio.run(asyncio.wait_for(main(), timeout=10))
+    assert loading == ["/models/slow"]
+    assert fast["final"] == slow["final"] == str(RATE)
+    assert fast_seconds < 0.5
@@ -0,0 +1,37 @@
+"""temp_audio：自动清理只删除本模块管理的文件"""
+import os
+import time
+
+import temp_audio
+from settings import load_config
+
+
+def _touch(path, age):
+    path.write_bytes(b"\0" * 1024)
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return path
+
+
+def test_cleanup_keeps_user_files(tmp_path):
+    manager = temp_audio.TempAudioManager(tmp_path, mode="disk", max_bytes=1 << 30, max_age=3600, auto_clean=True)
+    managed = _touch(manager.create(prefix="rec-"), 7200)
+    legacy_recording = _touch(tmp_path / "20240101120000.wav", 7200)
+    user_files = [_touch(tmp_path / name, 7200) for name in ("123.wav", "42.flac", "notes.wav")]
+
+    assert manager.cleanup() == 2
+    assert not managed.exists() and not legacy_recording.exists()
+    assert all(p.exists() for p in user_files)
+
+
+def test_legacy_mono_names_only_in_mono_dir(tmp_path, monkeypatch):
+    mono_dir = load_config().record.mono_save_path
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(mono_dir)
+    legacy = _touch(tmp_path / mono_dir / "1234.wav", 7200)
+    other = _touch(tmp_path / "1234.wav", 7200)
+
+    for root in (mono_dir, "."):
+        temp_audio.TempAudioManager(root, mode="disk", max_bytes=1 << 30, max_age=3600, auto_clean=True).cleanup()
+    assert not legacy.exists()
+    assert other.exists()
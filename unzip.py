@@ -1,32 +1,124 @@
 import zipfile
 import os
-import pathlib
+import shutil
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
 
-def unzip(zip_file_path, extract_to_path):
+COPY_BUFFER = 1024 * 1024  # 解压时每次复制的字节数
+BATCH_SIZE = 4 * 1024 * 1024  # 每个任务最多包含的压缩数据量
+BATCH_FILES = 64  # 每个任务最多包含的条目数
+
+
+def safe_join(root, name):
+    """
+    把压缩包内的条目路径拼接到 root 下
+
+    拒绝绝对路径以及包含 .. 等会写到 root 之外的条目（路径穿越）。
+
+    Raises:
+        ValueError: 条目路径不安全
+    """
+    root = os.path.abspath(root)
+    target = os.path.normpath(os.path.join(root, name))
+    if target != root and os.path.commonpath([root, target]) != root:
+        raise ValueError(f"不安全的压缩包条目路径: {name}")
+    return target
+
+
+def file_matches(path, size, crc):
+    """判断磁盘上的文件是否与压缩包条目一致（大小与 CRC32 均相同）"""
+    try:
+        if os.path.getsize(path) != size:
+            return False
+        value = 0
+        with open(path, 'rb') as f:
+            while chunk := f.read(1024 * 1024):
+                value = zlib.crc32(chunk, value)
+    except OSError:
+        return False
+    return value == crc
+
+def _batches(files):
+    """
+    把条目分成若干批交给线程池：大文件单独一批并最先开始，
+    小文件按顺序合并，减少每个任务的调度开销
+    """
+    files = sorted(files, key=lambda entry: entry[0].compress_size, reverse=True)
+    batch, size = [], 0
+    for entry in files:
+        batch.append(entry)
+        size += entry[0].compress_size
+        if size >= BATCH_SIZE or len(batch) >= BATCH_FILES:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def unzip(zip_file_path, extract_to_path, num_threads=None, progress=True):
     """
     解压包含子文件夹的ZIP文件
-    
+
+    条目分给多个线程并行解压（每个线程各自打开压缩包，zlib 解压时释放 GIL），
+    与磁盘上已有文件一致（大小与 CRC32 相同）的条目直接跳过，重复解压几乎不耗时。
+
     Args:
         zip_file_path: ZIP文件路径
         extract_to_path: 解压目标路径
+        num_threads: 线程数，默认按 CPU 核心数
+        progress: 是否显示进度条
+
+    Raises:
+        ValueError: 压缩包中有会写到目标路径之外的条目，此时不会解压任何文件
     """
     with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-        file_list = zip_ref.namelist()
-        print(f"开始解压 {len(file_list)} 个项目到 {extract_to_path}...")
-        
-        for i, file in enumerate(file_list, 1):
-            # 构建完整的目标路径
-            target_path = pathlib.Path(extract_to_path) / file
-            
-            if file.endswith('/'):  # 目录条目
-                os.makedirs(target_path, exist_ok=True)
-                print(f"[{i}/{len(file_list)}] mkdir: {file}")
-            else:  # 文件条目
-                # 确保父目录存在
-                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                # 解压到指定目录
-                zip_ref.extract(file, extract_to_path)
-                print(f"[{i}/{len(file_list)}] unzip: {file}")
-        
-        print("[✓] Success！")
-        return True
+        infos = zip_ref.infolist()
+    # 先检查全部条目，发现路径穿越时一个文件都不写
+    targets = [(info, safe_join(extract_to_path, info.filename)) for info in infos]
+    print(f"开始解压 {len(infos)} 个项目到 {extract_to_path}...")
+
+    files = []
+    dirs = set()
+    for info, target in targets:
+        if info.is_dir():
+            dirs.add(target)
+        else:
+            dirs.add(os.path.dirname(target))
+            files.append((info, target))
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+
+    local = threading.local()
+    lock = threading.Lock()
+    skipped = []
+    opened = []
+
+    def extract(batch):
+        if not hasattr(local, "zip_ref"):
+            local.zip_ref = zipfile.ZipFile(zip_file_path, 'r')
+            opened.append(local.zip_ref)
+        done = 0
+        for info, target in batch:
+            if file_matches(target, info.file_size, info.CRC):
+                skipped.append(info.filename)
+            else:
+                with local.zip_ref.open(info) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER)
+            done += info.file_size
+        with lock:
+            progress_bar.update(done)
+
+    with tqdm(total=sum(info.file_size for info, _ in files), disable=not progress,
+              unit='B', unit_scale=True, unit_divisor=1024) as progress_bar:
+        try:
+            with ThreadPoolExecutor(num_threads or min(8, os.cpu_count() or 4)) as pool:
+                for _ in pool.map(extract, _batches(files)):
+                    pass
+        finally:
+            for zip_ref in opened:
+                zip_ref.close()
+
+    print(f"[✓] Success！{len(files) - len(skipped)} 个文件已解压，{len(skipped)} 个已是最新")
+    return True
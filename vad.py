@@ -0,0 +1,136 @@
+import numpy as np
+
+
+class VAD:
+    """
+    基于短时能量与过零率的语音活动检测
+
+    每个数据块被切分为若干短帧，一次性向量化计算每帧的能量 (dB) 与过零率。
+    开始与结束使用不同阈值（滞回），检测到语音后静音持续 hangover 秒才结束（拖尾），
+    触发前的数据保存在固定大小的预录环形缓冲中，触发时一并输出，避免截掉字头。
+
+    Args:
+        rate: 采样率
+        chunk: 每个数据块的帧数
+        channels: 声道数
+        threshold_db: 开始阈值，帧能量为 20*log10(RMS)，RMS 以 int16 幅度计
+        hysteresis_db: 结束阈值比开始阈值低的分贝数
+        hangover: 语音结束前允许的静音时长（秒）
+        pre_roll: 触发前保留的音频时长（秒）
+        max_zcr: 开始时要求的最大过零率，用于排除宽带噪声
+        frame_ms: 分析帧长（毫秒）
+    """
+
+    def __init__(self, rate, chunk, channels=1, threshold_db=60.0, hysteresis_db=6.0,
+                 hangover=2.0, pre_roll=0.3, max_zcr=0.4, frame_ms=10):
+        self.rate = rate
+        self.chunk = chunk
+        self.channels = channels
+        self.threshold_db = threshold_db
+        self.release_db = threshold_db - hysteresis_db
+        self.max_zcr = max_zcr
+        self.hangover_chunks = int(hangover * rate / chunk)
+        self.frame_len = max(1, min(chunk, int(rate * frame_ms / 1000)))
+        self.n_frames = chunk // self.frame_len
+
+        # 预录环形缓冲：预先分配，按块覆盖写入
+        ring_chunks = int(np.ceil(pre_roll * rate / chunk))
+        self._ring = np.zeros((ring_chunks, chunk * channels), dtype=np.int16)
+        self.reset()
+
+    @classmethod
+    def from_config(cls, rate, chunk, channels=1, **overrides):
+        """按 config.toml 中 [record] 的阈值创建 VAD，overrides 中的参数优先"""
+        from settings import load_config
+        cfg = load_config().record
+        params = dict(
+            threshold_db=cfg.VAD_THRESHOLD_DB,
+            hysteresis_db=cfg.VAD_HYSTERESIS_DB,
+            hangover=cfg.SILENCE_DURATION,
+            pre_roll=cfg.VAD_PRE_ROLL,
+            max_zcr=cfg.VAD_MAX_ZCR
+        )
+        params.update(overrides)
+        return cls(rate, chunk, channels, **params)
+
+    def reset(self):
+        """重置检测状态，以便处理下一段语音"""
+        self.triggered = False
+        self.ended = False
+        self.level_db = 0.0
+        self._silent_chunks = 0
+        self._ring_pos = 0
+        self._ring_count = 0
+
+    def features(self, data):
+        """
+        计算数据块中每一帧的能量与过零率
+
+        Returns:
+            (energy_db, zcr)，均为长度等于帧数的数组
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples[:len(samples) - len(samples) % self.channels]
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        n_frames = max(1, len(samples) // self.frame_len)
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, -1).astype(np.float32)
+        if frames.size == 0:
+            return np.zeros(1, dtype=np.float32), np.zeros(1, dtype=np.float32)
+        power = np.einsum("ij,ij->i", frames, frames) / frames.shape[1]
+        energy_db = 10 * np.log10(np.maximum(power, 1.0))
+        crossings = np.count_nonzero(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        zcr = crossings / frames.shape[1]
+        return energy_db, zcr
+
+    def is_speech(self, data):
+        """判断数据块是否为语音；已触发时使用较低的结束阈值，且不再检查过零率"""
+        energy_db, zcr = self.features(data)
+        self.level_db = float(energy_db.max())
+        if self.triggered:
+            return bool(np.any(energy_db > self.release_db))
+        return bool(np.any((energy_db > self.threshold_db) & (zcr < self.max_zcr)))
+
+    def _push_ring(self, data):
+        if len(self._ring) == 0:
+            return
+        row = np.frombuffer(data, dtype=np.int16)
+        if len(row) != self._ring.shape[1]:
+            return
+        self._ring[self._ring_pos] = row
+        self._ring_pos = (self._ring_pos + 1) % len(self._ring)
+        self._ring_count = min(self._ring_count + 1, len(self._ring))
+
+    def _drain_ring(self):
+        if self._ring_count == 0:
+            return b""
+        order = np.arange(self._ring_pos - self._ring_count, self._ring_pos) % len(self._ring)
+        self._ring_count = 0
+        return self._ring[order].tobytes()
+
+    def process(self, data):
+        """
+        处理一个数据块
+
+        Returns:
+            应保留的数据块列表：触发前为空，触发时包含预录数据与当前块，之后为当前块。
+            静音超过拖尾时长后 ended 置为 True。
+        """
+        if self.ended:
+            return []
+        speech = self.is_speech(data)
+        if not self.triggered:
+            if not speech:
+                self._push_ring(data)
+                return []
+            self.triggered = True
+            pre_roll = self._drain_ring()
+            return [pre_roll, data] if pre_roll else [data]
+
+        if speech:
+            self._silent_chunks = 0
+        else:
+            self._silent_chunks += 1
+            if self._silent_chunks > self.hangover_chunks:
+                self.ended = True
+        return [data]